@@ -1,7 +1,9 @@
-from flask import Flask, render_template, session, redirect, url_for, request, flash, jsonify
+from flask import Flask, Response, render_template, stream_template, session, redirect, url_for, request, flash, jsonify
 from flask_socketio import SocketIO, emit, join_room, leave_room
 import datetime
+import functools
 import json
+import math
 import os
 import uuid
 import time
@@ -9,10 +11,54 @@ from werkzeug.utils import secure_filename
 import hashlib
 import random
 import string
+import threading
+from compression import init_compression
+from assets import build_game_assets, init_assets
+from i18n import LazyCatalogs, compile_catalogs
+from prerender import PrerenderedPages
+from matchmaking import RatedMatchmakingEngine
+from ratings import RatingStore
+from leaderboards import MAX_SCORE, PERIODS, LeaderboardStore
+from sudoku import DIFFICULTIES, PuzzleBank, fill_bank, is_solution
+from latency import RttTracker
+from lobby import LobbyFeed, lobby_room
+from chat import ChatBatcher, clean_message
+from replays import ReplayRecorder, iter_chunks, replay_path
+from spectators import SpectatorFeed, spectate_room
+from scheduler import TimerScheduler
+from rooms import DEFAULT_ROOM_SIZE, GameRoom, RoomRegistry
+from reaper import Reaper
+from tick_engine import TickEngine
+from snapshots import SnapshotStream
+from sharding import ShardRouter
+from message_bus import BusClientManager, ShardClient, create_bus
+from flow_control import EventRateLimiter, FlowControlManager, parse_budgets
+from jinja2 import FileSystemBytecodeCache
 
 app = Flask(__name__)
 app.secret_key = 'your_secret_key_here'
-socketio = SocketIO(app, cors_allowed_origins="*")
+# 异步模式由生产入口（serve.py / gunicorn.conf.py）通过 SOCKETIO_ASYNC_MODE 指定；
+# 缩小单条消息上限，避免大量连接时每个连接的缓冲区占用过多内存
+# 多 worker 部署：房间和匹配队列按一致性哈希分到各 worker（分片），
+# 跨进程的 emit / 分片请求经 MESSAGE_BUS_URL 指定的消息总线传递；单进程时不需要总线
+ONLINE_GAME_TYPES = ('tank', 'snake', 'tetris', 'pacman', 'breakout', 'memory', '2048',
+                     'sudoku', 'minesweeper', 'asteroids', 'pong', 'flappy')
+SHARD_ID = int(os.environ.get('SHARD_ID', 0))
+SHARD_COUNT = int(os.environ.get('SHARD_COUNT', 1))
+message_bus = create_bus(os.environ.get('MESSAGE_BUS_URL'))
+if SHARD_COUNT > 1 and message_bus is None:
+    raise RuntimeError('SHARD_COUNT > 1 requires MESSAGE_BUS_URL')
+shard_router = ShardRouter(SHARD_ID, SHARD_COUNT, ONLINE_GAME_TYPES)
+
+socketio = SocketIO(
+    app,
+    cors_allowed_origins="*",
+    client_manager=BusClientManager(message_bus) if message_bus is not None else FlowControlManager(),
+    async_mode=os.environ.get('SOCKETIO_ASYNC_MODE') or None,
+    ping_interval=int(os.environ.get('SOCKETIO_PING_INTERVAL', 25)),
+    ping_timeout=int(os.environ.get('SOCKETIO_PING_TIMEOUT', 20)),
+    max_http_buffer_size=int(os.environ.get('SOCKETIO_MAX_MESSAGE_BYTES', 64 * 1024)),
+)
 
 # 添加时间戳转换过滤器
 @app.template_filter('timestamp_to_date')
@@ -27,6 +73,20 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 app.static_url_path = '/static'
 app.static_folder = os.path.join(BASE_DIR, 'static')
 
+# 响应压缩：静态资源预压缩缓存，动态页面按内容摘要缓存或流式压缩
+static_precompressor = init_compression(app)
+
+# 构建产物：抽取出内联 JS/CSS 的游戏模板（由 flask build-assets 生成）
+BUILD_TEMPLATES_DIR = os.path.join(BASE_DIR, 'build', 'templates')
+init_assets(app, BUILD_TEMPLATES_DIR)
+
+@app.cli.command('build-assets')
+def build_assets_command():
+    """抽取游戏模板的内联脚本和样式，生成带哈希的压缩静态文件"""
+    manifest = build_game_assets(os.path.join(BASE_DIR, 'templates'), app.static_folder, BUILD_TEMPLATES_DIR)
+    for name, info in manifest.items():
+        print(f"{name}: {info['before'] // 1024} KB -> {info['after'] // 1024} KB ({len(info['assets'])} 个资源文件)")
+
 # 用户与下载数据存储（SHA-256 哈希用户名/密码）
 USERS_FILE = os.path.join(BASE_DIR, 'users.json')
 DOWNLOADS_FILE = os.path.join(BASE_DIR, 'downloads.json')
@@ -209,984 +269,15 @@ LANGUAGES = {
     'es': 'Español'
 }
 
-LANG_TEXT = {
-    'zh': {
-        'site_name': '我的博客',
-        'welcome': '欢迎来到我的博客',
-        'skills': '技能：Python、C++、系统开发',
-        'latest': '最新文章',
-        'about': '关于我',
-        'login': '登录',
-        'logout': '退出',
-        'admin': '管理员',
-        'footer': '我的博客',
-        'back_home': '返回首页',
-        'username': '用户名',
-        'phone': '手机号/密码',
-        'login_register': '登录',
-        'copyright': '我的博客',
-        'tip_title': '小技巧',
-        'language_switch': '语言切换',
-        'theme': '配色方案',
-        'light': '浅色',
-        'dark': '深色',
-        'delete_account': '注销账户',
-        'confirm_delete_user': '确定要注销当前用户吗？此操作不可恢复！',
-        'new_post': '新建文章',
-        'title_label': '标题',
-        'content_label': '内容',
-        'publish_post': '发布文章',
-        'upload_images': '上传图片 (最多 9 张)',
-        'choose_images': '选择图片',
-        'only_images_allowed': '只能选择图片文件。',
-        'max_images_limit': '最多只能上传 {n} 张图片。',
-        'edit_post': '修改文章',
-        'delete_post': '删除文章',
-        'confirm_delete_post': '确定要删除这篇文章吗？',
-        'delete_success': '文章删除成功！',
-        'delete_fail': '删除文章失败',
-        'delete_error': '删除文章出错',
-        'home': '首页',
-        'games': '游戏',
-        'join': '加入我们',
-        'settings': '设置',
-        'contact': '联系方式',
-        'phone_label': '电话',
-        'email_label': '邮箱',
-        'collapse': '收起',
-        'downloads': '相关下载',
-        'new_download': '新增下载项',
-        'software_name': '软件名称',
-        'download_url': '下载链接',
-        'twofa_code': '验证码',
-        'users_list_title': '用户列表',
-        'delete_user': '删除用户',
-        'register': '注册',
-        'password_required': '密码至少需要8位',
-        'username_exists': '用户名已存在',
-        'register_success': '注册成功',
-        'login_success': '登录成功',
-        'admin_login_success': '管理员登录成功',
-        'verification_code_error': '验证码错误',
-        'need_verification_code': '管理员登录需要验证码，请输入验证码',
-        'password_error': '密码错误',
-        'guest_login_success': '以游客身份登录成功',
-        'post_published': '文章发布成功',
-        'post_updated': '文章更新成功',
-        'title_content_required': '标题和内容不能为空',
-        'server_error': '服务器内部错误',
-        'post_not_found': '文章未找到',
-        'only_admin_create': '只有管理员才能创建文章',
-        'only_admin_edit': '只有管理员才能编辑文章',
-        'only_admin_delete': '只有管理员才能删除文章',
-        'only_admin_upload': '只有管理员才能上传图片',
-        'only_admin_add_download': '只有管理员才能新增下载',
-        'only_admin_delete_user': '只有管理员才能删除用户',
-        'cannot_delete_admin': '不能删除管理员',
-        'user_not_found': '用户不存在',
-        'user_deleted': '用户删除成功',
-        'delete_failed': '删除失败',
-        'confirm_delete_user_confirm': '确定要删除用户',
-        'confirm_question': '吗？',
-        'user_delete_success': '用户删除成功',
-        'post_delete_success': '文章删除成功',
-        'post_delete_failed': '删除文章失败',
-        'post_delete_error': '删除文章出错',
-        'confirm_delete_post_question': '确定要删除这篇文章吗？',
-        'confirm_delete_user_question': '确定要删除用户',
-        'confirm_delete_user_end': '吗？',
-        'snake_game': '贪吃蛇',
-        'tetris_game': '俄罗斯方块',
-        'pacman_game': '吃豆人',
-        'more_games': '更多游戏',
-        'play_game': '开始游戏',
-        'game_description_snake': '经典贪吃蛇游戏，使用方向键控制',
-        'game_description_tetris': '经典俄罗斯方块，挑战你的反应速度',
-        'game_description_pacman': '经典吃豆人，收集所有豆子',
-        'game_description_more': '更多精彩游戏即将推出',
-        'download_list': '下载列表',
-        'no_downloads': '暂无下载内容',
-        'add_download_item': '新增下载项',
-        'software_name_placeholder': '请输入软件名称',
-        'download_url_placeholder': '请输入下载链接',
-        'name_url_required': '名称与链接不能为空',
-        'download_added': '下载项添加成功',
-        'game_controls': '游戏控制',
-        'use_arrow_keys': '使用方向键控制',
-        'press_r_restart': '按 R 重新开始',
-        'score': '得分',
-        'high_score': '最高分',
-        'game_over': '游戏结束',
-        'restart_game': '重新开始',
-        'switch_account': '切换账户',
-        'change_avatar': '更换头像',
-        'change_account_name': '修改账户名',
-        'batch_delete_users': '批量删除用户',
-        'avatar_updated': '头像更新成功',
-        'account_name_updated': '账户名更新成功',
-        'back_downloads': '返回下载页',
-        'breakout_game': '打砖块',
-        'memory_game': '记忆翻牌',
-        'sudoku_game': '数独',
-        'minesweeper_game': '扫雷',
-        'asteroids_game': '小行星',
-        'pong_game': '乒乓球',
-        'flappy_game': '飞翔小鸟',
-        'game_description_breakout': '经典打砖块游戏，用球拍击球',
-        'game_description_memory': '翻牌配对，挑战你的记忆力',
-        'game_description_2048': '数字合并游戏，挑战2048',
-        'game_description_sudoku': '经典数独谜题，锻炼逻辑思维',
-        'game_description_minesweeper': '经典扫雷游戏，小心地雷',
-        'game_description_asteroids': '太空射击游戏，击碎小行星',
-        'game_description_pong': '经典乒乓球游戏，与AI对战',
-        'game_description_flappy': '点击控制小鸟飞行，避开障碍',
-        'tank_game': '疯狂坦克',
-        'game_description_tank': '经典2D坦克对战游戏，选择玩家数量，控制坦克发射炮弹击败对手',
-        # 新增的翻译键
-        'online_game': '联机游戏',
-        'online_mode': '联机模式',
-        'local_mode': '本地模式',
-        'connecting': '正在连接...',
-        'connected': '已连接',
-        'disconnected': '连接断开',
-        'please_wait': '请稍候',
-        'connection_status': '连接状态',
-        'matching': '匹配中',
-        'searching_players': '正在寻找玩家...',
-        'cancel_matching': '取消匹配',
-        'left_matching': '已离开匹配队列',
-        'game_room': '游戏房间',
-        'room_id': '房间ID',
-        'players': '玩家',
-        'ready': '准备',
-        'waiting': '等待',
-        'leave_room': '离开房间',
-        'game_info': '游戏信息',
-        'game_started': '游戏开始！',
-        'about_website': '关于网站',
-        'website_info': '网站信息',
-        'version': '版本',
-        'runtime': '运行时间',
-        'launch_date': '上线日期',
-        'developer': '开发者',
-        'features': '主要功能',
-        'blog_system': '博客系统',
-        'share_thoughts': '分享想法和文章',
-        'game_collection': '游戏集合',
-        'classic_games': '经典小游戏合集',
-        'download_center': '下载中心',
-        'software_downloads': '软件下载管理',
-        'user_system': '用户系统',
-        'account_management': '账户管理和绑定',
-        'multi_language': '多语言支持',
-        'six_languages': '支持六种语言',
-        'responsive_design': '响应式设计',
-        'mobile_friendly': '移动端友好',
-        'technology': '技术栈',
-        'backend': '后端',
-        'frontend': '前端',
-        'styling': '样式',
-        'games': '游戏',
-        'deployment': '部署',
-        'total_users': '总用户数',
-        'total_posts': '总文章数',
-        'total_games': '游戏数量',
-        'total_downloads': '下载项目',
-        'calculating': '计算中...',
-        'account_binding': '账户绑定',
-        'email_binding': '邮箱绑定',
-        'phone_binding': '手机号绑定',
-        'enter_email': '请输入邮箱',
-        'enter_phone': '请输入手机号',
-        'enter_code': '请输入验证码',
-        'send_code': '发送验证码',
-        'bind_email': '绑定邮箱',
-        'bind_phone': '绑定手机号',
-        'batch_delete': '批量删除',
-        'website_version': '网站版本',
-        'launch_date': '启动日期',
-        'developer': '开发者',
-        'features': '主要功能',
-        'tech_stack': '技术栈',
-        'statistics': '网站统计',
-        'disclaimer': '免责声明',
-        'disclaimer_content': '本网站仅供学习和娱乐使用。用户在使用本网站时，应当遵守相关法律法规。网站不对用户的行为承担任何责任。'
-    },
-    'en': {
-        'site_name': 'My Blog',
-        'welcome': 'Welcome to My Blog',
-        'skills': 'Skills: Python, C++, System Development',
-        'latest': 'Latest Posts',
-        'about': 'About Me',
-        'login': 'Login/Register',
-        'logout': 'Logout',
-        'admin': 'Admin',
-        'footer': 'My Blog',
-        'back_home': 'Back to Home',
-        'username': 'Username',
-        'phone': 'Phone/Password',
-        'login_register': 'Login/Register',
-        'copyright': 'My Blog',
-        'tip_title': 'Tip',
-        'language_switch': 'Language',
-        'theme': 'Theme',
-        'light': 'Light',
-        'dark': 'Dark',
-        'delete_account': 'Delete Account',
-        'confirm_delete_user': 'Are you sure to delete this account? This cannot be undone!',
-        'new_post': 'New Post',
-        'title_label': 'Title',
-        'content_label': 'Content',
-        'publish_post': 'Publish',
-        'upload_images': 'Upload Images (up to 9)',
-        'choose_images': 'Choose Images',
-        'only_images_allowed': 'Only image files are allowed.',
-        'max_images_limit': 'You can upload at most {n} images.',
-        'edit_post': 'Edit Post',
-        'delete_post': 'Delete Post',
-        'confirm_delete_post': 'Are you sure you want to delete this post?',
-        'delete_success': 'Post deleted successfully!',
-        'delete_fail': 'Failed to delete the post',
-        'delete_error': 'An error occurred while deleting the post',
-        'home': 'Home',
-        'games': 'Games',
-        'join': 'Join Us',
-        'settings': 'Settings',
-        'contact': 'Contact',
-        'phone_label': 'Phone',
-        'email_label': 'Email',
-        'collapse': 'Collapse',
-        'downloads': 'Downloads',
-        'new_download': 'New Download',
-        'software_name': 'Software Name',
-        'download_url': 'Download URL',
-        'twofa_code': 'Verification Code',
-        'users_list_title': 'User List',
-        'delete_user': 'Delete User',
-        'register': 'Register',
-        'password_required': 'Password must be at least 8 characters',
-        'username_exists': 'Username already exists',
-        'register_success': 'Registration successful',
-        'login_success': 'Login successful',
-        'admin_login_success': 'Admin login successful',
-        'verification_code_error': 'Verification code error',
-        'need_verification_code': 'Admin login requires verification code, please enter the code',
-        'password_error': 'Password error',
-        'guest_login_success': 'Logged in as guest successfully',
-        'post_published': 'Post published successfully',
-        'post_updated': 'Post updated successfully',
-        'title_content_required': 'Title and content cannot be empty',
-        'server_error': 'Server internal error',
-        'post_not_found': 'Post not found',
-        'only_admin_create': 'Only admin can create posts',
-        'only_admin_edit': 'Only admin can edit posts',
-        'only_admin_delete': 'Only admin can delete posts',
-        'only_admin_upload': 'Only admin can upload images',
-        'only_admin_add_download': 'Only admin can add downloads',
-        'only_admin_delete_user': 'Only admin can delete users',
-        'cannot_delete_admin': 'Cannot delete admin',
-        'user_not_found': 'User not found',
-        'user_deleted': 'User deleted successfully',
-        'delete_failed': 'Delete failed',
-        'confirm_delete_user_confirm': 'Are you sure to delete user',
-        'confirm_question': '?',
-        'user_delete_success': 'User deleted successfully',
-        'post_delete_success': 'Post deleted successfully',
-        'post_delete_failed': 'Failed to delete post',
-        'post_delete_error': 'Error occurred while deleting post',
-        'confirm_delete_post_question': 'Are you sure you want to delete this post?',
-        'confirm_delete_user_question': 'Are you sure to delete user',
-        'confirm_delete_user_end': '?',
-        'snake_game': 'Snake',
-        'tetris_game': 'Tetris',
-        'pacman_game': 'Pac-Man',
-        'more_games': 'More Games',
-        'play_game': 'Play Game',
-        'game_description_snake': 'Classic Snake game, use arrow keys to control',
-        'game_description_tetris': 'Classic Tetris, challenge your reaction speed',
-        'game_description_pacman': 'Classic Pac-Man, collect all dots',
-        'game_description_more': 'More exciting games coming soon',
-        'download_list': 'Download List',
-        'no_downloads': 'No downloads available',
-        'add_download_item': 'Add Download Item',
-        'software_name_placeholder': 'Enter software name',
-        'download_url_placeholder': 'Enter download URL',
-        'name_url_required': 'Name and URL cannot be empty',
-        'download_added': 'Download item added successfully',
-        'game_controls': 'Game Controls',
-        'use_arrow_keys': 'Use arrow keys to control',
-        'press_r_restart': 'Press R to restart',
-        'score': 'Score',
-        'high_score': 'High Score',
-        'game_over': 'Game Over',
-        'restart_game': 'Restart Game',
-        'switch_account': 'Switch Account',
-        'change_avatar': 'Change Avatar',
-        'change_account_name': 'Change Account Name',
-        'batch_delete_users': 'Batch Delete Users',
-        'avatar_updated': 'Avatar updated successfully',
-        'account_name_updated': 'Account name updated successfully',
-        'back_downloads': 'Back to Downloads',
-        'breakout_game': 'Breakout',
-        'memory_game': 'Memory Match',
-        'sudoku_game': 'Sudoku',
-        'minesweeper_game': 'Minesweeper',
-        'asteroids_game': 'Asteroids',
-        'pong_game': 'Pong',
-        'flappy_game': 'Flappy Bird',
-        'game_description_breakout': 'Classic Breakout game, use paddle to hit ball',
-        'game_description_memory': 'Flip cards to match pairs, challenge your memory',
-        'game_description_2048': 'Number merging game, challenge to reach 2048',
-        'game_description_sudoku': 'Classic Sudoku puzzle, exercise logical thinking',
-        'game_description_minesweeper': 'Classic Minesweeper game, watch out for mines',
-        'game_description_asteroids': 'Space shooting game, destroy asteroids',
-        'game_description_pong': 'Classic Pong game, play against AI',
-        'game_description_flappy': 'Click to control bird flight, avoid obstacles',
-        'tank_game': 'Crazy Tanks',
-        'game_description_tank': 'Classic 2D tank battle game, choose player count, control tanks to defeat opponents',
-        # New translation keys
-        'online_game': 'Online Game',
-        'online_mode': 'Online Mode',
-        'local_mode': 'Local Mode',
-        'connecting': 'Connecting...',
-        'connected': 'Connected',
-        'disconnected': 'Disconnected',
-        'please_wait': 'Please wait',
-        'connection_status': 'Connection Status',
-        'matching': 'Matching',
-        'searching_players': 'Searching for players...',
-        'cancel_matching': 'Cancel Matching',
-        'left_matching': 'Left matching queue',
-        'game_room': 'Game Room',
-        'room_id': 'Room ID',
-        'players': 'Players',
-        'ready': 'Ready',
-        'waiting': 'Waiting',
-        'leave_room': 'Leave Room',
-        'game_info': 'Game Info',
-        'game_started': 'Game Started!',
-        'about_website': 'About Website',
-        'website_info': 'Website Info',
-        'version': 'Version',
-        'runtime': 'Runtime',
-        'launch_date': 'Launch Date',
-        'developer': 'Developer',
-        'features': 'Main Features',
-        'blog_system': 'Blog System',
-        'share_thoughts': 'Share thoughts and articles',
-        'game_collection': 'Game Collection',
-        'classic_games': 'Classic mini-games collection',
-        'download_center': 'Download Center',
-        'software_downloads': 'Software download management',
-        'user_system': 'User System',
-        'account_management': 'Account management and binding',
-        'multi_language': 'Multi-language Support',
-        'six_languages': 'Support for six languages',
-        'responsive_design': 'Responsive Design',
-        'mobile_friendly': 'Mobile friendly',
-        'technology': 'Technology Stack',
-        'backend': 'Backend',
-        'frontend': 'Frontend',
-        'styling': 'Styling',
-        'games': 'Games',
-        'deployment': 'Deployment',
-        'total_users': 'Total Users',
-        'total_posts': 'Total Posts',
-        'total_games': 'Game Count',
-        'total_downloads': 'Download Items',
-        'calculating': 'Calculating...',
-        'account_binding': 'Account Binding',
-        'email_binding': 'Email Binding',
-        'phone_binding': 'Phone Binding',
-        'enter_email': 'Enter email',
-        'enter_phone': 'Enter phone number',
-        'enter_code': 'Enter verification code',
-        'send_code': 'Send Code',
-        'bind_email': 'Bind Email',
-        'bind_phone': 'Bind Phone',
-        'batch_delete': 'Batch Delete',
-        'website_version': 'Website Version',
-        'launch_date': 'Launch Date',
-        'developer': 'Developer',
-        'features': 'Main Features',
-        'tech_stack': 'Technology Stack',
-        'statistics': 'Website Statistics',
-        'disclaimer': 'Disclaimer',
-        'disclaimer_content': 'This website is for learning and entertainment purposes only. Users should comply with relevant laws and regulations when using this website. The website is not responsible for user behavior.'
-    },
-    'ja': {
-        'site_name': '私のブログ',
-        'welcome': '私のブログへようこそ',
-        'skills': 'スキル：Python、C++、システム開発',
-        'latest': '最新記事',
-        'about': '私について',
-        'login': 'ログイン/登録',
-        'logout': 'ログアウト',
-        'admin': '管理者',
-        'footer': '私のブログ',
-        'back_home': 'ホームへ戻る',
-        'username': 'ユーザー名',
-        'phone': '電話番号/パスワード',
-        'login_register': 'ログイン/登録',
-        'copyright': '私のブログ',
-        'tip_title': 'ヒント',
-        'language_switch': '言語切替',
-        'theme': 'テーマ',
-        'light': 'ライト',
-        'dark': 'ダーク',
-        'delete_account': 'アカウント削除',
-        'confirm_delete_user': '本当にこのアカウントを削除しますか？この操作は元に戻せません。',
-        'new_post': '新規記事',
-        'title_label': 'タイトル',
-        'content_label': '内容',
-        'publish_post': '公開',
-        'upload_images': '画像をアップロード（最大9枚）',
-        'choose_images': '画像を選択',
-        'only_images_allowed': '画像ファイルのみ選択できます。',
-        'max_images_limit': '画像は最大 {n} 枚までアップロードできます。',
-        'edit_post': '記事を編集',
-        'delete_post': '記事を削除',
-        'confirm_delete_post': 'この記事を削除してもよろしいですか？',
-        'delete_success': '記事を削除しました！',
-        'delete_fail': '記事の削除に失敗しました',
-        'delete_error': '記事の削除中にエラーが発生しました',
-        'home': 'ホーム',
-        'games': 'ゲーム',
-        'join': '参加する',
-        'settings': '設定',
-        'contact': '連絡先',
-        'phone_label': '電話',
-        'email_label': 'メール',
-        'collapse': '折りたたむ',
-        'downloads': 'ダウンロード',
-        'new_download': 'ダウンロード追加',
-        'software_name': 'ソフト名',
-        'download_url': 'ダウンロードURL',
-        'twofa_code': '認証コード',
-        'switch_account': 'アカウント切り替え',
-        'change_avatar': 'アバター変更',
-        'change_account_name': 'アカウント名変更',
-        'batch_delete_users': 'ユーザー一括削除',
-        'avatar_updated': 'アバター更新成功',
-        'account_name_updated': 'アカウント名更新成功',
-        'back_downloads': 'ダウンロードに戻る',
-        'breakout_game': 'ブロック崩し',
-        'memory_game': '記憶ゲーム',
-        'sudoku_game': '数独',
-        'minesweeper_game': 'マインスイーパー',
-        'asteroids_game': 'アステロイド',
-        'pong_game': 'ポン',
-        'flappy_game': 'フラッピーバード',
-        'game_description_breakout': 'クラシックなブロック崩しゲーム',
-        'game_description_memory': 'カードをめくってペアを見つける記憶ゲーム',
-        'game_description_2048': '数字を合体させて2048を目指すゲーム',
-        'game_description_sudoku': 'クラシックな数独パズル',
-        'game_description_minesweeper': 'クラシックなマインスイーパーゲーム',
-        'game_description_asteroids': '宇宙シューティングゲーム',
-        'game_description_pong': 'クラシックなポンゲーム',
-        'game_description_flappy': 'クリックで鳥を飛ばし、障害物を避ける',
-        'tank_game': 'クレイジータンク',
-        'game_description_tank': 'クラシックな2Dタンクバトルゲーム、プレイヤー数を選択して対戦',
-        # 新しい翻訳キー
-        'online_game': 'オンラインゲーム',
-        'online_mode': 'オンラインモード',
-        'local_mode': 'ローカルモード',
-        'connecting': '接続中...',
-        'connected': '接続済み',
-        'disconnected': '切断',
-        'please_wait': 'お待ちください',
-        'connection_status': '接続状態',
-        'matching': 'マッチング中',
-        'searching_players': 'プレイヤーを検索中...',
-        'cancel_matching': 'マッチングをキャンセル',
-        'left_matching': 'マッチングキューを離れました',
-        'game_room': 'ゲームルーム',
-        'room_id': 'ルームID',
-        'players': 'プレイヤー',
-        'ready': '準備完了',
-        'waiting': '待機中',
-        'leave_room': 'ルームを離れる',
-        'game_info': 'ゲーム情報',
-        'game_started': 'ゲーム開始！',
-        'about_website': 'ウェブサイトについて',
-        'website_info': 'ウェブサイト情報',
-        'version': 'バージョン',
-        'runtime': '稼働時間',
-        'launch_date': '公開日',
-        'developer': '開発者',
-        'features': '主な機能',
-        'blog_system': 'ブログシステム',
-        'share_thoughts': '考えや記事を共有',
-        'game_collection': 'ゲームコレクション',
-        'classic_games': 'クラシックミニゲーム集',
-        'download_center': 'ダウンロードセンター',
-        'software_downloads': 'ソフトウェアダウンロード管理',
-        'user_system': 'ユーザーシステム',
-        'account_management': 'アカウント管理とバインディング',
-        'multi_language': '多言語サポート',
-        'six_languages': '6言語サポート',
-        'responsive_design': 'レスポンシブデザイン',
-        'mobile_friendly': 'モバイルフレンドリー',
-        'technology': '技術スタック',
-        'backend': 'バックエンド',
-        'frontend': 'フロントエンド',
-        'styling': 'スタイリング',
-        'games': 'ゲーム',
-        'deployment': 'デプロイメント',
-        'total_users': '総ユーザー数',
-        'total_posts': '総記事数',
-        'total_games': 'ゲーム数',
-        'total_downloads': 'ダウンロード項目',
-        'calculating': '計算中...',
-        'account_binding': 'アカウントバインディング',
-        'email_binding': 'メールバインディング',
-        'phone_binding': '電話バインディング',
-        'enter_email': 'メールアドレスを入力',
-        'enter_phone': '電話番号を入力',
-        'enter_code': '認証コードを入力',
-        'send_code': 'コードを送信',
-        'bind_email': 'メールをバインド',
-        'bind_phone': '電話をバインド',
-        'batch_delete': '一括削除',
-        'website_version': 'ウェブサイトバージョン',
-        'launch_date': '起動日',
-        'developer': '開発者',
-        'features': '主な機能',
-        'tech_stack': '技術スタック',
-        'statistics': 'ウェブサイト統計',
-        'disclaimer': '免責事項',
-        'disclaimer_content': 'このウェブサイトは学習と娯楽目的のみに使用されます。ユーザーはこのウェブサイトを使用する際に、関連する法律法規を遵守する必要があります。ウェブサイトはユーザーの行為について一切の責任を負いません。'
-    },
-    'ko': {
-        'site_name': '내 블로그',
-        'welcome': '내 블로그에 오신 것을 환영합니다',
-        'skills': '기술: Python, C++, 시스템 개발',
-        'latest': '최신 글',
-        'about': '내 소개',
-        'login': '로그인/회원가입',
-        'logout': '로그아웃',
-        'admin': '관리자',
-        'footer': '내 블로그',
-        'back_home': '홈으로',
-        'username': '사용자 이름',
-        'phone': '전화번호/비밀번호',
-        'login_register': '로그인/회원가입',
-        'copyright': '내 블로그',
-        'tip_title': '팁',
-        'language_switch': '언어 전환',
-        'theme': '테마',
-        'light': '라이트',
-        'dark': '다크',
-        'delete_account': '계정 삭제',
-        'confirm_delete_user': '정말 이 계정을 삭제하시겠습니까? 이 작업은 취소할 수 없습니다.',
-        'new_post': '새 글 작성',
-        'title_label': '제목',
-        'content_label': '내용',
-        'publish_post': '게시',
-        'upload_images': '이미지 업로드 (최대 9장)',
-        'choose_images': '이미지 선택',
-        'only_images_allowed': '이미지 파일만 선택할 수 있습니다.',
-        'max_images_limit': '최대 {n}장의 이미지만 업로드할 수 있습니다.',
-        'edit_post': '글 수정',
-        'delete_post': '글 삭제',
-        'confirm_delete_post': '이 글을 삭제하시겠습니까?',
-        'delete_success': '글이 삭제되었습니다!',
-        'delete_fail': '글 삭제에 실패했습니다',
-        'delete_error': '글 삭제 중 오류가 발생했습니다',
-        'home': '홈',
-        'games': '게임',
-        'join': '가입하기',
-        'settings': '설정',
-        'contact': '연락처',
-        'phone_label': '전화',
-        'email_label': '이메일',
-        'collapse': '접기',
-        'downloads': '다운로드',
-        'new_download': '다운로드 추가',
-        'software_name': '소프트웨어 이름',
-        'download_url': '다운로드 링크',
-        'twofa_code': '인증 코드',
-        'switch_account': '계정 전환',
-        'change_avatar': '아바타 변경',
-        'change_account_name': '계정명 변경',
-        'batch_delete_users': '사용자 일괄 삭제',
-        'avatar_updated': '아바타 업데이트 성공',
-        'account_name_updated': '계정명 업데이트 성공',
-        'back_downloads': '다운로드로 돌아가기',
-        'breakout_game': '브레이크아웃',
-        'memory_game': '기억력 게임',
-        'sudoku_game': '스도쿠',
-        'minesweeper_game': '지뢰찾기',
-        'asteroids_game': '소행성',
-        'pong_game': '퐁',
-        'flappy_game': '플래피 버드',
-        'game_description_breakout': '클래식 브레이크아웃 게임',
-        'game_description_memory': '카드를 뒤집어 쌍을 찾는 기억력 게임',
-        'game_description_2048': '숫자를 합쳐 2048에 도전하는 게임',
-        'game_description_sudoku': '클래식 스도쿠 퍼즐',
-        'game_description_minesweeper': '클래식 지뢰찾기 게임',
-        'game_description_asteroids': '우주 슈팅 게임',
-        'game_description_pong': '클래식 퐁 게임',
-        'game_description_flappy': '클릭으로 새를 조종하여 장애물 피하기',
-        'tank_game': '크레이지 탱크',
-        'game_description_tank': '클래식 2D 탱크 배틀 게임, 플레이어 수를 선택하여 대전',
-        # 새로운 번역 키
-        'online_game': '온라인 게임',
-        'online_mode': '온라인 모드',
-        'local_mode': '로컬 모드',
-        'connecting': '연결 중...',
-        'connected': '연결됨',
-        'disconnected': '연결 끊김',
-        'please_wait': '잠시 기다려주세요',
-        'connection_status': '연결 상태',
-        'matching': '매칭 중',
-        'searching_players': '플레이어 검색 중...',
-        'cancel_matching': '매칭 취소',
-        'left_matching': '매칭 큐를 떠났습니다',
-        'game_room': '게임 룸',
-        'room_id': '룸 ID',
-        'players': '플레이어',
-        'ready': '준비',
-        'waiting': '대기 중',
-        'leave_room': '룸 떠나기',
-        'game_info': '게임 정보',
-        'game_started': '게임 시작!',
-        'about_website': '웹사이트 소개',
-        'website_info': '웹사이트 정보',
-        'version': '버전',
-        'runtime': '실행 시간',
-        'launch_date': '출시일',
-        'developer': '개발자',
-        'features': '주요 기능',
-        'blog_system': '블로그 시스템',
-        'share_thoughts': '생각과 글 공유',
-        'game_collection': '게임 컬렉션',
-        'classic_games': '클래식 미니게임 모음',
-        'download_center': '다운로드 센터',
-        'software_downloads': '소프트웨어 다운로드 관리',
-        'user_system': '사용자 시스템',
-        'account_management': '계정 관리 및 바인딩',
-        'multi_language': '다국어 지원',
-        'six_languages': '6개 언어 지원',
-        'responsive_design': '반응형 디자인',
-        'mobile_friendly': '모바일 친화적',
-        'technology': '기술 스택',
-        'backend': '백엔드',
-        'frontend': '프론트엔드',
-        'styling': '스타일링',
-        'games': '게임',
-        'deployment': '배포',
-        'total_users': '총 사용자 수',
-        'total_posts': '총 게시물 수',
-        'total_games': '게임 수',
-        'total_downloads': '다운로드 항목',
-        'calculating': '계산 중...',
-        'account_binding': '계정 바인딩',
-        'email_binding': '이메일 바인딩',
-        'phone_binding': '전화 바인딩',
-        'enter_email': '이메일 입력',
-        'enter_phone': '전화번호 입력',
-        'enter_code': '인증 코드 입력',
-        'send_code': '코드 전송',
-        'bind_email': '이메일 바인딩',
-        'bind_phone': '전화 바인딩',
-        'batch_delete': '일괄 삭제',
-        'website_version': '웹사이트 버전',
-        'launch_date': '시작일',
-        'developer': '개발자',
-        'features': '주요 기능',
-        'tech_stack': '기술 스택',
-        'statistics': '웹사이트 통계',
-        'disclaimer': '면책 조항',
-        'disclaimer_content': '이 웹사이트는 학습 및 오락 목적으로만 사용됩니다. 사용자는 이 웹사이트를 사용할 때 관련 법률 및 규정을 준수해야 합니다. 웹사이트는 사용자의 행동에 대해 어떠한 책임도 지지 않습니다.'
-    },
-    'ru': {
-        'site_name': 'Мой блог',
-        'welcome': 'Добро пожаловать в мой блог',
-        'skills': 'Навыки: Python, C++, системная разработка',
-        'latest': 'Последние статьи',
-        'about': 'Обо мне',
-        'login': 'Вход/Регистрация',
-        'logout': 'Выйти',
-        'admin': 'Админ',
-        'footer': 'Мой блог',
-        'back_home': 'На главную',
-        'username': 'Имя пользователя',
-        'phone': 'Телефон/Пароль',
-        'login_register': 'Вход/Регистрация',
-        'copyright': 'Мой блог',
-        'tip_title': 'Совет',
-        'language_switch': 'Смена языка',
-        'theme': 'Тема',
-        'light': 'Светлая',
-        'dark': 'Тёмная',
-        'delete_account': 'Удалить аккаунт',
-        'confirm_delete_user': 'Вы уверены, что хотите удалить этот аккаунт? Это действие необратимо.',
-        'new_post': 'Новая запись',
-        'title_label': 'Заголовок',
-        'content_label': 'Содержание',
-        'publish_post': 'Опубликовать',
-        'upload_images': 'Загрузка изображений (до 9)',
-        'choose_images': 'Выбрать изображения',
-        'only_images_allowed': 'Разрешены только файлы изображений.',
-        'max_images_limit': 'Можно загрузить не более {n} изображений.',
-        'edit_post': 'Редактировать запись',
-        'delete_post': 'Удалить запись',
-        'confirm_delete_post': 'Вы уверены, что хотите удалить эту запись?',
-        'delete_success': 'Запись успешно удалена!',
-        'delete_fail': 'Не удалось удалить запись',
-        'delete_error': 'Произошла ошибка при удалении записи',
-        'home': 'Главная',
-        'games': 'Игры',
-        'join': 'Присоединиться',
-        'settings': 'Настройки',
-        'contact': 'Контакты',
-        'phone_label': 'Телефон',
-        'email_label': 'Email',
-        'collapse': 'Свернуть',
-        'downloads': 'Загрузки',
-        'new_download': 'Новая загрузка',
-        'software_name': 'Название ПО',
-        'download_url': 'Ссылка для загрузки',
-        'twofa_code': 'Код',
-        'switch_account': 'Сменить аккаунт',
-        'change_avatar': 'Изменить аватар',
-        'change_account_name': 'Изменить имя аккаунта',
-        'batch_delete_users': 'Массовое удаление пользователей',
-        'avatar_updated': 'Аватар успешно обновлен',
-        'account_name_updated': 'Имя аккаунта успешно обновлено',
-        'back_downloads': 'Назад к загрузкам',
-        'breakout_game': 'Арканоид',
-        'memory_game': 'Игра на память',
-        'sudoku_game': 'Судоку',
-        'minesweeper_game': 'Сапер',
-        'asteroids_game': 'Астероиды',
-        'pong_game': 'Понг',
-        'flappy_game': 'Флэппи Берд',
-        'game_description_breakout': 'Классическая игра Арканоид',
-        'game_description_memory': 'Игра на память с картами',
-        'game_description_2048': 'Игра слияния чисел до 2048',
-        'game_description_sudoku': 'Классическая головоломка Судоку',
-        'game_description_minesweeper': 'Классическая игра Сапер',
-        'game_description_asteroids': 'Космическая стрелялка',
-        'game_description_pong': 'Классическая игра Понг',
-        'game_description_flappy': 'Управляйте птицей, избегая препятствий',
-        'tank_game': 'Безумные Танки',
-        'game_description_tank': 'Классическая 2D танковая битва, выберите количество игроков для сражения',
-        # Новые ключи перевода
-        'online_game': 'Онлайн игра',
-        'online_mode': 'Онлайн режим',
-        'local_mode': 'Локальный режим',
-        'connecting': 'Подключение...',
-        'connected': 'Подключено',
-        'disconnected': 'Отключено',
-        'please_wait': 'Пожалуйста, подождите',
-        'connection_status': 'Статус подключения',
-        'matching': 'Поиск соперника',
-        'searching_players': 'Поиск игроков...',
-        'cancel_matching': 'Отменить поиск',
-        'left_matching': 'Покинул очередь поиска',
-        'game_room': 'Игровая комната',
-        'room_id': 'ID комнаты',
-        'players': 'Игроки',
-        'ready': 'Готов',
-        'waiting': 'Ожидание',
-        'leave_room': 'Покинуть комнату',
-        'game_info': 'Информация об игре',
-        'game_started': 'Игра началась!',
-        'about_website': 'О сайте',
-        'website_info': 'Информация о сайте',
-        'version': 'Версия',
-        'runtime': 'Время работы',
-        'launch_date': 'Дата запуска',
-        'developer': 'Разработчик',
-        'features': 'Основные функции',
-        'blog_system': 'Система блога',
-        'share_thoughts': 'Делиться мыслями и статьями',
-        'game_collection': 'Коллекция игр',
-        'classic_games': 'Коллекция классических мини-игр',
-        'download_center': 'Центр загрузок',
-        'software_downloads': 'Управление загрузками ПО',
-        'user_system': 'Пользовательская система',
-        'account_management': 'Управление аккаунтами и привязка',
-        'multi_language': 'Многоязычная поддержка',
-        'six_languages': 'Поддержка 6 языков',
-        'responsive_design': 'Адаптивный дизайн',
-        'mobile_friendly': 'Мобильная версия',
-        'technology': 'Технологический стек',
-        'backend': 'Backend',
-        'frontend': 'Frontend',
-        'styling': 'Стилизация',
-        'games': 'Игры',
-        'deployment': 'Развертывание',
-        'total_users': 'Всего пользователей',
-        'total_posts': 'Всего постов',
-        'total_games': 'Количество игр',
-        'total_downloads': 'Элементы загрузки',
-        'calculating': 'Вычисление...',
-        'account_binding': 'Привязка аккаунта',
-        'email_binding': 'Привязка email',
-        'phone_binding': 'Привязка телефона',
-        'enter_email': 'Введите email',
-        'enter_phone': 'Введите номер телефона',
-        'enter_code': 'Введите код подтверждения',
-        'send_code': 'Отправить код',
-        'bind_email': 'Привязать email',
-        'bind_phone': 'Привязать телефон',
-        'batch_delete': 'Массовое удаление',
-        'website_version': 'Версия сайта',
-        'launch_date': 'Дата запуска',
-        'developer': 'Разработчик',
-        'features': 'Основные функции',
-        'tech_stack': 'Технологический стек',
-        'statistics': 'Статистика сайта',
-        'disclaimer': 'Отказ от ответственности',
-        'disclaimer_content': 'Этот веб-сайт предназначен только для обучения и развлечения. Пользователи должны соблюдать соответствующие законы и правила при использовании этого веб-сайта. Веб-сайт не несет ответственности за действия пользователей.'
-    },
-    'es': {
-        'site_name': 'Mi Blog',
-        'welcome': 'Bienvenido a Mi Blog',
-        'skills': 'Habilidades: Python, C++, Desarrollo de Sistemas',
-        'latest': 'Últimas Publicaciones',
-        'about': 'Sobre mí',
-        'login': 'Iniciar sesión/Registrarse',
-        'logout': 'Salir',
-        'admin': 'Administrador',
-        'footer': 'Mi Blog',
-        'back_home': 'Volver al inicio',
-        'username': 'Usuario',
-        'phone': 'Teléfono/Contraseña',
-        'login_register': 'Iniciar/Registrar',
-        'copyright': 'Mi Blog',
-        'tip_title': 'Consejo',
-        'language_switch': 'Idioma',
-        'theme': 'Tema',
-        'light': 'Claro',
-        'dark': 'Oscuro',
-        'delete_account': 'Eliminar cuenta',
-        'confirm_delete_user': '¿Seguro que desea eliminar la cuenta? ¡No se puede deshacer!',
-        'new_post': 'Nueva publicación',
-        'title_label': 'Título',
-        'content_label': 'Contenido',
-        'publish_post': 'Publicar',
-        'upload_images': 'Subir imágenes (hasta 9)',
-        'choose_images': 'Elegir imágenes',
-        'only_images_allowed': 'Sólo se permiten imágenes.',
-        'max_images_limit': 'Puede subir como máximo {n} imágenes.',
-        'edit_post': 'Editar publicación',
-        'delete_post': 'Eliminar publicación',
-        'confirm_delete_post': '¿Seguro que desea eliminar esta publicación?',
-        'delete_success': '¡Publicación eliminada!',
-        'delete_fail': 'Error al eliminar',
-        'delete_error': 'Se produjo un error al eliminar',
-        'home': 'Inicio',
-        'games': 'Juegos',
-        'join': 'Únete',
-        'settings': 'Ajustes',
-        'contact': 'Contacto',
-        'phone_label': 'Teléfono',
-        'email_label': 'Correo',
-        'collapse': 'Ocultar',
-        'downloads': 'Descargas',
-        'new_download': 'Nueva descarga',
-        'software_name': 'Nombre del software',
-        'download_url': 'URL de descarga',
-        'twofa_code': 'Código',
-        'switch_account': 'Cambiar cuenta',
-        'change_avatar': 'Cambiar avatar',
-        'change_account_name': 'Cambiar nombre de cuenta',
-        'batch_delete_users': 'Eliminar usuarios en lote',
-        'avatar_updated': 'Avatar actualizado exitosamente',
-        'account_name_updated': 'Nombre de cuenta actualizado exitosamente',
-        'back_downloads': 'Volver a descargas',
-        'breakout_game': 'Breakout',
-        'memory_game': 'Juego de Memoria',
-        'sudoku_game': 'Sudoku',
-        'minesweeper_game': 'Buscaminas',
-        'asteroids_game': 'Asteroides',
-        'pong_game': 'Pong',
-        'flappy_game': 'Flappy Bird',
-        'game_description_breakout': 'Juego clásico Breakout',
-        'game_description_memory': 'Juego de memoria con cartas',
-        'game_description_2048': 'Juego de fusión de números hasta 2048',
-        'game_description_sudoku': 'Rompecabezas clásico de Sudoku',
-        'game_description_minesweeper': 'Juego clásico de Buscaminas',
-        'game_description_asteroids': 'Juego de disparos espaciales',
-        'game_description_pong': 'Juego clásico de Pong',
-        'game_description_flappy': 'Controla el pájaro, evita obstáculos',
-        'tank_game': 'Tanques Locos',
-        'game_description_tank': 'Juego clásico de batalla de tanques 2D, elige el número de jugadores para luchar',
-        # Nuevas claves de traducción
-        'online_game': 'Juego en línea',
-        'online_mode': 'Modo en línea',
-        'local_mode': 'Modo local',
-        'connecting': 'Conectando...',
-        'connected': 'Conectado',
-        'disconnected': 'Desconectado',
-        'please_wait': 'Por favor espera',
-        'connection_status': 'Estado de conexión',
-        'matching': 'Emparejando',
-        'searching_players': 'Buscando jugadores...',
-        'cancel_matching': 'Cancelar emparejamiento',
-        'left_matching': 'Salió de la cola de emparejamiento',
-        'game_room': 'Sala de juego',
-        'room_id': 'ID de sala',
-        'players': 'Jugadores',
-        'ready': 'Listo',
-        'waiting': 'Esperando',
-        'leave_room': 'Salir de la sala',
-        'game_info': 'Información del juego',
-        'game_started': '¡Juego iniciado!',
-        'about_website': 'Acerca del sitio web',
-        'website_info': 'Información del sitio web',
-        'version': 'Versión',
-        'runtime': 'Tiempo de ejecución',
-        'launch_date': 'Fecha de lanzamiento',
-        'developer': 'Desarrollador',
-        'features': 'Características principales',
-        'blog_system': 'Sistema de blog',
-        'share_thoughts': 'Compartir pensamientos y artículos',
-        'game_collection': 'Colección de juegos',
-        'classic_games': 'Colección de mini-juegos clásicos',
-        'download_center': 'Centro de descargas',
-        'software_downloads': 'Gestión de descargas de software',
-        'user_system': 'Sistema de usuarios',
-        'account_management': 'Gestión de cuentas y vinculación',
-        'multi_language': 'Soporte multiidioma',
-        'six_languages': 'Soporte para 6 idiomas',
-        'responsive_design': 'Diseño responsivo',
-        'mobile_friendly': 'Amigable para móviles',
-        'technology': 'Stack tecnológico',
-        'backend': 'Backend',
-        'frontend': 'Frontend',
-        'styling': 'Estilos',
-        'games': 'Juegos',
-        'deployment': 'Despliegue',
-        'total_users': 'Total de usuarios',
-        'total_posts': 'Total de publicaciones',
-        'total_games': 'Cantidad de juegos',
-        'total_downloads': 'Elementos de descarga',
-        'calculating': 'Calculando...',
-        'account_binding': 'Vinculación de cuenta',
-        'email_binding': 'Vinculación de email',
-        'phone_binding': 'Vinculación de teléfono',
-        'enter_email': 'Ingresa email',
-        'enter_phone': 'Ingresa número de teléfono',
-        'enter_code': 'Ingresa código de verificación',
-        'send_code': 'Enviar código',
-        'bind_email': 'Vincular email',
-        'bind_phone': 'Vincular teléfono',
-        'batch_delete': 'Eliminación masiva',
-        'website_version': 'Versión del sitio web',
-        'launch_date': 'Fecha de lanzamiento',
-        'developer': 'Desarrollador',
-        'features': 'Características principales',
-        'tech_stack': 'Stack tecnológico',
-        'statistics': 'Estadísticas del sitio web',
-        'disclaimer': 'Descargo de responsabilidad',
-        'disclaimer_content': 'Este sitio web es solo para fines educativos y de entretenimiento. Los usuarios deben cumplir con las leyes y regulaciones relevantes al usar este sitio web. El sitio web no se hace responsable del comportamiento del usuario.'
-    }
-}
+# 各语言文案存放在 translations/<lang>.json，首次使用某语言时才加载
+TRANSLATIONS_DIR = os.path.join(BASE_DIR, 'translations')
+LANG_TEXT = LazyCatalogs(TRANSLATIONS_DIR, LANGUAGES)
+
+@app.cli.command('compile-translations')
+def compile_translations_command():
+    """把 translations/*.json 编译为加载更快的 marshal 文件"""
+    for lang in compile_catalogs(TRANSLATIONS_DIR, LANGUAGES):
+        print(f'compiled {lang}')
 
 def get_lang():
     return session.get('lang', 'zh')
@@ -1227,120 +318,80 @@ def index():
         # 确保将id也添加到 display_posts 中
         display_posts.append({'id': post['id'], 'title': post['title'], 'content': display_content, 'image_urls': post.get('image_urls', [])})
 
-    return render_template('index.html', posts=display_posts, user=user, lang=lang, languages=LANGUAGES, year=year, text=text, CODE_TIPS=CODE_TIPS)
+    return stream_template('index.html', posts=display_posts, user=user, lang=lang, languages=LANGUAGES, year=year, text=text, CODE_TIPS=CODE_TIPS)
 
 
+# 游戏相关页面只随 lang/user/year 变化：按语言预渲染，请求时只替换用户相关片段
+STATIC_PAGES = ['games.html', 'game_snake.html', 'game_tetris.html', 'game_pacman.html', 'game_breakout.html', 'game_memory.html', 'game_2048.html', 'game_sudoku.html', 'game_minesweeper.html', 'game_asteroids.html', 'game_pong.html', 'game_flappy.html', 'game_tank.html', 'join.html']
+prerendered_pages = PrerenderedPages(app, os.path.join(BASE_DIR, 'build', 'pages'), TRANSLATIONS_DIR,
+                                     [BUILD_TEMPLATES_DIR, os.path.join(BASE_DIR, 'templates')])
+
+def render_static_page(template_name):
+    lang = get_lang()
+    return prerendered_pages.render(template_name, lang, LANG_TEXT[lang], LANGUAGES,
+                                    user=session.get('user'), year=datetime.datetime.now().year)
+
+@app.cli.command('prerender-pages')
+def prerender_pages_command():
+    """部署时按语言预渲染游戏页面到 build/pages"""
+    written = prerendered_pages.prerender_all(STATIC_PAGES, LANG_TEXT, list(LANGUAGES))
+    print(f'prerendered {written} pages')
+
 @app.route('/games')
 def games():
-    user = session.get('user')
-    lang = get_lang()
-    year = datetime.datetime.now().year
-    text = LANG_TEXT[lang]
-    return render_template('games.html', user=user, lang=lang, languages=LANGUAGES, year=year, text=text)
+    return render_static_page('games.html')
 
 @app.route('/game/snake')
 def game_snake():
-    user = session.get('user')
-    lang = get_lang()
-    year = datetime.datetime.now().year
-    text = LANG_TEXT[lang]
-    return render_template('game_snake.html', user=user, lang=lang, languages=LANGUAGES, year=year, text=text)
+    return render_static_page('game_snake.html')
 
 @app.route('/game/tetris')
 def game_tetris():
-    user = session.get('user')
-    lang = get_lang()
-    year = datetime.datetime.now().year
-    text = LANG_TEXT[lang]
-    return render_template('game_tetris.html', user=user, lang=lang, languages=LANGUAGES, year=year, text=text)
+    return render_static_page('game_tetris.html')
 
 @app.route('/game/pacman')
 def game_pacman():
-    user = session.get('user')
-    lang = get_lang()
-    year = datetime.datetime.now().year
-    text = LANG_TEXT[lang]
-    return render_template('game_pacman.html', user=user, lang=lang, languages=LANGUAGES, year=year, text=text)
+    return render_static_page('game_pacman.html')
 
 @app.route('/game/breakout')
 def game_breakout():
-    user = session.get('user')
-    lang = get_lang()
-    year = datetime.datetime.now().year
-    text = LANG_TEXT[lang]
-    return render_template('game_breakout.html', user=user, lang=lang, languages=LANGUAGES, year=year, text=text)
+    return render_static_page('game_breakout.html')
 
 @app.route('/game/memory')
 def game_memory():
-    user = session.get('user')
-    lang = get_lang()
-    year = datetime.datetime.now().year
-    text = LANG_TEXT[lang]
-    return render_template('game_memory.html', user=user, lang=lang, languages=LANGUAGES, year=year, text=text)
+    return render_static_page('game_memory.html')
 
 @app.route('/game/2048')
 def game_2048():
-    user = session.get('user')
-    lang = get_lang()
-    year = datetime.datetime.now().year
-    text = LANG_TEXT[lang]
-    return render_template('game_2048.html', user=user, lang=lang, languages=LANGUAGES, year=year, text=text)
+    return render_static_page('game_2048.html')
 
 @app.route('/game/sudoku')
 def game_sudoku():
-    user = session.get('user')
-    lang = get_lang()
-    year = datetime.datetime.now().year
-    text = LANG_TEXT[lang]
-    return render_template('game_sudoku.html', user=user, lang=lang, languages=LANGUAGES, year=year, text=text)
+    return render_static_page('game_sudoku.html')
 
 @app.route('/game/minesweeper')
 def game_minesweeper():
-    user = session.get('user')
-    lang = get_lang()
-    year = datetime.datetime.now().year
-    text = LANG_TEXT[lang]
-    return render_template('game_minesweeper.html', user=user, lang=lang, languages=LANGUAGES, year=year, text=text)
+    return render_static_page('game_minesweeper.html')
 
 @app.route('/game/asteroids')
 def game_asteroids():
-    user = session.get('user')
-    lang = get_lang()
-    year = datetime.datetime.now().year
-    text = LANG_TEXT[lang]
-    return render_template('game_asteroids.html', user=user, lang=lang, languages=LANGUAGES, year=year, text=text)
+    return render_static_page('game_asteroids.html')
 
 @app.route('/game/pong')
 def game_pong():
-    user = session.get('user')
-    lang = get_lang()
-    year = datetime.datetime.now().year
-    text = LANG_TEXT[lang]
-    return render_template('game_pong.html', user=user, lang=lang, languages=LANGUAGES, year=year, text=text)
+    return render_static_page('game_pong.html')
 
 @app.route('/game/flappy')
 def game_flappy():
-    user = session.get('user')
-    lang = get_lang()
-    year = datetime.datetime.now().year
-    text = LANG_TEXT[lang]
-    return render_template('game_flappy.html', user=user, lang=lang, languages=LANGUAGES, year=year, text=text)
+    return render_static_page('game_flappy.html')
 
 @app.route('/game/tank')
 def game_tank():
-    user = session.get('user')
-    lang = get_lang()
-    year = datetime.datetime.now().year
-    text = LANG_TEXT[lang]
-    return render_template('game_tank.html', user=user, lang=lang, languages=LANGUAGES, year=year, text=text)
+    return render_static_page('game_tank.html')
 
 @app.route('/join')
 def join():
-    user = session.get('user')
-    lang = get_lang()
-    year = datetime.datetime.now().year
-    text = LANG_TEXT[lang]
-    return render_template('join.html', user=user, lang=lang, languages=LANGUAGES, year=year, text=text)
+    return render_static_page('join.html')
 
 @app.route('/downloads')
 def downloads():
@@ -1358,7 +409,7 @@ def downloads():
             'comments': download_comments,
             'index': i
         })
-    return render_template('downloads.html', downloads=downloads_store, downloads_with_comments=downloads_with_comments, user=user, lang=lang, languages=LANGUAGES, year=year, text=text)
+    return stream_template('downloads.html', downloads=downloads_store, downloads_with_comments=downloads_with_comments, user=user, lang=lang, languages=LANGUAGES, year=year, text=text)
 
 @app.route('/admin/new_download', methods=['GET', 'POST'])
 def new_download():
@@ -1573,10 +624,6 @@ POSTS_FILE = os.path.join(BASE_DIR, 'posts.json')
 UPLOAD_FOLDER = os.path.join(BASE_DIR, 'static', 'uploads')
 UPLOAD_URL_PREFIX = '/static/uploads'
 
-# 确保上传目录存在
-if not os.path.exists(UPLOAD_FOLDER):
-    os.makedirs(UPLOAD_FOLDER)
-
 # 加载文章数据
 def load_posts():
     global blog_posts
@@ -1877,47 +924,360 @@ def batch_delete_downloads():
 verification_codes = {}
 
 # 游戏房间管理系统
-game_rooms = {}
+game_rooms = RoomRegistry()  # room_id -> GameRoom，并按游戏类型索引可加入的房间
 user_sessions = {}  # 存储用户会话信息
-matching_queue = {}  # 匹配队列
-
-class GameRoom:
-    def __init__(self, room_id, game_type, max_players=4):
-        self.room_id = room_id
-        self.game_type = game_type
-        self.max_players = max_players
-        self.players = []
-        self.owner = None
-        self.status = 'waiting'  # waiting, playing, finished
-        self.created_at = time.time()
-        self.game_data = {}
-    
-    def add_player(self, user_id, username):
-        if len(self.players) < self.max_players and user_id not in [p['id'] for p in self.players]:
-            player = {
-                'id': user_id,
-                'username': username,
-                'joined_at': time.time(),
-                'ready': False
-            }
-            self.players.append(player)
-            if not self.owner:
-                self.owner = user_id
-            return True
-        return False
-    
-    def remove_player(self, user_id):
-        self.players = [p for p in self.players if p['id'] != user_id]
-        if self.owner == user_id and self.players:
-            self.owner = self.players[0]['id']
-        elif not self.players:
-            self.owner = None
-    
-    def is_full(self):
-        return len(self.players) >= self.max_players
-    
-    def can_start(self):
-        return len(self.players) >= 2 and all(p['ready'] for p in self.players)
+# 匹配队列：按游戏类型分队列，队列内按评分分桶，可接受的评分范围随等待时间放宽
+app.config.update(
+    MATCH_BUCKET_WIDTH=int(os.environ.get('MATCH_BUCKET_WIDTH', 100)),
+    MATCH_WIDEN_AFTER=float(os.environ.get('MATCH_WIDEN_AFTER', 5)),
+    MATCH_MAX_SPREAD=int(os.environ.get('MATCH_MAX_SPREAD', 10)),
+    RATINGS_FLUSH_INTERVAL=int(os.environ.get('RATINGS_FLUSH_INTERVAL', 30)),
+    LEADERBOARD_FLUSH_INTERVAL=int(os.environ.get('LEADERBOARD_FLUSH_INTERVAL', 30)),
+    # 评分相近的候选中优先选 RTT 相近的玩家：RTT 相差 MATCH_RTT_SCALE 毫秒与评分相差一个桶同等看待，0 表示不考虑 RTT
+    MATCH_RTT_SCALE=float(os.environ.get('MATCH_RTT_SCALE', 50)),
+    # 服务器发 rtt_ping 的间隔（秒），0 表示不测量
+    RTT_PING_INTERVAL=float(os.environ.get('RTT_PING_INTERVAL', 5)),
+)
+matching_queue = RatedMatchmakingEngine(
+    room_size=DEFAULT_ROOM_SIZE,
+    bucket_width=app.config['MATCH_BUCKET_WIDTH'],
+    widen_after=app.config['MATCH_WIDEN_AFTER'],
+    max_spread=app.config['MATCH_MAX_SPREAD'],
+    rtt_scale=app.config['MATCH_RTT_SCALE'],
+)
+MATCH_TIMEOUT = 30  # 匹配超时秒数
+
+# 各游戏类型的评分（ratings/<game_type>.json），对局结束时更新，定期写回
+RATINGS_DIR = os.path.join(BASE_DIR, 'ratings')
+rating_store = RatingStore(RATINGS_DIR)
+
+def rating_key(username):
+    """评分按注册用户名记录；游客每次登录都是新身份，不记录评分"""
+    return username if username and username != '游客' else None
+
+# 单人游戏排行榜（日榜 / 周榜 / 总榜）：常驻内存，定期写回 leaderboards/<game_type>.json；
+# 扫雷、数独按用时（秒）、记忆翻牌按步数，越小越好，其余按得分
+LEADERBOARD_GAMES = {game_type: game_type in ('minesweeper', 'sudoku', 'memory') for game_type in ONLINE_GAME_TYPES}
+# 越小越好的榜单上不可能达到的成绩直接拒绝：用时至少 1 秒，记忆翻牌 8 对至少翻 8 次
+LEADERBOARD_MIN_SCORES = {'minesweeper': 1, 'sudoku': 1, 'memory': 8}
+LEADERBOARDS_DIR = os.path.join(BASE_DIR, 'leaderboards')
+leaderboard_store = LeaderboardStore(LEADERBOARDS_DIR, LEADERBOARD_GAMES)
+
+# 数独题库：sudoku_bank/<difficulty>.txt 预先生成并随代码提交（每个难度 SUDOKU_BANK_SIZE 题，生成约需 2 分钟，
+# 不能放在启动流程里）；各 worker 每 SUDOKU_BANK_REFRESH 秒读入新增的题，在运行中的实例上执行 build-sudoku-bank 补题也会被读入
+app.config.update(
+    SUDOKU_BANK_SIZE=int(os.environ.get('SUDOKU_BANK_SIZE', 500)),
+    SUDOKU_BANK_REFRESH=float(os.environ.get('SUDOKU_BANK_REFRESH', 10)),
+)
+SUDOKU_BANK_DIR = os.environ.get('SUDOKU_BANK_DIR', os.path.join(BASE_DIR, 'sudoku_bank'))
+puzzle_bank = PuzzleBank(SUDOKU_BANK_DIR, target=app.config['SUDOKU_BANK_SIZE'])
+
+@app.cli.command('build-sudoku-bank')
+def build_sudoku_bank_command():
+    """离线补足数独题库（已有的题保留，只生成不足的部分），生成后提交 sudoku_bank/"""
+    start = time.time()
+    added = fill_bank(SUDOKU_BANK_DIR, app.config['SUDOKU_BANK_SIZE'], random.SystemRandom())
+    print(f'sudoku bank: generated {added} puzzles in {time.time() - start:.1f}s')
+
+# 连接 RTT：平滑值存在 user_sessions[user_id]['rtt']，分布按会话当前的游戏类型统计
+rtt_tracker = RttTracker()
+
+# 所有延时事件（匹配超时等）共用一个后台任务，兼容 Socket.IO 的各种异步模式
+scheduler = TimerScheduler(socketio.start_background_task, socketio.sleep)
+
+# 过期对象回收：TTL（秒）可通过环境变量配置
+app.config.update(
+    REAPER_INTERVAL=int(os.environ.get('REAPER_INTERVAL', 60)),
+    REAPER_SESSION_TTL=int(os.environ.get('REAPER_SESSION_TTL', 1800)),
+    REAPER_ROOM_TTL=int(os.environ.get('REAPER_ROOM_TTL', 600)),
+    REAPER_QUEUE_TTL=int(os.environ.get('REAPER_QUEUE_TTL', 300)),
+    # 断线后保留座位和会话的秒数，期间重连可恢复房间；0 表示断线立即离开房间
+    RECONNECT_GRACE=int(os.environ.get('RECONNECT_GRACE', 30)),
+)
+
+# 大厅订阅：可加入房间的变化合并后每 LOBBY_UPDATE_INTERVAL 秒最多推送一次
+app.config['LOBBY_UPDATE_INTERVAL'] = float(os.environ.get('LOBBY_UPDATE_INTERVAL', 1))
+lobby_feed = LobbyFeed(game_rooms, lambda event, payload, to: socketio.emit(event, payload, to=to))
+game_rooms.on_open_change = lobby_feed.room_changed
+
+def is_socket_connected(sid):
+    return bool(sid) and socketio.server.manager.is_connected(sid, '/')
+
+def _emit_to(event, payload, to):
+    if to in game_rooms:
+        emit_room_event(to, event, payload)
+    else:
+        socketio.emit(event, payload, to=to)
+
+def emit_room_event(room_id, event, payload):
+    """向房间广播事件，并记入房间的事件缓冲（带序号），供断线重连的玩家补发"""
+    room = game_rooms.get(room_id)
+    if room is not None:
+        payload = dict(payload, seq=room.events.append(event, payload))
+    replay_recorder.record_event(room_id, event, payload)
+    socketio.emit(event, payload, to=room_id)
+
+# 分片路由：匹配队列和房间的操作在负责该游戏类型 / 房间的分片上执行，
+# 目标是本分片时直接调用，否则经总线转发；用户会话（sid、current_room）留在连接所在的 worker
+shard_ops = {}  # 操作名 -> 函数
+shard_client = ShardClient(message_bus, SHARD_ID) if message_bus is not None else None
+
+def shard_op(func):
+    shard_ops[func.__name__] = func
+    return func
+
+def route_to_shard(shard, op, **args):
+    if shard == shard_router.shard_id or message_bus is None:
+        return shard_ops[op](**args)
+    message_bus.publish(f'shard.{shard}', {'op': op, 'args': args})
+
+def _handle_shard_message(message):
+    result = shard_ops[message['op']](**message['args'])
+    if 'reply_to' in message:
+        shard_client.reply(message, result)
+
+def update_session(user_id, **fields):
+    """更新用户会话字段；会话不在本进程时通知其他 worker"""
+    user_session = user_sessions.get(user_id)
+    if user_session is not None:
+        user_session.update(fields)
+    elif message_bus is not None and shard_router.shard_count > 1:
+        message_bus.publish('sessions', {'user_id': user_id, 'fields': fields})
+
+def _handle_session_update(message):
+    user_session = user_sessions.get(message['user_id'])
+    if user_session is not None:
+        user_session.update(message['fields'])
+
+# 服务器权威模拟：tick 频率可通过环境变量配置
+app.config['TICK_RATE'] = int(os.environ.get('TICK_RATE', 20))
+# tank/asteroids 房间用 NumPy 批量推进，设为 0 时逐房间模拟
+app.config['VECTORIZED_PHYSICS'] = os.environ.get('VECTORIZED_PHYSICS', '1') != '0'
+
+# 状态快照以 MessagePack 二进制帧下发，并相对各玩家已确认的 tick 做增量压缩
+snapshot_streams = {}  # room_id -> SnapshotStream
+
+def _broadcast_snapshot(room_id, snapshot):
+    stream = snapshot_streams.get(room_id)
+    if stream is None:
+        stream = snapshot_streams[room_id] = SnapshotStream()
+    room = game_rooms.get(room_id)
+    recipients = room.player_ids() if room is not None else []
+    for user_id, frame in stream.encode(snapshot['tick'], snapshot, recipients).items():
+        socketio.emit('state', frame, to=user_id)
+    spectator_feed.offer(room_id, snapshot)
+    replay_recorder.record_tick(room_id, snapshot)
+
+def _finish_game(room_id, simulation, reason='finished'):
+    """对局结束：记录结果并通知房间内玩家"""
+    room = game_rooms.get(room_id)
+    snapshot_streams.pop(room_id, None)
+    result = {'winner': simulation.winner, 'ticks': simulation.tick}
+    if room is not None:
+        room.game_data.update(result, finished_at=time.time())
+        room.status = 'finished'
+        if reason == 'finished':
+            record_ratings(room, simulation.winner)
+    emit_room_event(room_id, 'game_over', dict(result, room_id=room_id, reason=reason))
+    end_spectating(room_id, dict(result, room_id=room_id, reason=reason))
+    replay_recorder.finish(room_id)
+
+def record_ratings(room, winner):
+    """按对局结果更新评分；只有游客参加的对局不计分"""
+    player_ids = room.player_ids()
+    keys = [rating_key(room.get_player(uid).username) for uid in player_ids]
+    if len(keys) < 2 or not any(keys):
+        return
+    winner_index = player_ids.index(winner) if winner in player_ids else None
+    rating_store.record_result(room.game_type, keys, winner_index)
+
+# 房间聊天：tick 内第一条立即广播，其余合并到下一个 tick 一起发
+chat_batcher = ChatBatcher(
+    lambda room_id, messages: socketio.emit('chat', {'room_id': room_id, 'messages': messages}, to=room_id),
+    interval=1 / app.config['TICK_RATE'],
+)
+
+# 观战：观众不占座位，按 SPECTATOR_RATE（帧/秒）收到合并后的快照，扇出在定时任务中进行，不占用 tick 循环
+app.config['SPECTATOR_RATE'] = int(os.environ.get('SPECTATOR_RATE', 5))
+app.config['SPECTATOR_LIMIT'] = int(os.environ.get('SPECTATOR_LIMIT', 500))
+spectator_feed = SpectatorFeed(
+    lambda event, payload, to: socketio.emit(event, payload, to=to),
+    rate=app.config['SPECTATOR_RATE'],
+    keyframe_every=max(1, 2 * app.config['SPECTATOR_RATE']),  # 约每 2 秒一个关键帧
+    max_spectators=app.config['SPECTATOR_LIMIT'],
+)
+
+def end_spectating(room_id, payload):
+    """对局结束或房间关闭：通知观众并关闭观战房间"""
+    if spectator_feed.end(room_id, payload):
+        socketio.close_room(spectate_room(room_id), namespace='/')
+
+# 对局录像（可选）：服务器模拟的对局按 tick 记录输入、房间事件和状态增量到 replays/<room_id>.rpl，
+# 编码和写文件在后台线程，tick 循环只入队，每个 tick 结束后才唤醒写线程
+app.config['RECORD_REPLAYS'] = os.environ.get('RECORD_REPLAYS', '0') == '1'
+REPLAYS_DIR = os.environ.get('REPLAYS_DIR', os.path.join(BASE_DIR, 'replays'))
+replay_recorder = ReplayRecorder(REPLAYS_DIR)
+
+tick_engine = TickEngine(
+    _broadcast_snapshot,
+    on_finish=_finish_game,
+    tick_rate=app.config['TICK_RATE'],
+    start_background_task=socketio.start_background_task,
+    sleep=socketio.sleep,
+    vectorized=app.config['VECTORIZED_PHYSICS'],
+    max_players=DEFAULT_ROOM_SIZE,
+    on_tick_end=replay_recorder.end_tick,
+)
+
+def _close_socket_room(room_id):
+    tick_engine.stop_room(room_id)
+    snapshot_streams.pop(room_id, None)
+    end_spectating(room_id, {'room_id': room_id, 'reason': 'closed'})
+    replay_recorder.finish(room_id)
+    socketio.close_room(room_id, namespace='/')
+
+def discard_room(room_id):
+    """删除房间并停止其模拟"""
+    game_rooms.remove(room_id)
+    tick_engine.stop_room(room_id)
+    snapshot_streams.pop(room_id, None)
+    end_spectating(room_id, {'room_id': room_id, 'reason': 'closed'})
+    replay_recorder.finish(room_id)
+
+reaper = Reaper(
+    user_sessions, game_rooms, matching_queue,
+    notify=_emit_to,
+    close_room=_close_socket_room,
+    cancel_timer=scheduler.cancel,
+    is_connected=is_socket_connected,
+    session_ttl=app.config['REAPER_SESSION_TTL'],
+    room_ttl=app.config['REAPER_ROOM_TTL'],
+    queue_ttl=app.config['REAPER_QUEUE_TTL'],
+    reconnect_grace=app.config['RECONNECT_GRACE'],
+)
+_background_jobs = []
+
+def start_background_jobs():
+    """启动周期性后台任务（每个 worker 一次，在 create_app 中调用）"""
+    if not _background_jobs:
+        _background_jobs.append(scheduler.call_every(app.config['REAPER_INTERVAL'], reaper.run))
+        # 等待中的玩家评分范围放宽后重新搜索
+        _background_jobs.append(scheduler.call_every(app.config['MATCH_WIDEN_AFTER'], sweep_matches))
+        _background_jobs.append(scheduler.call_every(app.config['RATINGS_FLUSH_INTERVAL'], rating_store.flush))
+        _background_jobs.append(scheduler.call_every(app.config['LEADERBOARD_FLUSH_INTERVAL'],
+                                                     leaderboard_store.flush))
+        puzzle_bank.refresh()
+        _background_jobs.append(scheduler.call_every(app.config['SUDOKU_BANK_REFRESH'], puzzle_bank.refresh))
+        _background_jobs.append(scheduler.call_every(app.config['LOBBY_UPDATE_INTERVAL'], lobby_feed.flush))
+        _background_jobs.append(scheduler.call_every(chat_batcher.interval, chat_batcher.flush))
+        _background_jobs.append(scheduler.call_every(spectator_feed.interval, spectator_feed.flush))
+        _background_jobs.append(scheduler.call_every(app.config['OUTBOUND_SWEEP_INTERVAL'],
+                                                     socketio.server.manager.sweep))
+        if app.config['RTT_PING_INTERVAL'] > 0:
+            _background_jobs.append(scheduler.call_every(app.config['RTT_PING_INTERVAL'], ping_sessions))
+        shutdown_hooks.append(rating_store.flush)
+        shutdown_hooks.append(leaderboard_store.flush)
+        shutdown_hooks.append(replay_recorder.close)
+        if message_bus is not None:
+            message_bus.subscribe(f'shard.{shard_router.shard_id}', _handle_shard_message)
+            message_bus.subscribe('sessions', _handle_session_update)
+            message_bus.start(socketio.start_background_task)
+
+def ping_sessions():
+    """周期任务：向本 worker 上所有在线连接发 rtt_ping"""
+    for user_session in list(user_sessions.values()):
+        if user_session.get('sid'):
+            socketio.emit('rtt_ping', rtt_tracker.ping(user_session), to=user_session['sid'])
+
+def touch_session(user_id):
+    """记录会话最近活跃时间"""
+    user_session = user_sessions.get(user_id)
+    if user_session:
+        user_session['last_seen'] = time.time()
+
+# 连接上限（每个 worker 进程），0 表示不限制；超过上限的新连接直接拒绝
+app.config['MAX_CONNECTIONS'] = int(os.environ.get('SOCKETIO_MAX_CONNECTIONS', 5000))
+active_connections = 0
+_connections_lock = threading.Lock()
+
+# 流量控制：入站事件按连接和事件类型用令牌桶限流（SOCKET_RATE_LIMITS="事件=每秒/容量,..." 覆盖默认预算）；
+# 出站按各连接的发送队列长度：超过软上限时丢弃状态帧（含观战帧）和 rtt_ping、合并大厅完整列表，超过硬上限时断开
+app.config.update(
+    SOCKET_RATE_LIMITS=parse_budgets(os.environ.get('SOCKET_RATE_LIMITS')),
+    OUTBOUND_SOFT_LIMIT=int(os.environ.get('OUTBOUND_SOFT_LIMIT', 64)),
+    OUTBOUND_HARD_LIMIT=int(os.environ.get('OUTBOUND_HARD_LIMIT', 1024)),
+    OUTBOUND_SWEEP_INTERVAL=float(os.environ.get('OUTBOUND_SWEEP_INTERVAL', 1)),
+)
+rate_limiter = EventRateLimiter(app.config['SOCKET_RATE_LIMITS'])
+socketio.server.manager.configure(
+    drop=('state', 'spectate_state', 'rtt_ping'),
+    coalesce=('lobby_rooms',),
+    soft_limit=app.config['OUTBOUND_SOFT_LIMIT'],
+    hard_limit=app.config['OUTBOUND_HARD_LIMIT'],
+)
+
+def rate_limited(event):
+    """按连接对事件限流，超出预算的事件直接丢弃；每轮限流只通知客户端一次"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args):
+            bucket = rate_limiter.allow(request.sid, event)
+            if bucket is None:
+                return func(*args)
+            if bucket.denied == 1:
+                emit('rate_limited', {'event': event, 'retry_after': round(bucket.retry_after(), 2)})
+        return wrapper
+    return decorator
+
+# 优雅关闭：shutting_down 置位后拒绝新连接、新匹配和开局
+shutting_down = threading.Event()
+shutdown_hooks = []  # 关闭时依次调用的刷新函数（后台写入队列等在此注册）
+
+def reject_if_shutting_down(sid):
+    if shutting_down.is_set():
+        socketio.emit('error', {'message': '服务器即将重启，暂停匹配和开局'}, to=sid)
+        return True
+    return False
+
+def graceful_shutdown(drain_timeout=30, poll_interval=0.5):
+    """等待进行中的对局结束（最多 drain_timeout 秒），强制结束剩余对局，
+    执行刷新钩子并停止后台任务。返回被强制结束的对局数"""
+    if shutting_down.is_set():
+        return 0
+    shutting_down.set()
+    socketio.emit('server_shutdown', {'message': '服务器即将重启，进行中的对局结束后将断开连接',
+                                      'drain_timeout': drain_timeout})
+    for game_type in list(matching_queue.game_types()):
+        for entry in matching_queue.entries(game_type):
+            leave_matching_queue(entry.user_id)
+
+    deadline = time.time() + drain_timeout
+    while tick_engine.rooms and time.time() < deadline:
+        socketio.sleep(poll_interval)
+    aborted = 0
+    for room_id in list(tick_engine.rooms):
+        room_sim = tick_engine.stop_room(room_id)
+        if room_sim is not None:
+            _finish_game(room_id, room_sim.simulation, reason='shutdown')
+            aborted += 1
+
+    for hook in shutdown_hooks:
+        try:
+            hook()
+        except Exception as e:
+            print(f"Error in shutdown hook {getattr(hook, '__name__', hook)}: {e}")
+    scheduler.stop()
+    tick_engine.stop()
+    # 让已排队的消息（game_over 等）发出
+    socketio.sleep(poll_interval)
+    return aborted
+
+def leave_matching_queue(user_id):
+    """离开匹配队列并取消其超时定时器"""
+    entry = matching_queue.cancel(user_id)
+    if entry:
+        scheduler.cancel(entry.timer)
+    return entry
 
 @app.route('/send_email_code', methods=['POST'])
 def send_email_code():
@@ -2105,6 +1465,218 @@ def api_stats():
             'downloads': 0
         })
 
+@app.route('/api/online/stats')
+def online_stats():
+    return jsonify({
+        'success': True,
+        'sessions': len(user_sessions),
+        'connections': active_connections,
+        'max_connections': app.config['MAX_CONNECTIONS'],
+        'async_mode': socketio.async_mode,
+        'shutting_down': shutting_down.is_set(),
+        'shard': {'id': shard_router.shard_id, 'count': shard_router.shard_count,
+                  'game_types': shard_router.game_types_for(shard_router.shard_id)},
+        'rooms': len(game_rooms),
+        'queued': len(matching_queue),
+        'scheduler': scheduler.stats(),
+        'reaper': reaper.stats(),
+        'chat': chat_batcher.stats(),
+        'spectators': spectator_feed.stats(),
+        'replays': replay_recorder.stats(),
+        'flow_control': {'inbound': rate_limiter.stats(), 'outbound': socketio.server.manager.flow_stats()}
+    })
+
+@app.route('/api/online/ticks')
+def tick_stats():
+    """tick 耗时直方图，用于评估单进程可承载的房间数"""
+    return jsonify({'success': True, **tick_engine.stats()})
+
+@app.route('/api/online/rtt')
+def rtt_stats():
+    """本 worker 上各游戏类型的 RTT 分布（lobby 为未进入匹配或房间的连接）"""
+    return jsonify({'success': True, 'shard': shard_router.shard_id, 'game_types': rtt_tracker.stats()})
+
+@app.route('/api/replays/<room_id>')
+def download_replay(room_id):
+    """以流的方式返回对局录像（mmap 分块读取）；录制中的对局返回已写入的部分"""
+    path = replay_path(REPLAYS_DIR, room_id)
+    if path is None or not os.path.isfile(path):
+        return jsonify({'success': False, 'message': '录像不存在'}), 404
+    size = os.path.getsize(path)
+    return Response(iter_chunks(path, limit=size), mimetype='application/octet-stream',
+                    headers={'Content-Disposition': f'attachment; filename={room_id}.rpl',
+                             'Content-Length': str(size)})
+
+@app.route('/api/matchmaking/stats')
+def matchmaking_stats():
+    return jsonify({'success': True, 'queues': matching_queue.stats(), 'ratings': rating_store.stats(),
+                    'leaderboards': leaderboard_store.stats(),
+                    'lobby': lobby_feed.stats(), 'scheduler': scheduler.stats()})
+
+@app.route('/api/ratings/<game_type>')
+def my_rating(game_type):
+    """当前用户在某游戏类型的评分（游客返回默认评分）"""
+    key = rating_key(session.get('user'))
+    shard = shard_router.shard_for_game(game_type)
+    if shard == shard_router.shard_id or shard_client is None:
+        rating = get_rating(game_type, key)
+    else:
+        try:
+            rating = shard_client.request(f'shard.{shard}', 'get_rating', game_type=game_type, key=key)
+        except TimeoutError:
+            return jsonify({'success': False, 'message': '评分暂时不可用'}), 503
+    return jsonify({'success': True, 'game_type': game_type, 'rated': key is not None, **rating})
+
+@shard_op
+def get_rating(game_type, key):
+    return rating_store.get(game_type, key).to_dict()
+
+@app.route('/api/scores/<game_type>', methods=['POST'])
+def submit_score(game_type):
+    """提交单人游戏成绩，返回各周期榜单上的名次和最好成绩"""
+    if game_type not in LEADERBOARD_GAMES:
+        return jsonify({'success': False, 'message': '未知的游戏类型'}), 404
+    key = rating_key(session.get('user'))
+    if key is None:
+        return jsonify({'success': False, 'message': '登录后成绩才能上榜'}), 403
+    data = request.get_json(silent=True) or {}
+    score = data.get('score')
+    if isinstance(score, bool) or not isinstance(score, (int, float)) or not math.isfinite(score) \
+            or not LEADERBOARD_MIN_SCORES.get(game_type, 0) <= score <= MAX_SCORE:
+        return jsonify({'success': False, 'message': '成绩无效'}), 400
+    if game_type == 'sudoku':
+        # 数独成绩要附带题库中的题目和填好的答案
+        puzzle, solution = data.get('puzzle'), data.get('solution')
+        if not isinstance(puzzle, str) or puzzle not in puzzle_bank or not is_solution(puzzle, solution):
+            return jsonify({'success': False, 'message': '成绩无效'}), 400
+    shard = shard_router.shard_for_game(game_type)
+    if shard == shard_router.shard_id or shard_client is None:
+        result = record_score(game_type, key, score)
+    else:
+        try:
+            result = shard_client.request(f'shard.{shard}', 'record_score', game_type=game_type, key=key, score=score)
+        except TimeoutError:
+            return jsonify({'success': False, 'message': '排行榜暂时不可用'}), 503
+    return jsonify({'success': True, 'game_type': game_type, 'periods': result})
+
+@shard_op
+def record_score(game_type, key, score):
+    return leaderboard_store.submit(game_type, key, score)
+
+@app.route('/api/leaderboards/<game_type>')
+def get_leaderboard(game_type):
+    """排行榜前 N 名（?period=daily|weekly|all&limit=N），登录用户附带自己的名次"""
+    period = request.args.get('period', 'all')
+    if game_type not in LEADERBOARD_GAMES or period not in PERIODS:
+        return jsonify({'success': False, 'message': '排行榜不存在'}), 404
+    limit = min(max(request.args.get('limit', 10, type=int), 1), 100)
+    key = rating_key(session.get('user'))
+    shard = shard_router.shard_for_game(game_type)
+    if shard == shard_router.shard_id or shard_client is None:
+        result = leaderboard_query(game_type, period, limit, key)
+    else:
+        try:
+            result = shard_client.request(f'shard.{shard}', 'leaderboard_query',
+                                          game_type=game_type, period=period, limit=limit, key=key)
+        except TimeoutError:
+            return jsonify({'success': False, 'message': '排行榜暂时不可用'}), 503
+    return jsonify({'success': True, 'game_type': game_type, **result})
+
+@shard_op
+def leaderboard_query(game_type, period, limit, key):
+    result = leaderboard_store.top(game_type, period, limit)
+    result['me'] = leaderboard_store.rank(game_type, period, key) if key is not None else None
+    return result
+
+@app.route('/api/sudoku/<difficulty>')
+def get_sudoku(difficulty):
+    """从预生成的题库中随机取一道有唯一解的数独（easy / medium / hard / expert）"""
+    if difficulty not in DIFFICULTIES:
+        return jsonify({'success': False, 'message': '未知的难度'}), 404
+    puzzle = puzzle_bank.take(difficulty)
+    if puzzle is None:
+        return jsonify({'success': False, 'message': '题库生成中，请稍后再试'}), 503
+    return jsonify({'success': True, 'difficulty': difficulty, 'puzzle': puzzle})
+
+@app.route('/api/sudoku/stats')
+def sudoku_stats():
+    return jsonify({'success': True, **puzzle_bank.stats()})
+
+@app.route('/api/rooms/<game_type>')
+def list_open_rooms(game_type):
+    """大厅分页查询可加入的房间"""
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', 20, type=int), 1), 100)
+    shard = shard_router.shard_for_game(game_type)
+    if shard == shard_router.shard_id or shard_client is None:
+        result = list_rooms(game_type, page, per_page)
+    else:
+        # 该游戏类型的房间在其他 worker 上，经总线查询
+        try:
+            result = shard_client.request(f'shard.{shard}', 'list_rooms',
+                                          game_type=game_type, page=page, per_page=per_page)
+        except TimeoutError:
+            return jsonify({'success': False, 'message': '房间列表暂时不可用'}), 503
+    return jsonify({'success': True, **result})
+
+@app.route('/api/rooms/<game_type>/live')
+def list_live_rooms(game_type):
+    """可观战的进行中对局（服务器模拟的房间），附带当前观众数"""
+    if game_type not in ONLINE_GAME_TYPES:
+        return jsonify({'success': False, 'message': '未知的游戏类型'}), 404
+    shard = shard_router.shard_for_game(game_type)
+    if shard == shard_router.shard_id or shard_client is None:
+        rooms = live_rooms(game_type)
+    else:
+        try:
+            rooms = shard_client.request(f'shard.{shard}', 'live_rooms', game_type=game_type)
+        except TimeoutError:
+            return jsonify({'success': False, 'message': '房间列表暂时不可用'}), 503
+    return jsonify({'success': True, 'rooms': rooms})
+
+@shard_op
+def live_rooms(game_type, limit=100):
+    rooms = []
+    for room_id, room_sim in list(tick_engine.rooms.items()):
+        room = game_rooms.get(room_id)
+        if room_sim.game_type != game_type or room is None:
+            continue
+        rooms.append(dict(room.summary(), spectators=spectator_feed.count(room_id)))
+        if len(rooms) >= limit:
+            break
+    return rooms
+
+@shard_op
+def list_rooms(game_type, page, per_page):
+    rooms, total = game_rooms.page(game_type, page, per_page)
+    return {
+        'rooms': [room.summary() for room in rooms],
+        'page': page,
+        'per_page': per_page,
+        'total': total
+    }
+
+@socketio.on('lobby_subscribe')
+@rate_limited('lobby_subscribe')
+def handle_lobby_subscribe(data=None):
+    """订阅某游戏类型的可加入房间：先收到完整列表 lobby_rooms，之后是合并后的增量 lobby_update"""
+    game_type = (data or {}).get('game_type')
+    if not session.get('user_id') or game_type not in ONLINE_GAME_TYPES:
+        return
+    join_room(lobby_room(game_type))
+    route_to_shard(shard_router.shard_for_game(game_type), 'lobby_snapshot', game_type=game_type, sid=request.sid)
+
+@shard_op
+def lobby_snapshot(game_type, sid):
+    socketio.emit('lobby_rooms', lobby_feed.snapshot(game_type), to=sid)
+
+@socketio.on('lobby_unsubscribe')
+@rate_limited('lobby_unsubscribe')
+def handle_lobby_unsubscribe(data=None):
+    game_type = (data or {}).get('game_type')
+    if game_type in ONLINE_GAME_TYPES:
+        leave_room(lobby_room(game_type))
+
 @app.route('/online/<game_type>')
 def online_game(game_type):
     lang = request.args.get('lang', 'zh')
@@ -2136,219 +1708,638 @@ def online_game(game_type):
                          user=user)
 
 # WebSocket事件处理
+# 事件在连接所在的 worker 上收到，按游戏类型 / 房间转发给负责的分片处理，
+# 分片上的操作只通过 sid 和 user_id 向客户端推送，不依赖请求上下文
 @socketio.on('connect')
-def handle_connect():
+def handle_connect(auth=None):
+    global active_connections
+    with _connections_lock:
+        limit = app.config['MAX_CONNECTIONS']
+        if shutting_down.is_set() or (limit and active_connections >= limit):
+            return False
+        active_connections += 1
     user_id = session.get('user_id')
     username = session.get('user', '游客')
-    
+
     if user_id:
+        previous = user_sessions.get(user_id)
         user_sessions[user_id] = {
             'username': username,
+            'sid': request.sid,
             'connected_at': time.time(),
-            'current_room': None
+            'last_seen': time.time(),
+            'current_room': None,
+            'matching': None,  # 正在排队的游戏类型
+            'game_type': None,  # 最近匹配或所在房间的游戏类型，用于按游戏类型统计 RTT
+            # 重连沿用之前测得的 RTT
+            'rtt': previous.get('rtt') if previous else None,
+            'rtt_var': previous.get('rtt_var') if previous else None,
+            'rtt_reported': None
         }
+        # 加入以 user_id 命名的房间，便于按用户定向推送（match_found 等）
+        join_room(user_id)
         emit('connected', {'message': '连接成功'})
+        resume_session(user_id, request.sid, previous, auth if isinstance(auth, dict) else {})
     else:
         emit('error', {'message': '未登录用户'})
 
 @socketio.on('disconnect')
 def handle_disconnect():
+    global active_connections
+    with _connections_lock:
+        active_connections -= 1
+    rate_limiter.forget(request.sid)
+    if session.get('spectating'):
+        route_to_shard(shard_router.shard_for_room(session['spectating']), 'remove_spectator',
+                       room_id=session['spectating'], sid=request.sid)
     user_id = session.get('user_id')
-    if user_id and user_id in user_sessions:
-        current_room = user_sessions[user_id].get('current_room')
-        if current_room and current_room in game_rooms:
-            room = game_rooms[current_room]
-            room.remove_player(user_id)
-            leave_room(current_room)
-            emit('player_left', {'user_id': user_id, 'username': user_sessions[user_id]['username']}, room=current_room)
-            
-            if not room.players:
-                del game_rooms[current_room]
-        
-        del user_sessions[user_id]
+    user_session = user_sessions.get(user_id) if user_id else None
+    if not user_session:
+        return
+    current_room = user_session.get('current_room')
+    if user_session['sid'] != request.sid:
+        # 同一用户已经用新连接重连，旧连接的断开只需让出房间里的旧 sid
+        if current_room:
+            route_to_shard(shard_router.shard_for_room(current_room), 'reserve_seat',
+                           user_id=user_id, sid=request.sid, room_id=current_room)
+        return
+    if user_session.get('matching'):
+        route_to_shard(shard_router.shard_for_game(user_session['matching']), 'leave_matching',
+                       user_id=user_id, sid=request.sid, notify=False)
+        user_session['matching'] = None
+    if current_room and app.config['RECONNECT_GRACE'] > 0:
+        # 保留座位和会话，等待重连
+        route_to_shard(shard_router.shard_for_room(current_room), 'reserve_seat',
+                       user_id=user_id, sid=request.sid, room_id=current_room)
+        user_session.update(sid=None, disconnected_at=time.time())
+        return
+    if current_room:
+        route_to_shard(shard_router.shard_for_room(current_room), 'leave_game_room',
+                       user_id=user_id, username=user_session['username'], sid=request.sid,
+                       room_id=current_room, notify=False)
+    del user_sessions[user_id]
+
+# 断线保留的座位（只在房间所在分片上）：user_id -> {'room_id', 'timer'}
+seat_reservations = {}
+
+@shard_op
+def reserve_seat(user_id, sid, room_id):
+    room = game_rooms.get(room_id)
+    player = room.get_player(user_id) if room is not None else None
+    socketio.server.leave_room(sid, room_id, namespace='/')
+    if player is None or player.sid != sid:
+        return  # 已离开房间，或座位已被新连接接管
+    room.set_connected(user_id, False)
+    # 断线期间的输入置空，避免角色按最后一次输入继续移动
+    tick_engine.submit_input(room_id, user_id, {})
+    grace = app.config['RECONNECT_GRACE']
+    previous = seat_reservations.pop(user_id, None)
+    if previous is not None:
+        scheduler.cancel(previous['timer'])
+    seat_reservations[user_id] = {
+        'room_id': room_id,
+        'timer': scheduler.call_later(grace, release_seat, user_id, room_id)
+    }
+    emit_room_event(room_id, 'player_disconnected', {
+        'user_id': user_id,
+        'username': player.username,
+        'players': room.players,
+        'grace': grace
+    })
+
+def release_seat(user_id, room_id):
+    """保留期内没有重连：正式离开房间"""
+    reservation = seat_reservations.get(user_id)
+    if reservation is None or reservation['room_id'] != room_id:
+        return
+    del seat_reservations[user_id]
+    room = game_rooms.get(room_id)
+    player = room.get_player(user_id) if room is not None else None
+    if player is not None and not player.connected:
+        leave_game_room(user_id, player.username, None, room_id, notify=False)
+
+def resume_session(user_id, sid, previous, auth):
+    """新连接恢复断线前的房间：优先用客户端带来的 room_id，其次是本进程保留的会话；
+    都没有时（重连落到了另一个 worker 且页面已刷新）询问所有分片。
+    客户端收到 session_resumed 或 resume_failed 之后才开始匹配；询问所有分片时没有座位的分片不回复，由客户端超时"""
+    room_id = auth.get('room_id') if isinstance(auth.get('room_id'), str) else None
+    if room_id is None and previous is not None:
+        room_id = previous.get('current_room')
+    last_seq = auth.get('last_seq') if isinstance(auth.get('last_seq'), int) else None
+    if room_id is not None:
+        route_to_shard(shard_router.shard_for_room(room_id), 'resume_seat',
+                       user_id=user_id, sid=sid, room_id=room_id, last_seq=last_seq)
+    elif shard_router.shard_count > 1:
+        for shard in range(shard_router.shard_count):
+            route_to_shard(shard, 'resume_seat', user_id=user_id, sid=sid, room_id=None, last_seq=None)
+    else:
+        socketio.emit('resume_failed', {}, to=sid)
+
+@shard_op
+def resume_seat(user_id, sid, room_id, last_seq):
+    targeted = room_id is not None
+    reservation = seat_reservations.pop(user_id, None)
+    if reservation is not None:
+        scheduler.cancel(reservation['timer'])
+        room_id = reservation['room_id']
+    room = game_rooms.get(room_id) if room_id else None
+    player = room.get_player(user_id) if room is not None else None
+    if player is not None and room.status == 'finished':
+        # 对局已结束，不再恢复座位
+        leave_game_room(user_id, player.username, None, room_id, notify=False)
+        player = None
+    if player is None:
+        if targeted or room is not None:
+            socketio.emit('resume_failed', {}, to=sid)
+        return
+    was_connected = player.connected
+    room.set_connected(user_id, True, sid=sid)
+    socketio.server.enter_room(sid, room_id, namespace='/')
+    update_session(user_id, current_room=room_id)
+    stream = snapshot_streams.get(room_id)
+    if stream is not None:
+        stream.forget(user_id)  # 下一帧发关键帧
+
+    # 补发错过的房间事件；客户端没有序号或缓冲已覆盖时 missed 为 None，由客户端按房间状态重建
+    missed = room.events.since(last_seq) if last_seq is not None else None
+    socketio.emit('session_resumed', {
+        'room_id': room_id,
+        'game_type': room.game_type,
+        'status': room.status,
+        'players': room.players,
+        'owner': room.owner,
+        'game_data': room.game_data,
+        'chat': room.chat.recent(),
+        'seq': room.events.seq,
+        'missed': None if missed is None else [
+            {'seq': seq, 'event': event, 'data': dict(payload, seq=seq)} for seq, event, payload in missed]
+    }, to=sid)
+    if not was_connected:
+        emit_room_event(room_id, 'player_reconnected', {
+            'user_id': user_id,
+            'username': player.username,
+            'players': room.players
+        })
 
 @socketio.on('join_matching')
+@rate_limited('join_matching')
 def handle_join_matching(data):
     user_id = session.get('user_id')
     username = session.get('user', '游客')
     game_type = data.get('game_type')
-    
-    if not user_id:
+    user_session = user_sessions.get(user_id)
+
+    if not user_id or not user_session:
         emit('error', {'message': '请先登录'})
         return
-    
+    if reject_if_shutting_down(request.sid):
+        return
+    touch_session(user_id)
+    if user_session.get('current_room'):
+        # 还占着座位（包括刚恢复的座位）时不能再排队，否则会被分进第二个房间
+        emit('error', {'message': '请先离开当前房间'})
+        return
+
+    # 换了游戏类型时先离开原队列（可能在另一个分片上）
+    previous = user_session.get('matching')
+    if previous and previous != game_type:
+        route_to_shard(shard_router.shard_for_game(previous), 'leave_matching',
+                       user_id=user_id, sid=request.sid, notify=False)
+    user_session['matching'] = game_type
+    user_session['game_type'] = game_type
+    route_to_shard(shard_router.shard_for_game(game_type), 'join_matching',
+                   user_id=user_id, username=username, game_type=game_type, sid=request.sid,
+                   rtt=_rounded_rtt(user_session))
+
+@shard_op
+def join_matching(user_id, username, game_type, sid, rtt=None):
     if user_id in matching_queue:
-        emit('error', {'message': '您已在匹配队列中'})
+        socketio.emit('error', {'message': '您已在匹配队列中'}, to=sid)
         return
-    
-    # 添加到匹配队列
-    matching_queue[user_id] = {
-        'username': username,
-        'game_type': game_type,
-        'joined_at': time.time()
-    }
-    
+
+    # 添加到匹配队列（按评分分桶，同档评分内优先 RTT 相近的玩家）
+    rating = rating_store.get(game_type, rating_key(username)).rating
+    matching_queue.enqueue(user_id, username, game_type, sid=sid, rating=rating, rtt=rtt)
+
     # 查找匹配
     find_match(user_id, game_type)
 
 @socketio.on('leave_matching')
+@rate_limited('leave_matching')
 def handle_leave_matching():
     user_id = session.get('user_id')
-    if user_id in matching_queue:
-        del matching_queue[user_id]
-        emit('left_matching', {'message': '已离开匹配队列'})
+    user_session = user_sessions.get(user_id)
+    if not user_session or not user_session.get('matching'):
+        return
+    game_type, user_session['matching'] = user_session['matching'], None
+    route_to_shard(shard_router.shard_for_game(game_type), 'leave_matching', user_id=user_id, sid=request.sid)
+
+@shard_op
+def leave_matching(user_id, sid, notify=True):
+    if leave_matching_queue(user_id) and notify:
+        socketio.emit('left_matching', {'message': '已离开匹配队列'}, to=sid)
+
+def _rounded_rtt(user_session):
+    rtt = user_session.get('rtt') if user_session else None
+    return round(rtt) if rtt is not None else None
+
+@socketio.on('rtt_pong')
+@rate_limited('rtt_pong')
+def handle_rtt_pong(data=None):
+    """客户端对 rtt_ping 的回应：更新平滑 RTT；所在房间的玩家 RTT 变化明显时上报给房间所在分片"""
+    user_session = user_sessions.get(session.get('user_id'))
+    seq = (data or {}).get('seq')
+    if not user_session or user_session.get('sid') != request.sid or not isinstance(seq, int):
+        return
+    rtt = rtt_tracker.observe(user_session, seq)
+    if rtt is None or not user_session.get('current_room'):
+        return
+    reported = user_session.get('rtt_reported')
+    if reported is None or abs(rtt - reported) > max(10, 0.2 * reported):
+        user_session['rtt_reported'] = round(rtt)
+        _route_room_event('report_rtt', rtt=round(rtt))
+
+@shard_op
+def report_rtt(user_id, room_id, rtt):
+    """更新房间里玩家的 RTT，随下一次房间事件的 players 下发"""
+    room = game_rooms.get(room_id)
+    player = room.get_player(user_id) if room is not None else None
+    if player is not None:
+        player.rtt = rtt
 
 @socketio.on('join_room')
+@rate_limited('join_room')
 def handle_join_room(data):
     user_id = session.get('user_id')
     username = session.get('user', '游客')
     room_id = data.get('room_id')
-    
+
     if not user_id:
         emit('error', {'message': '请先登录'})
         return
-    
-    if room_id not in game_rooms:
+    if not isinstance(room_id, str):
         emit('error', {'message': '房间不存在'})
         return
-    
-    room = game_rooms[room_id]
-    if room.add_player(user_id, username):
-        join_room(room_id)
-        user_sessions[user_id]['current_room'] = room_id
-        
-        emit('joined_room', {
+
+    touch_session(user_id)
+    route_to_shard(shard_router.shard_for_room(room_id), 'join_game_room',
+                   user_id=user_id, username=username, sid=request.sid, room_id=room_id,
+                   rtt=_rounded_rtt(user_sessions.get(user_id)))
+
+@shard_op
+def join_game_room(user_id, username, sid, room_id, rtt=None):
+    room = game_rooms.get(room_id)
+    if room is None:
+        socketio.emit('error', {'message': '房间不存在'}, to=sid)
+        return
+
+    if room.add_player(user_id, username, sid=sid):
+        room.get_player(user_id).rtt = rtt
+        socketio.server.enter_room(sid, room_id, namespace='/')
+        update_session(user_id, current_room=room_id, game_type=room.game_type, rtt_reported=rtt)
+
+        socketio.emit('joined_room', {
             'room_id': room_id,
             'players': room.players,
-            'owner': room.owner
-        })
-        
-        emit('player_joined', {
+            'owner': room.owner,
+            'chat': room.chat.recent()
+        }, to=sid)
+
+        emit_room_event(room_id, 'player_joined', {
             'user_id': user_id,
             'username': username,
             'players': room.players
-        }, room=room_id)
+        })
     else:
-        emit('error', {'message': '无法加入房间'})
+        socketio.emit('error', {'message': '无法加入房间'}, to=sid)
 
 @socketio.on('leave_room')
+@rate_limited('leave_room')
 def handle_leave_room():
     user_id = session.get('user_id')
-    if user_id and user_id in user_sessions:
-        current_room = user_sessions[user_id].get('current_room')
-        if current_room and current_room in game_rooms:
-            room = game_rooms[current_room]
-            room.remove_player(user_id)
-            leave_room(current_room)
-            
-            emit('left_room', {'message': '已离开房间'})
-            emit('player_left', {
-                'user_id': user_id,
-                'username': user_sessions[user_id]['username'],
-                'players': room.players
-            }, room=current_room)
-            
-            if not room.players:
-                del game_rooms[current_room]
-            
-            user_sessions[user_id]['current_room'] = None
+    user_session = user_sessions.get(user_id)
+    if user_session and user_session.get('current_room'):
+        current_room = user_session['current_room']
+        route_to_shard(shard_router.shard_for_room(current_room), 'leave_game_room',
+                       user_id=user_id, username=user_session['username'], sid=request.sid,
+                       room_id=current_room)
+        # 房间在其他分片时先在本地清掉，客户端收到确认后即可重新匹配
+        user_session['current_room'] = None
+    return True
+
+@shard_op
+def leave_game_room(user_id, username, sid, room_id, notify=True):
+    room = game_rooms.get(room_id)
+    if room is None:
+        update_session(user_id, current_room=None)
+        return
+    room.remove_player(user_id)
+    tick_engine.remove_player(room_id, user_id)
+    if sid:
+        socketio.server.leave_room(sid, room_id, namespace='/')
+
+    if notify:
+        socketio.emit('left_room', {'message': '已离开房间'}, to=sid)
+    emit_room_event(room_id, 'player_left', {
+        'user_id': user_id,
+        'username': username,
+        'players': room.players
+    })
+
+    if room.is_empty():
+        discard_room(room_id)
+
+    update_session(user_id, current_room=None)
+
+def _route_room_event(op, **args):
+    """把当前用户所在房间的事件转发给房间所在分片；对局中的输入和确认也算活跃，避免长对局中被回收"""
+    user_id = session.get('user_id')
+    user_session = user_sessions.get(user_id)
+    if not user_session or not user_session.get('current_room'):
+        return
+    user_session['last_seen'] = time.time()
+    room_id = user_session['current_room']
+    route_to_shard(shard_router.shard_for_room(room_id), op, user_id=user_id, room_id=room_id, **args)
+
+@socketio.on('send_chat')
+@rate_limited('send_chat')
+def handle_send_chat(data=None):
+    text = clean_message((data or {}).get('text'))
+    if text is not None:
+        _route_room_event('chat_message', text=text)
+
+@shard_op
+def chat_message(user_id, room_id, text):
+    room = game_rooms.get(room_id)
+    player = room.get_player(user_id) if room is not None else None
+    if player is None:
+        return
+    chat_batcher.add(room_id, room.chat.append(user_id, player.username, text))
+
+@socketio.on('spectate')
+@rate_limited('spectate')
+def handle_spectate(data=None):
+    """观战进行中的对局：不占座位，先收到 spectating 和当前关键帧，之后按 SPECTATOR_RATE 收到 spectate_state"""
+    user_id = session.get('user_id')
+    room_id = (data or {}).get('room_id')
+    if not user_id:
+        emit('error', {'message': '请先登录'})
+        return
+    if not isinstance(room_id, str):
+        emit('error', {'message': '房间不存在'})
+        return
+    user_session = user_sessions.get(user_id)
+    if user_session and user_session.get('current_room'):
+        emit('error', {'message': '请先离开当前房间'})
+        return
+    _stop_spectating()
+    session['spectating'] = room_id
+    route_to_shard(shard_router.shard_for_room(room_id), 'add_spectator', room_id=room_id, sid=request.sid)
+
+@shard_op
+def add_spectator(room_id, sid):
+    room = game_rooms.get(room_id)
+    if room is None or room.status != 'playing' or room_id not in tick_engine.rooms:
+        socketio.emit('error', {'message': '房间不在对局中'}, to=sid)
+        return
+    socketio.server.enter_room(sid, spectate_room(room_id), namespace='/')
+    if not spectator_feed.add(room_id, sid):
+        socketio.server.leave_room(sid, spectate_room(room_id), namespace='/')
+        socketio.emit('error', {'message': '观战人数已满'}, to=sid)
+        return
+    socketio.emit('spectating', {
+        'room_id': room_id,
+        'game_type': room.game_type,
+        'players': room.players,
+        'tick_rate': tick_engine.tick_rate,
+        'rate': spectator_feed.rate
+    }, to=sid)
+
+@socketio.on('stop_spectating')
+@rate_limited('stop_spectating')
+def handle_stop_spectating(data=None):
+    _stop_spectating()
+
+def _stop_spectating():
+    room_id = session.pop('spectating', None)
+    if room_id:
+        leave_room(spectate_room(room_id))
+        route_to_shard(shard_router.shard_for_room(room_id), 'remove_spectator', room_id=room_id, sid=request.sid)
+
+@shard_op
+def remove_spectator(room_id, sid):
+    spectator_feed.remove(room_id, sid)
 
 @socketio.on('toggle_ready')
+@rate_limited('toggle_ready')
 def handle_toggle_ready(data=None):
-    user_id = session.get('user_id')
-    if user_id and user_id in user_sessions:
-        current_room = user_sessions[user_id].get('current_room')
-        if current_room and current_room in game_rooms:
-            room = game_rooms[current_room]
-            for player in room.players:
-                if player['id'] == user_id:
-                    player['ready'] = not player['ready']
-                    break
-            
-            emit('player_ready_changed', {
-                'user_id': user_id,
-                'ready': player['ready'],
-                'players': room.players,
-                'can_start': room.can_start()
-            }, room=current_room)
+    _route_room_event('toggle_ready')
+
+@shard_op
+def toggle_ready(user_id, room_id):
+    room = game_rooms.get(room_id)
+    if room is None:
+        return
+    ready = room.toggle_ready(user_id)
+    if ready is None:
+        return
+
+    emit_room_event(room_id, 'player_ready_changed', {
+        'user_id': user_id,
+        'ready': ready,
+        'players': room.players,
+        'can_start': room.can_start()
+    })
 
 @socketio.on('start_game')
+@rate_limited('start_game')
 def handle_start_game():
-    user_id = session.get('user_id')
-    if user_id and user_id in user_sessions:
-        current_room = user_sessions[user_id].get('current_room')
-        if current_room and current_room in game_rooms:
-            room = game_rooms[current_room]
-            if room.owner == user_id and room.can_start():
-                room.status = 'playing'
-                emit('game_started', {
-                    'room_id': current_room,
-                    'game_type': room.game_type,
-                    'players': room.players
-                }, room=current_room)
+    _route_room_event('start_game', sid=request.sid)
+
+@shard_op
+def start_game(user_id, room_id, sid):
+    room = game_rooms.get(room_id)
+    if room is None or room.owner != user_id or not room.can_start():
+        return
+    if reject_if_shutting_down(sid):
+        return
+    room.status = 'playing'
+    # 支持服务器模拟的游戏由 tick 引擎推进，并按 tick 广播状态快照
+    server_simulated = tick_engine.start_room(room_id, room.game_type, room.player_ids()) is not None
+    room.game_data = {'started_at': time.time(), 'server_simulated': server_simulated}
+    if server_simulated and app.config['RECORD_REPLAYS']:
+        replay_recorder.start(room_id, room.game_type,
+                              [{'id': p['id'], 'username': p['username']} for p in room.players],
+                              tick_engine.tick_rate)
+    emit_room_event(room_id, 'game_started', {
+        'room_id': room_id,
+        'game_type': room.game_type,
+        'players': room.players,
+        'server_simulated': server_simulated,
+        'tick_rate': tick_engine.tick_rate
+    })
+
+@socketio.on('player_input')
+@rate_limited('player_input')
+def handle_player_input(data=None):
+    """玩家输入：只记录最新一次，由下一个 tick 统一处理"""
+    _route_room_event('player_input', value=(data or {}).get('input'))
+
+@shard_op
+def player_input(user_id, room_id, value):
+    if tick_engine.submit_input(room_id, user_id, value) and replay_recorder.is_recording(room_id):
+        room_sim = tick_engine.rooms.get(room_id)
+        if room_sim is not None:
+            replay_recorder.record_input(room_id, user_id, room_sim.inputs.get(user_id))
+
+@socketio.on('snapshot_ack')
+@rate_limited('snapshot_ack')
+def handle_snapshot_ack(data=None):
+    """客户端确认已收到某个 tick 的快照，之后的增量以它为基准"""
+    tick = (data or {}).get('tick')
+    if isinstance(tick, int):
+        _route_room_event('snapshot_ack', tick=tick)
+
+@shard_op
+def snapshot_ack(user_id, room_id, tick):
+    stream = snapshot_streams.get(room_id)
+    if stream is not None:
+        stream.ack(user_id, tick)
 
 def find_match(user_id, game_type):
-    """查找匹配的玩家"""
-    # 查找相同游戏类型的其他玩家
-    available_players = []
-    for uid, info in matching_queue.items():
-        if uid != user_id and info['game_type'] == game_type:
-            available_players.append((uid, info))
-    
-    if available_players:
-        # 找到匹配，创建房间
-        room_id = str(uuid.uuid4())
-        room = GameRoom(room_id, game_type)
-        game_rooms[room_id] = room
-        
-        # 添加当前玩家
-        room.add_player(user_id, user_sessions[user_id]['username'])
-        user_sessions[user_id]['current_room'] = room_id
-        
-        # 添加匹配的玩家
-        for uid, info in available_players[:3]:  # 最多4人
-            room.add_player(uid, info['username'])
-            user_sessions[uid]['current_room'] = room_id
-            del matching_queue[uid]
-        
-        del matching_queue[user_id]
-        
-        # 通知所有玩家
-        for player in room.players:
-            emit('match_found', {
-                'room_id': room_id,
-                'players': room.players,
-                'owner': room.owner
-            }, room=player['id'])
-    else:
-        # 没有找到匹配，等待30秒后询问是否加入房间
-        def check_timeout():
-            time.sleep(30)
-            if user_id in matching_queue:
-                emit('match_timeout', {
-                    'message': '匹配超时，是否加入当前房间？',
-                    'available_rooms': get_available_rooms(game_type)
-                }, room=user_id)
-        
-        import threading
-        threading.Thread(target=check_timeout).start()
+    """为新入队的玩家查找评分相近的对手，只搜索其可接受范围内的评分桶"""
+    for group in matching_queue.match(game_type, user_id=user_id):
+        create_matched_room(game_type, group)
+
+    entry = matching_queue.get(user_id)
+    if entry:
+        # 没有找到匹配，MATCH_TIMEOUT 秒后询问是否加入房间（由调度器触发，不占用线程）
+        entry.timer = scheduler.call_later(MATCH_TIMEOUT, match_timeout, user_id, game_type)
+
+def sweep_matches():
+    """周期任务：等待时间变长、评分范围放宽的玩家重新搜索"""
+    for game_type in matching_queue.game_types():
+        for group in matching_queue.match(game_type):
+            create_matched_room(game_type, group)
+
+def create_matched_room(game_type, group):
+    """为一组匹配成功的玩家创建房间。房间 ID 选成落在本分片上，房间与其匹配队列在同一 worker"""
+    room_id = shard_router.new_room_id()
+    room = GameRoom(room_id, game_type)
+    game_rooms[room_id] = room
+
+    for entry in group:
+        scheduler.cancel(entry.timer)
+        room.add_player(entry.user_id, entry.username, sid=entry.sid)
+        room.get_player(entry.user_id).rtt = entry.rtt
+        # 匹配到的玩家不一定连在本 worker，按排队时记录的 sid 把各自的连接加入房间
+        if entry.sid:
+            socketio.server.enter_room(entry.sid, room_id, namespace='/')
+        update_session(entry.user_id, current_room=room_id, matching=None, game_type=game_type,
+                       rtt_reported=entry.rtt)
+
+    # 通知所有玩家
+    players = room.players
+    ratings = {entry.user_id: round(entry.rating) for entry in group}
+    for player_id in room.player_ids():
+        socketio.emit('match_found', {
+            'room_id': room_id,
+            'players': players,
+            'owner': room.owner,
+            'ratings': ratings
+        }, to=player_id)
+
+def match_timeout(user_id, game_type):
+    if user_id in matching_queue:
+        socketio.emit('match_timeout', {
+            'message': '匹配超时，是否加入当前房间？',
+            'available_rooms': get_available_rooms(game_type)
+        }, to=user_id)
 
 def get_available_rooms(game_type):
     """获取可用的房间列表"""
-    available = []
-    for room_id, room in game_rooms.items():
-        if room.game_type == game_type and not room.is_full() and room.status == 'waiting':
-            available.append({
-                'room_id': room_id,
-                'player_count': len(room.players),
-                'max_players': room.max_players
-            })
-    return available
-
-load_posts() # 模块导入时加载文章，适配 WSGI 部署
-load_users()
-ensure_admin_exists()
-load_downloads()
+    return [room.summary() for room in game_rooms.open_rooms(game_type)]
+
+# 数据按需加载：导入模块不读写任何文件，首次请求（或预热）时才加载，各存储只加载一次
+def _load_users_store():
+    load_users()
+    ensure_admin_exists()
+
+def _prepare_upload_folder():
+    # 确保上传目录存在
+    os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+
+_STORE_LOADERS = {
+    'posts': load_posts,
+    'users': _load_users_store,
+    'downloads': load_downloads,
+    'uploads': _prepare_upload_folder,
+}
+_loaded_stores = set()
+_stores_lock = threading.Lock()
+
+def ensure_store_loaded(name):
+    """线程安全地加载单个存储（双重检查，已加载时无锁返回）"""
+    if name in _loaded_stores:
+        return
+    with _stores_lock:
+        if name not in _loaded_stores:
+            _STORE_LOADERS[name]()
+            _loaded_stores.add(name)
+
+def ensure_stores_loaded():
+    for name in _STORE_LOADERS:
+        ensure_store_loaded(name)
+
+@app.before_request
+def load_stores_on_first_use():
+    if len(_loaded_stores) < len(_STORE_LOADERS):
+        ensure_stores_loaded()
+
+# Jinja 字节码缓存目录，多个 worker 共享，避免每个新 worker 重复编译模板
+JINJA_CACHE_DIR = os.environ.get('JINJA_CACHE_DIR', os.path.join(BASE_DIR, 'build', 'jinja_cache'))
+
+def configure_bytecode_cache(flask_app):
+    os.makedirs(JINJA_CACHE_DIR, exist_ok=True)
+    flask_app.jinja_env.bytecode_cache = FileSystemBytecodeCache(JINJA_CACHE_DIR)
+
+def warmup(flask_app=None):
+    """预热：加载数据、编译全部模板、加载语言目录、预压缩静态资源，返回各阶段耗时（毫秒）"""
+    flask_app = flask_app or app
+    timings = {}
+    start = time.perf_counter()
+    ensure_stores_loaded()
+    timings['stores'] = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    configure_bytecode_cache(flask_app)
+    for name in flask_app.jinja_env.list_templates(extensions=['html']):
+        flask_app.jinja_env.get_template(name)
+    timings['templates'] = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    LANG_TEXT.preload()
+    timings['translations'] = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    for lang in LANGUAGES:
+        for name in STATIC_PAGES:
+            prerendered_pages.get_shell(name, lang, LANG_TEXT[lang], LANGUAGES)
+    timings['pages'] = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    static_precompressor.precompress_all()
+    timings['static'] = (time.perf_counter() - start) * 1000
+    return timings
+
+def create_app(run_warmup=True):
+    """应用工厂：gunicorn 每个 worker 调用一次，预热完成后才开始接收请求"""
+    if run_warmup:
+        timings = warmup(app)
+        print('[warmup] ' + ', '.join(f'{k} {v:.1f}ms' for k, v in timings.items()))
+    start_background_jobs()
+    return app
+
 # 评论相关路由
 @app.route('/api/comments/<comment_type>/<int:target_id>', methods=['GET'])
 def get_comments(comment_type, target_id):
@@ -2450,6 +2441,6 @@ def edit_comment(comment_id):
     return jsonify({'success': False, 'message': '评论不存在'}), 404
 
 if __name__ == '__main__':
-    import os
-    port = int(os.environ.get('PORT', 5000))
-    socketio.run(app, debug=False, host='0.0.0.0', port=port, allow_unsafe_werkzeug=True)
+    # 使用生产入口（gunicorn + 异步 worker），不再运行 Werkzeug 开发服务器
+    import serve
+    serve.main()
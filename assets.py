@@ -0,0 +1,142 @@
+"""游戏页面静态资源构建：抽取模板内联 JS/CSS，压缩后输出为带哈希的缓存文件"""
+import glob
+import hashlib
+import json
+import os
+import re
+
+from jinja2 import FileSystemLoader, TemplateNotFound
+
+# 构建产物目录：改写后的模板放在 build/templates，资源放在 static/dist
+DIST_SUBDIR = 'dist'
+MANIFEST_NAME = 'manifest.json'
+
+# 只抽取没有属性的内联块（带 src 的外链脚本原样保留）
+INLINE_BLOCK_RE = re.compile(r'<(script|style)>(.*?)</\1>', re.S)
+CSS_COMMENT_RE = re.compile(r'/\*.*?\*/', re.S)
+
+
+def minify_css(source):
+    """去掉注释并压缩空白"""
+    css = CSS_COMMENT_RE.sub('', source)
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r'\s*([{};,])\s*', r'\1', css)
+    css = re.sub(r':\s+', ':', css)
+    css = css.replace(';}', '}')
+    return css.strip()
+
+
+def minify_js(source):
+    """保守的 JS 压缩：去掉缩进、空行和整行注释，保留换行以免破坏自动分号插入。
+
+    模板字符串（反引号）和以反斜杠续行的字符串内部原样保留。
+    """
+    lines = []
+    in_template = False
+    continued = False
+    for raw in source.splitlines():
+        if in_template or continued:
+            lines.append(raw)
+        else:
+            line = raw.strip()
+            if line and not line.startswith('//'):
+                lines.append(line)
+        ticks = len(re.findall(r'(?<!\\)`', raw))
+        if ticks % 2:
+            in_template = not in_template
+        continued = raw.endswith('\\')
+    return '\n'.join(lines)
+
+
+def _asset_name(template_name, kind, content):
+    digest = hashlib.sha256(content.encode('utf-8')).hexdigest()[:10]
+    stem = os.path.splitext(template_name)[0]
+    ext = 'js' if kind == 'script' else 'css'
+    return f'{stem}.{digest}.min.{ext}'
+
+
+def build_game_assets(templates_dir, static_dir, build_templates_dir, pattern='game_*.html'):
+    """抽取 game_*.html 中的内联脚本与样式，返回 {模板名: {'before': 字节数, 'after': 字节数, 'assets': [...]}}"""
+    dist_dir = os.path.join(static_dir, DIST_SUBDIR)
+    os.makedirs(dist_dir, exist_ok=True)
+    os.makedirs(build_templates_dir, exist_ok=True)
+
+    manifest = {}
+    for path in sorted(glob.glob(os.path.join(templates_dir, pattern))):
+        template_name = os.path.basename(path)
+        with open(path, 'r', encoding='utf-8') as f:
+            source = f.read()
+
+        assets = []
+
+        def _extract(match):
+            kind, body = match.group(1), match.group(2)
+            # 含 Jinja 表达式的块依赖渲染上下文，不能抽成静态文件
+            if '{{' in body or '{%' in body or not body.strip():
+                return match.group(0)
+            minified = minify_js(body) if kind == 'script' else minify_css(body)
+            name = _asset_name(template_name, kind, minified)
+            with open(os.path.join(dist_dir, name), 'w', encoding='utf-8') as out:
+                out.write(minified)
+            assets.append(name)
+            url = f'/static/{DIST_SUBDIR}/{name}'
+            if kind == 'script':
+                return f'<script src="{url}"></script>'
+            return f'<link rel="stylesheet" href="{url}">'
+
+        rewritten = INLINE_BLOCK_RE.sub(_extract, source)
+        with open(os.path.join(build_templates_dir, template_name), 'w', encoding='utf-8') as out:
+            out.write(rewritten)
+
+        # 清理同一模板以前构建留下的旧哈希文件
+        stem = os.path.splitext(template_name)[0]
+        for old in glob.glob(os.path.join(dist_dir, f'{stem}.*.min.*')):
+            if os.path.basename(old) not in assets:
+                os.remove(old)
+
+        manifest[template_name] = {
+            'before': len(source.encode('utf-8')),
+            'after': len(rewritten.encode('utf-8')),
+            'assets': assets,
+        }
+
+    with open(os.path.join(dist_dir, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    return manifest
+
+
+class BuiltTemplateLoader(FileSystemLoader):
+    """优先加载构建产物；源模板比构建产物新时视为过期，回退到源模板"""
+
+    def __init__(self, build_templates_dir, source_templates_dir):
+        super().__init__(build_templates_dir)
+        self.build_templates_dir = build_templates_dir
+        self.source_templates_dir = source_templates_dir
+
+    def get_source(self, environment, template):
+        built = os.path.join(self.build_templates_dir, template)
+        source = os.path.join(self.source_templates_dir, template)
+        try:
+            if os.path.getmtime(built) < os.path.getmtime(source):
+                raise TemplateNotFound(template)
+        except OSError:
+            raise TemplateNotFound(template)
+        return super().get_source(environment, template)
+
+
+def init_assets(app, build_templates_dir):
+    """让应用优先使用构建后的模板，并为带哈希的资源设置长期缓存"""
+    from flask import request
+    from jinja2 import ChoiceLoader
+
+    source_dir = os.path.join(app.root_path, app.template_folder)
+    app.jinja_loader = ChoiceLoader([BuiltTemplateLoader(build_templates_dir, source_dir), app.jinja_loader])
+
+    @app.after_request
+    def cache_hashed_assets(response):
+        filename = (request.view_args or {}).get('filename', '') if request.endpoint == 'static' else ''
+        if filename.startswith(DIST_SUBDIR + '/') and response.status_code == 200:
+            response.cache_control.public = True
+            response.cache_control.max_age = 31536000
+            response.cache_control.immutable = True
+        return response
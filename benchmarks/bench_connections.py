@@ -0,0 +1,208 @@
+"""并发 WebSocket 连接上限测试
+
+用法：python benchmarks/bench_connections.py [--mode threading] [--levels 100,250,500,1000,2000]
+      python benchmarks/bench_connections.py --url http://127.0.0.1:5000   # 测试已在运行的服务
+
+未指定 --url 时用 serve.py 在本地启动一个 worker，测试结束后发送 SIGTERM，顺带验证优雅关闭。
+客户端只用标准库（asyncio + 手写 WebSocket 帧），按 levels 逐级增加连接数并保持已有连接，
+每级报告成功数、失败数和握手耗时；失败率超过 1% 或 p95 握手超过 1 秒的第一级即为上限。
+"""
+import argparse
+import asyncio
+import base64
+import os
+import resource
+import signal
+import socket
+import struct
+import subprocess
+import sys
+import time
+import urllib.parse
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class WebSocketClient:
+    """最小的 Engine.IO v4 WebSocket 客户端：握手、连接默认命名空间、回应心跳"""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+
+    async def connect(self, timeout):
+        self.reader, self.writer = await asyncio.wait_for(asyncio.open_connection(self.host, self.port), timeout)
+        key = base64.b64encode(os.urandom(16)).decode()
+        self.writer.write((
+            'GET /socket.io/?EIO=4&transport=websocket HTTP/1.1\r\n'
+            f'Host: {self.host}:{self.port}\r\n'
+            'Upgrade: websocket\r\nConnection: Upgrade\r\n'
+            f'Sec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n'
+        ).encode())
+        head = await asyncio.wait_for(self.reader.readuntil(b'\r\n\r\n'), timeout)
+        if b' 101 ' not in head.split(b'\r\n', 1)[0]:
+            raise ConnectionError(head.split(b'\r\n', 1)[0].decode(errors='replace'))
+        opened = await asyncio.wait_for(self.recv(), timeout)
+        if not opened.startswith('0'):
+            raise ConnectionError(f'unexpected open packet {opened[:40]!r}')
+        self.send('40')
+        while True:
+            packet = await asyncio.wait_for(self.recv(), timeout)
+            if packet.startswith('40'):
+                return
+            if packet.startswith('44'):
+                raise ConnectionError('connection rejected by server')
+
+    def send(self, text):
+        data = text.encode()
+        mask = os.urandom(4)
+        header = bytes([0x81])
+        if len(data) < 126:
+            header += bytes([0x80 | len(data)])
+        else:
+            header += bytes([0x80 | 126]) + struct.pack('>H', len(data))
+        masked = bytes(b ^ mask[i % 4] for i, b in enumerate(data))
+        self.writer.write(header + mask + masked)
+
+    async def recv(self):
+        first, second = await self.reader.readexactly(2)
+        length = second & 0x7f
+        if length == 126:
+            length = struct.unpack('>H', await self.reader.readexactly(2))[0]
+        elif length == 127:
+            length = struct.unpack('>Q', await self.reader.readexactly(8))[0]
+        payload = await self.reader.readexactly(length)
+        if first & 0x0f == 0x8:
+            raise ConnectionError('closed by server')
+        return payload.decode(errors='replace')
+
+    async def hold(self):
+        """保持连接：回应服务器心跳，直到连接被关闭"""
+        try:
+            while True:
+                packet = await self.recv()
+                if packet == '2':
+                    self.send('3')
+        except (ConnectionError, asyncio.IncompleteReadError, OSError):
+            pass
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+async def open_clients(host, port, count, timeout, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    clients, latencies, errors = [], [], {}
+
+    async def one():
+        client = WebSocketClient(host, port)
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await client.connect(timeout)
+            except (OSError, ConnectionError, asyncio.TimeoutError, asyncio.IncompleteReadError) as e:
+                name = type(e).__name__ if not str(e) else str(e)[:60]
+                errors[name] = errors.get(name, 0) + 1
+                client.close()
+                return
+            latencies.append(time.perf_counter() - start)
+        clients.append(client)
+        asyncio.ensure_future(client.hold())
+
+    await asyncio.gather(*(one() for _ in range(count)))
+    return clients, latencies, errors
+
+
+def percentile(values, q):
+    if not values:
+        return float('nan')
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+async def ramp(host, port, levels, timeout, concurrency):
+    clients = []
+    ceiling = None
+    print(f'{"level":>7}{"open":>7}{"failed":>8}{"p50 ms":>9}{"p95 ms":>9}  errors')
+    for level in levels:
+        new, latencies, errors = await open_clients(host, port, level - len(clients), timeout, concurrency)
+        clients.extend(new)
+        await asyncio.sleep(1)  # 让被服务器关闭的连接有机会被发现
+        clients = [c for c in clients if not c.writer.is_closing() and not c.reader.at_eof()]
+        failed = level - len(clients)
+        p50, p95 = percentile(latencies, 0.5) * 1000, percentile(latencies, 0.95) * 1000
+        print(f'{level:>7}{len(clients):>7}{failed:>8}{p50:>9.1f}{p95:>9.1f}  {errors or ""}')
+        if failed > level * 0.01 or p95 > 1000:
+            ceiling = level
+            break
+    for client in clients:
+        client.close()
+    return ceiling, len(clients)
+
+
+def wait_ready(url, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(url + '/games', timeout=1).read()
+            return True
+        except OSError:
+            time.sleep(0.3)
+    return False
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--url')
+    parser.add_argument('--mode', default=None, help='async mode for the local server')
+    parser.add_argument('--levels', default='100,250,500,1000,2000')
+    parser.add_argument('--timeout', type=float, default=5.0)
+    parser.add_argument('--concurrency', type=int, default=100, help='simultaneous handshakes')
+    args = parser.parse_args()
+
+    # 每个连接占一个文件描述符，本地测试时客户端和服务端都要计算在内
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    levels = [int(n) for n in args.levels.split(',')]
+
+    server = None
+    url = args.url
+    if url is None:
+        port = free_port()
+        url = f'http://127.0.0.1:{port}'
+        cmd = [sys.executable, os.path.join(ROOT, 'serve.py'), '--port', str(port)]
+        if args.mode:
+            cmd += ['--mode', args.mode]
+        server = subprocess.Popen(cmd, cwd=ROOT)
+        if not wait_ready(url):
+            server.kill()
+            sys.exit('server did not start')
+
+    parsed = urllib.parse.urlparse(url)
+    print(f'target={url} nofile={hard} handshake timeout={args.timeout}s')
+    try:
+        ceiling, held = asyncio.run(ramp(parsed.hostname, parsed.port or 80, levels, args.timeout, args.concurrency))
+        if ceiling is None:
+            print(f'no ceiling reached: held {held} concurrent connections')
+        else:
+            print(f'ceiling reached at {ceiling} connections (held {held})')
+    finally:
+        if server is not None:
+            start = time.perf_counter()
+            server.send_signal(signal.SIGTERM)
+            server.wait(timeout=120)
+            print(f'server shut down in {time.perf_counter() - start:.1f}s (exit code {server.returncode})')
+
+
+if __name__ == '__main__':
+    main()
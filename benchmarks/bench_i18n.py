@@ -0,0 +1,78 @@
+"""对比多语言文案的加载方式：旧的模块内大字典 vs 按语言懒加载的目录文件
+
+用法：python benchmarks/bench_i18n.py
+每种方式在独立子进程中运行（先预热一次以生成 .pyc，与线上一致），
+报告加载耗时与常驻内存（RSS）增量的中位数。
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TRANSLATIONS_DIR = os.path.join(ROOT, 'translations')
+LANGUAGES = ['zh', 'en', 'ja', 'ko', 'ru', 'es']
+
+# 子进程里执行的测量代码：{setup} 为被测的加载方式
+# json/threading 等标准库 app.py 本来就会导入，先导入以免计入被测开销
+PROBE = r'''
+import sys, time, json, marshal, threading, collections.abc
+sys.path.insert(0, {root!r})
+def rss_kb():
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1])
+    return 0
+before = rss_kb()
+start = time.perf_counter()
+{setup}
+elapsed = time.perf_counter() - start
+print(elapsed * 1000, rss_kb() - before)
+'''
+
+
+def write_eager_module(directory):
+    """用 JSON 目录重新生成旧式的 LANG_TEXT 字面量模块"""
+    tables = {}
+    for lang in LANGUAGES:
+        with open(os.path.join(TRANSLATIONS_DIR, f'{lang}.json'), 'r', encoding='utf-8') as f:
+            tables[lang] = json.load(f)
+    path = os.path.join(directory, 'eager_lang_text.py')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('LANG_TEXT = ' + repr(tables) + '\n')
+    return path
+
+
+def run(setup, extra_path, repeat=7):
+    code = PROBE.format(root=ROOT, setup=setup)
+    env = dict(os.environ, PYTHONPATH=extra_path)
+    subprocess.run([sys.executable, '-c', code], capture_output=True, env=env, check=True)
+    times, rss = [], []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, env=env, check=True)
+        ms, kb = out.stdout.split()
+        times.append(float(ms))
+        rss.append(int(kb))
+    return sorted(times)[repeat // 2], sorted(rss)[repeat // 2]
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        write_eager_module(tmp)
+        cases = [
+            ('eager (all languages in module)', 'import eager_lang_text; t = eager_lang_text.LANG_TEXT["zh"]'),
+            ('lazy (first language on demand)', 'from i18n import LazyCatalogs\n'
+             f't = LazyCatalogs({TRANSLATIONS_DIR!r}, {LANGUAGES!r})["zh"]'),
+            ('lazy (all languages preloaded)', 'from i18n import LazyCatalogs\n'
+             f't = LazyCatalogs({TRANSLATIONS_DIR!r}, {LANGUAGES!r}).preload()'),
+        ]
+        print(f'{"mode":<36}{"time (ms)":>12}{"RSS (KB)":>12}')
+        for name, setup in cases:
+            ms, kb = run(setup, tmp)
+            print(f'{name:<36}{ms:>12.2f}{kb:>12}')
+
+
+if __name__ == '__main__':
+    main()
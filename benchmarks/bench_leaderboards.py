@@ -0,0 +1,111 @@
+"""排行榜的提交和名次查询：可索引跳表 vs 有序列表（bisect.insort）vs 查询时排序的字典
+
+用法：python benchmarks/bench_leaderboards.py [--players 10000,100000,300000] [--ops 20000]
+
+先让 n 个玩家各提交一次成绩，再测量 ops 次操作，每次操作随机选一个玩家：
+刷新最好成绩（删除旧成绩再插入新成绩）、查询其名次、读取前 10 名。
+  skiplist  leaderboards.Leaderboard（IndexableSkipList），三种操作都不超过 O(log n + N)
+  insort    有序列表 + bisect：查名次 O(log n)，但插入 / 删除要移动 O(n) 个元素
+  sort      只维护 玩家 -> 成绩 的字典，查名次时统计更高的成绩 O(n)，前 10 名 heapq O(n)
+sort 的名次查询在大榜单上很慢，只测量 ops / 100 次并按比例折算。
+"""
+import argparse
+import bisect
+import heapq
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from leaderboards import Leaderboard
+
+
+class InsortBoard:
+    def __init__(self):
+        self._list = []
+        self._keys = {}
+
+    def submit(self, player, score, at):
+        key = (-score, at, player)
+        old = self._keys.get(player)
+        if old is not None:
+            if key[0] >= old[0]:
+                return False
+            del self._list[bisect.bisect_left(self._list, old)]
+        bisect.insort(self._list, key)
+        self._keys[player] = key
+        return True
+
+    def rank(self, player):
+        key = self._keys[player]
+        return bisect.bisect_left(self._list, key) + 1, -key[0]
+
+    def top(self, n):
+        return self._list[:n]
+
+
+class SortBoard:
+    def __init__(self):
+        self._keys = {}
+
+    def submit(self, player, score, at):
+        key = (-score, at, player)
+        old = self._keys.get(player)
+        if old is not None and key[0] >= old[0]:
+            return False
+        self._keys[player] = key
+        return True
+
+    def rank(self, player):
+        key = self._keys[player]
+        return sum(1 for other in self._keys.values() if other < key) + 1, -key[0]
+
+    def top(self, n):
+        return heapq.nsmallest(n, self._keys.values())
+
+
+def measure(board, players, ops, rng, scores):
+    timings = {}
+    sample = [rng.randrange(players) for _ in range(ops)]
+    start = time.perf_counter()
+    for i, p in enumerate(sample):
+        scores[p] += rng.randint(1, 1000)
+        board.submit(f'p{p}', scores[p], players + i)
+    timings['submit'] = (time.perf_counter() - start) / ops
+    rank_ops = ops if not isinstance(board, SortBoard) else max(1, ops // 100)
+    start = time.perf_counter()
+    for p in sample[:rank_ops]:
+        board.rank(f'p{p}')
+    timings['rank'] = (time.perf_counter() - start) / rank_ops
+    start = time.perf_counter()
+    for _ in range(rank_ops):
+        board.top(10)
+    timings['top10'] = (time.perf_counter() - start) / rank_ops
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--players', default='10000,100000,300000')
+    parser.add_argument('--ops', type=int, default=20000)
+    args = parser.parse_args()
+
+    print(f'{"players":>8}{"board":>10}{"build s":>9}{"submit us":>11}{"rank us":>10}{"top10 us":>10}')
+    for players in [int(n) for n in args.players.split(',')]:
+        for name, board_class in (('skiplist', Leaderboard), ('insort', InsortBoard), ('sort', SortBoard)):
+            rng = random.Random(1)
+            scores = [rng.randint(0, 100000) for _ in range(players)]
+            board = board_class()
+            start = time.perf_counter()
+            for p, score in enumerate(scores):
+                board.submit(f'p{p}', score, p)
+            build = time.perf_counter() - start
+            t = measure(board, players, args.ops, rng, scores)
+            print(f'{players:>8}{name:>10}{build:>9.2f}{t["submit"] * 1e6:>11.2f}{t["rank"] * 1e6:>10.2f}'
+                  f'{t["top10"] * 1e6:>10.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""物理推进对比：逐对象 Python 模拟 vs NumPy 批量模拟
+
+用法：python benchmarks/bench_physics.py [--ticks N] [--rooms 1,100,1000]
+每个房间 4 名玩家，随机输入（约一半时间在开火），每 20 个 tick 换一次输入。
+报告每个 tick 推进全部房间的平均耗时（不含快照编码和广播）。
+为保证测量期间房间不会结束，生命值和获胜分数临时调高。
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from simulations import AsteroidsSimulation, TankSimulation
+from vector_physics import AsteroidsBatch, TankBatch
+
+DT = 1.0 / 20
+PLAYERS = ['p0', 'p1', 'p2', 'p3']
+GAMES = {'tank': (TankSimulation, TankBatch), 'asteroids': (AsteroidsSimulation, AsteroidsBatch)}
+
+
+def random_commands(simulation_class, rng):
+    return {uid: simulation_class.sanitize_input({
+        'move': rng.choice((-1, 0, 1)), 'turn': rng.choice((-1, 0, 1)),
+        'thrust': rng.random() < 0.5, 'fire': rng.random() < 0.5,
+    }) for uid in PLAYERS}
+
+
+def run_python(simulation_class, rooms, ticks, seed=1):
+    rng = random.Random(seed)
+    simulations = [simulation_class(PLAYERS, rng=random.Random(i)) for i in range(rooms)]
+    commands = [None] * rooms
+    elapsed = 0.0
+    for tick in range(ticks):
+        if tick % 20 == 0:
+            commands = [random_commands(simulation_class, rng) for _ in range(rooms)]
+        start = time.perf_counter()
+        for simulation, inputs in zip(simulations, commands):
+            simulation.step(inputs, DT)
+        elapsed += time.perf_counter() - start
+    return elapsed / ticks * 1000
+
+
+def run_batch(simulation_class, batch_class, rooms, ticks, seed=1):
+    rng = random.Random(seed)
+    batch = batch_class(seed=seed)
+    views = [batch.add_room(i, PLAYERS) for i in range(rooms)]
+    elapsed = 0.0
+    for tick in range(ticks):
+        if tick % 20 == 0:
+            for view in views:
+                for uid, command in random_commands(simulation_class, rng).items():
+                    view.set_input(uid, command)
+        start = time.perf_counter()
+        batch.step(DT)
+        elapsed += time.perf_counter() - start
+    return elapsed / ticks * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--ticks', type=int, default=200)
+    parser.add_argument('--rooms', default='1,100,1000')
+    args = parser.parse_args()
+
+    TankSimulation.MAX_HP = AsteroidsSimulation.MAX_HP = 30000  # 生命值数组为 int16
+    AsteroidsSimulation.WIN_SCORE = 10 ** 6
+
+    print(f'ticks={args.ticks} players/room={len(PLAYERS)} dt={DT}s')
+    print(f'{"game":<11}{"rooms":>7}{"python ms/tick":>16}{"numpy ms/tick":>15}{"speedup":>9}')
+    for game_type, (simulation_class, batch_class) in GAMES.items():
+        for rooms in (int(n) for n in args.rooms.split(',')):
+            python_ms = run_python(simulation_class, rooms, args.ticks)
+            numpy_ms = run_batch(simulation_class, batch_class, rooms, args.ticks)
+            print(f'{game_type:<11}{rooms:>7}{python_ms:>16.3f}{numpy_ms:>15.3f}{python_ms / numpy_ms:>8.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""录像对 tick 耗时的影响：同一批房间分别在不录像 / 录像时推进
+
+用法：python benchmarks/bench_replay.py [--rooms 10,100,500] [--ticks 400] [--game tank] [--unpaced]
+
+与 app.py 相同：tick 引擎每个 tick 调用 broadcast(room_id, snapshot)，录像开启时其中只调用
+ReplayRecorder.record_tick（入队），tick 结束时调用 end_tick 唤醒写线程，输入每 20 个 tick 变化一次并调用 record_input。
+广播本身不计入（broadcast 只做录像），以便单独看录像的开销。
+默认与线上一样每 50ms 推进一次，后台写线程在 tick 之间的空闲时间工作；--unpaced 时连续推进，
+写线程与 tick 线程争用 GIL（相当于 CPU 已满载时的情况）。报告：
+  tick ms     step_all 的平均 / p99 耗时
+  drain s     tick 结束后后台线程写完剩余队列的时间
+  KB/room/s   每个房间每秒对局的录像大小
+  read ms     用 read_replay（mmap）解析一个房间完整录像的耗时
+为保证测量期间房间不会结束，生命值和获胜分数临时调高。
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from replays import ReplayRecorder, read_replay, replay_path
+from simulations import AsteroidsSimulation, PongSimulation, TankSimulation
+from tick_engine import TickEngine
+
+PLAYERS = ['p0', 'p1', 'p2', 'p3']
+
+
+def random_input(rng):
+    return {'move': rng.choice((-1, 0, 1)), 'turn': rng.choice((-1, 0, 1)), 'dy': rng.choice((-1, 0, 1)),
+            'thrust': rng.random() < 0.5, 'fire': rng.random() < 0.5}
+
+
+def run(game_type, rooms, ticks, recorder, paced, seed=1):
+    rng = random.Random(seed)
+    broadcast = recorder.record_tick if recorder is not None else (lambda room_id, snapshot: None)
+    engine = TickEngine(broadcast, tick_rate=20,
+                        on_tick_end=recorder.end_tick if recorder is not None else None)
+    players = PLAYERS[:2] if game_type == 'pong' else PLAYERS
+    room_ids = [f'room-{i}' for i in range(rooms)]
+    for room_id in room_ids:
+        engine.start_room(room_id, game_type, list(players))
+        if recorder is not None:
+            recorder.start(room_id, game_type, [{'id': p, 'username': p} for p in players], engine.tick_rate)
+    engine.stop()  # 由本脚本逐 tick 调用 step_all，不启动后台循环
+    times = []
+    next_tick = time.perf_counter()
+    for tick in range(ticks):
+        if tick % 20 == 0:
+            for room_id in room_ids:
+                for player in players:
+                    engine.submit_input(room_id, player, random_input(rng))
+                    if recorder is not None:
+                        recorder.record_input(room_id, player, engine.rooms[room_id].inputs[player])
+        times.append(engine.step_all() * 1000)
+        if paced:
+            next_tick += engine.dt
+            time.sleep(max(0.0, next_tick - time.perf_counter()))
+    drain = 0.0
+    if recorder is not None:
+        start = time.perf_counter()
+        recorder.close(timeout=300)
+        drain = time.perf_counter() - start
+    times.sort()
+    return sum(times) / len(times), times[int(0.99 * (len(times) - 1))], drain
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rooms', default='10,100,500')
+    parser.add_argument('--ticks', type=int, default=400)
+    parser.add_argument('--game', default='tank', choices=('tank', 'asteroids', 'pong'))
+    parser.add_argument('--unpaced', action='store_true')
+    args = parser.parse_args()
+
+    TankSimulation.MAX_HP = AsteroidsSimulation.MAX_HP = 30000
+    AsteroidsSimulation.WIN_SCORE = PongSimulation.WIN_SCORE = 10 ** 6
+
+    print(f'game={args.game} ticks={args.ticks} tick_rate=20 paced={not args.unpaced}')
+    print(f'{"rooms":>6}{"off ms":>9}{"p99":>7}{"rec ms":>9}{"p99":>7}{"overhead":>10}{"drain s":>9}'
+          f'{"KB/room/s":>11}{"read ms":>9}')
+    for rooms in [int(n) for n in args.rooms.split(',')]:
+        off_avg, off_p99, _ = run(args.game, rooms, args.ticks, None, not args.unpaced)
+        directory = tempfile.mkdtemp(prefix='bench-replay-')
+        try:
+            recorder = ReplayRecorder(directory)
+            rec_avg, rec_p99, drain = run(args.game, rooms, args.ticks, recorder, not args.unpaced)
+            seconds = args.ticks / 20
+            kb = recorder.bytes_written / 1024 / rooms / seconds
+            start = time.perf_counter()
+            read_replay(replay_path(directory, 'room-0'))
+            read_ms = (time.perf_counter() - start) * 1000
+        finally:
+            shutil.rmtree(directory)
+        print(f'{rooms:>6}{off_avg:>9.3f}{off_p99:>7.2f}{rec_avg:>9.3f}{rec_p99:>7.2f}'
+              f'{(rec_avg - off_avg) / off_avg * 100:>9.1f}%{drain:>9.2f}{kb:>11.2f}{read_ms:>9.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""GameRoom 内存与操作延迟基准：旧实现（玩家 dict 列表）vs __slots__ + 按 id 索引
+
+用法：python benchmarks/bench_rooms.py [--rooms N]
+创建 N 个满员（4 人）房间，用 tracemalloc 统计内存；再对每个房间执行
+准备切换、can_start、成员判断、移除玩家，报告每次操作的平均耗时。
+"""
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rooms import GameRoom
+
+
+class LegacyGameRoom:
+    """改造前 app.py 中的实现，用作对照"""
+
+    def __init__(self, room_id, game_type, max_players=4):
+        self.room_id = room_id
+        self.game_type = game_type
+        self.max_players = max_players
+        self.players = []
+        self.owner = None
+        self.status = 'waiting'
+        self.created_at = time.time()
+        self.game_data = {}
+
+    def add_player(self, user_id, username):
+        if len(self.players) < self.max_players and user_id not in [p['id'] for p in self.players]:
+            self.players.append({'id': user_id, 'username': username, 'joined_at': time.time(), 'ready': False})
+            if not self.owner:
+                self.owner = user_id
+            return True
+        return False
+
+    def remove_player(self, user_id):
+        self.players = [p for p in self.players if p['id'] != user_id]
+        if self.owner == user_id and self.players:
+            self.owner = self.players[0]['id']
+        elif not self.players:
+            self.owner = None
+
+    def toggle_ready(self, user_id):
+        # 旧的 handle_toggle_ready 中的线性查找
+        for player in self.players:
+            if player['id'] == user_id:
+                player['ready'] = not player['ready']
+                return player['ready']
+
+    def has_player(self, user_id):
+        return user_id in [p['id'] for p in self.players]
+
+    def can_start(self):
+        return len(self.players) >= 2 and all(p['ready'] for p in self.players)
+
+
+def has_player(room, user_id):
+    return user_id in room
+
+
+def build(cls, count):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    rooms = []
+    for i in range(count):
+        room = cls(f'room-{i}', 'tank')
+        for j in range(4):
+            room.add_player(f'user-{i}-{j}', f'player{j}')
+        rooms.append(room)
+    elapsed = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return rooms, current, elapsed
+
+
+def timed(rooms, op):
+    start = time.perf_counter()
+    for i, room in enumerate(rooms):
+        op(room, i)
+    return (time.perf_counter() - start) / len(rooms) * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rooms', type=int, default=100_000)
+    args = parser.parse_args()
+
+    print(f'{args.rooms} rooms x 4 players')
+    header = f'{"impl":<10}{"MB":>8}{"B/room":>9}{"add ns":>9}{"ready ns":>10}{"start ns":>10}{"member ns":>11}{"remove ns":>11}'
+    print(header)
+    for name, cls, member in (('legacy', LegacyGameRoom, LegacyGameRoom.has_player), ('slots', GameRoom, has_player)):
+        rooms, mem, build_s = build(cls, args.rooms)
+        add_ns = build_s / (args.rooms * 4) * 1e9
+        ready_ns = timed(rooms, lambda r, i: [r.toggle_ready(f'user-{i}-{j}') for j in range(4)]) / 4
+        start_ns = timed(rooms, lambda r, i: r.can_start())
+        member_ns = timed(rooms, lambda r, i: member(r, f'user-{i}-3'))
+        remove_ns = timed(rooms, lambda r, i: r.remove_player(f'user-{i}-0'))
+        print(f'{name:<10}{mem / 1e6:>8.1f}{mem / args.rooms:>9.0f}{add_ns:>9.0f}{ready_ns:>10.0f}'
+              f'{start_ns:>10.0f}{member_ns:>11.0f}{remove_ns:>11.0f}')
+        del rooms
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""匹配超时实现对比：每人一个 sleep 线程 vs 单个调度器
+
+用法：python benchmarks/bench_scheduler.py [--players N] [--timeout 秒]
+同时挂起 N 个匹配超时，报告高峰线程数、调度耗时和全部超时触发所需时间。
+调度器方案的线程数应与 N 无关。
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scheduler import TimerScheduler
+
+
+def run_threads(players, timeout):
+    fired = []
+    lock = threading.Lock()
+
+    def check_timeout(uid):
+        time.sleep(timeout)
+        with lock:
+            fired.append(uid)
+
+    start = time.perf_counter()
+    for uid in range(players):
+        threading.Thread(target=check_timeout, args=(uid,), daemon=True).start()
+    schedule_ms = (time.perf_counter() - start) * 1000
+    peak = threading.active_count()
+    while len(fired) < players:
+        time.sleep(0.01)
+    return peak, schedule_ms, time.perf_counter() - start
+
+
+def run_scheduler(players, timeout):
+    fired = []
+    scheduler = TimerScheduler(resolution=0.01)
+    start = time.perf_counter()
+    for uid in range(players):
+        scheduler.call_later(timeout, fired.append, uid)
+    schedule_ms = (time.perf_counter() - start) * 1000
+    peak = threading.active_count()
+    while len(fired) < players:
+        time.sleep(0.01)
+    scheduler.stop()
+    return peak, schedule_ms, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--players', type=int, default=2000)
+    parser.add_argument('--timeout', type=float, default=1.0)
+    args = parser.parse_args()
+
+    baseline = threading.active_count()
+    print(f'players={args.players} timeout={args.timeout}s baseline threads={baseline}')
+    print(f'{"mode":<12}{"peak threads":>14}{"schedule (ms)":>16}{"all fired (s)":>16}')
+    for name, fn in (('scheduler', run_scheduler), ('threads', run_threads)):
+        peak, schedule_ms, total = fn(args.players, args.timeout)
+        print(f'{name:<12}{peak:>14}{schedule_ms:>16.1f}{total:>16.2f}')
+        time.sleep(0.2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+"""分片匹配吞吐：1..N 个分片进程经 Unix socket 代理处理匹配请求
+
+用法：python benchmarks/bench_sharding.py [--shards 1,2,4] [--players 24000]
+
+每个分片进程与 app.py 中的分片相同：订阅 shard.<id> 频道，执行 join_matching
+（入队、成组、按本分片生成房间 ID、建房间），并为每名玩家发布一条 match_found。
+驱动进程按游戏类型把请求路由到对应分片（12 个游戏类型，每人一条消息），
+等全部玩家收到 match_found 后计时结束。
+
+报告：
+  wall      实测吞吐（玩家/秒）；本机 CPU 核数不足时各进程分时运行，不随分片数增长
+  busy      各分片进程从就绪到处理完全部消息的 CPU 时间（含收包和 JSON 解码），max 为最慢分片
+  parallel  各分片独占一个核时的吞吐上限 = 玩家数 / 最慢分片的 busy
+  broker    代理进程的 CPU 时间；parallel 超过 玩家数 / broker 时瓶颈变为代理
+"""
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from matchmaking import MatchmakingEngine
+from message_bus import UnixSocketBus, start_broker
+from rooms import GameRoom, RoomRegistry
+from sharding import ShardRouter
+
+GAME_TYPES = ('tank', 'snake', 'tetris', 'pacman', 'breakout', 'memory', '2048',
+              'sudoku', 'minesweeper', 'asteroids', 'pong', 'flappy')
+ROOM_SIZE = 4
+
+
+def cpu_time():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def run_shard(shard_id, shard_count, path):
+    """分片进程：与 app.join_matching / find_match 相同的工作量"""
+    bus = UnixSocketBus(path)
+    router = ShardRouter(shard_id, shard_count, GAME_TYPES)
+    engine = MatchmakingEngine(room_size=ROOM_SIZE)
+    rooms = RoomRegistry()
+    stats = {'handled': 0}
+    finished = threading.Event()
+
+    def on_message(message):
+        if message['op'] == 'join_matching':
+            args = message['args']
+            engine.enqueue(args['user_id'], args['username'], args['game_type'], sid=args['sid'])
+            for group in engine.match(args['game_type']):
+                room_id = router.new_room_id()
+                room = rooms[room_id] = GameRoom(room_id, args['game_type'])
+                for entry in group:
+                    room.add_player(entry.user_id, entry.username)
+                for player_id in room.player_ids():
+                    bus.publish('emit', {'event': 'match_found', 'to': player_id,
+                                         'data': {'room_id': room_id, 'players': room.players}})
+            stats['handled'] += 1
+        elif message['op'] == 'report':
+            bus.publish('results', dict(stats, shard=shard_id, rooms=len(rooms), busy=cpu_time() - started))
+            finished.set()
+
+    bus.subscribe(f'shard.{shard_id}', on_message)
+    bus.start()
+    started = cpu_time()
+    bus.publish('results', {'ready': shard_id})
+    finished.wait()
+    time.sleep(0.2)
+    bus.close()
+
+
+def run_level(path, shard_count, players):
+    router = ShardRouter(0, shard_count, GAME_TYPES)
+    bus = UnixSocketBus(path)
+    received = [0]
+    all_matched = threading.Event()
+    results = []
+    ready = set()
+    results_ready = threading.Event()
+    lock = threading.Lock()
+
+    def on_emit(message):
+        with lock:
+            received[0] += 1
+            if received[0] == players:
+                all_matched.set()
+
+    def on_result(message):
+        with lock:
+            if 'ready' in message:
+                ready.add(message['ready'])
+            else:
+                results.append(message)
+                if len(results) == shard_count:
+                    results_ready.set()
+
+    bus.subscribe('emit', on_emit)
+    bus.subscribe('results', on_result)
+    bus.start()
+    shards = [subprocess.Popen([sys.executable, os.path.abspath(__file__), '--run-shard', str(i),
+                                '--shard-count', str(shard_count), '--path', path])
+              for i in range(shard_count)]
+    while len(ready) < shard_count:
+        time.sleep(0.05)
+
+    start = time.perf_counter()
+    for i in range(players):
+        game_type = GAME_TYPES[i % len(GAME_TYPES)]
+        bus.publish(f'shard.{router.shard_for_game(game_type)}', {'op': 'join_matching', 'args': {
+            'user_id': f'user-{i}', 'username': f'player{i}', 'game_type': game_type, 'sid': f'sid-{i}'}})
+    if not all_matched.wait(300):
+        raise RuntimeError(f'only {received[0]} of {players} players matched')
+    wall = time.perf_counter() - start
+
+    for i in range(shard_count):
+        bus.publish(f'shard.{i}', {'op': 'report'})
+    results_ready.wait(30)
+    for shard in shards:
+        shard.wait(30)
+    bus.close()
+    return wall, sorted(results, key=lambda r: r['shard'])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--shards', default='1,2,4')
+    parser.add_argument('--players', type=int, default=24000, help='rounded to a multiple of 48')
+    parser.add_argument('--run-shard', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--shard-count', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--path', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.run_shard is not None:
+        run_shard(args.run_shard, args.shard_count, args.path)
+        return
+
+    players = max(1, args.players // (ROOM_SIZE * len(GAME_TYPES))) * ROOM_SIZE * len(GAME_TYPES)
+    print(f'cpus={os.cpu_count()} players={players} room_size={ROOM_SIZE} game_types={len(GAME_TYPES)}')
+    print(f'{"shards":>6}{"wall/s":>10}{"busy max":>10}{"busy sum":>10}{"parallel/s":>12}{"speedup":>9}'
+          f'{"broker s":>10}  per-shard players')
+    base = None
+    for shard_count in [int(n) for n in args.shards.split(',')]:
+        path = os.path.join(tempfile.gettempdir(), f'bench-bus-{os.getpid()}.sock')
+        broker = start_broker(path)
+        try:
+            wall, results = run_level(path, shard_count, players)
+        finally:
+            broker.terminate()
+            _, _, usage = os.wait4(broker.pid, 0)
+        busy = [r['busy'] for r in results]
+        parallel = players / max(busy)
+        base = base or parallel
+        print(f'{shard_count:>6}{players / wall:>10.0f}{max(busy):>10.3f}{sum(busy):>10.3f}'
+              f'{parallel:>12.0f}{parallel / base:>8.2f}x{usage.ru_utime + usage.ru_stime:>10.3f}  '
+              f'{[r["handled"] for r in results]}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""状态快照带宽对比：JSON 全量 vs MessagePack 全量 vs MessagePack 增量
+
+用法：python benchmarks/bench_snapshots.py [--seconds 秒] [--rtt-ticks N]
+用随机输入驱动 tank（4 人）和 pong（2 人）模拟，按 tick_rate=20 计算每个房间
+每秒下发的字节数（所有玩家合计）。增量模式下客户端的确认延迟 rtt-ticks 个 tick 才到达服务器。
+"""
+import argparse
+import json
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import snapshots
+from simulations import SIMULATIONS
+
+TICK_RATE = 20
+PLAYERS = {'tank': 4, 'pong': 2}
+
+
+def random_input(game_type, rng):
+    if game_type == 'tank':
+        return {'move': rng.choice((-1, 0, 1, 1)), 'turn': rng.choice((-1, 0, 0, 1)), 'fire': rng.random() < 0.3}
+    return {'dy': rng.choice((-1, 0, 1))}
+
+
+def run(game_type, seconds, rtt_ticks, seed=1):
+    rng = random.Random(seed)
+    player_ids = [f'p{i}' for i in range(PLAYERS[game_type])]
+    simulation = SIMULATIONS[game_type](player_ids, rng=random.Random(seed))
+    stream = snapshots.SnapshotStream()
+    inputs = {}
+    pending_acks = []  # (到达 tick, client, 确认的 tick)
+    totals = {'json': 0, 'msgpack': 0, 'delta': 0}
+    ticks = seconds * TICK_RATE
+    dt = 1.0 / TICK_RATE
+    for _ in range(ticks):
+        for uid in simulation.player_ids:
+            # 玩家大约每 0.5 秒改变一次操作
+            if uid not in inputs or rng.random() < 0.1:
+                inputs[uid] = simulation.sanitize_input(random_input(game_type, rng))
+        simulation.step(inputs, dt)
+        state = simulation.snapshot()
+        clients = list(player_ids)
+        totals['json'] += len(json.dumps(state, separators=(',', ':')).encode()) * len(clients)
+        totals['msgpack'] += len(snapshots.encode_keyframe(state['tick'], state)) * len(clients)
+
+        while pending_acks and pending_acks[0][0] <= state['tick']:
+            _, client, tick = pending_acks.pop(0)
+            stream.ack(client, tick)
+        for client, frame in stream.encode(state['tick'], state, clients).items():
+            totals['delta'] += len(frame)
+            pending_acks.append((state['tick'] + rtt_ticks, client, state['tick']))
+
+        if simulation.finished:
+            # 对局结束后重开一局，保持测量时长
+            simulation = SIMULATIONS[game_type](player_ids, rng=random.Random(rng.random()))
+            simulation.tick = state['tick']
+    return {name: total / seconds for name, total in totals.items()}, stream.stats()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--seconds', type=int, default=60)
+    parser.add_argument('--rtt-ticks', type=int, default=2)
+    args = parser.parse_args()
+
+    print(f'tick_rate={TICK_RATE} seconds={args.seconds} rtt_ticks={args.rtt_ticks}')
+    print(f'{"game":<8}{"json B/s":>12}{"msgpack B/s":>14}{"delta B/s":>12}{"vs json":>10}{"keyframes":>11}')
+    for game_type in PLAYERS:
+        rates, stats = run(game_type, args.seconds, args.rtt_ticks)
+        ratio = rates['delta'] / rates['json']
+        print(f'{game_type:<8}{rates["json"]:>12.0f}{rates["msgpack"]:>14.0f}{rates["delta"]:>12.0f}'
+              f'{ratio:>10.1%}{stats["keyframes"]:>11}')
+
+
+if __name__ == '__main__':
+    main()
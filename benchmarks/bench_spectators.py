@@ -0,0 +1,121 @@
+"""观战扇出的开销：每个房间挂 N 个观众时，tick 循环和扇出各花多少时间
+
+用法：python benchmarks/bench_spectators.py [--rooms 10] [--spectators 10,100,500] [--ticks 200] [--rate 5]
+
+使用真实的 socketio.Server + FlowControlManager，观众是注册在 engine.io 上的 Socket 对象
+（发送即进入各自的发送队列，每次扇出后清空队列，相当于客户端及时读走）。对比三种方式：
+  none      没有观众，tick 循环只推进模拟
+  per-tick  观众与玩家同等对待：tick 循环里每个 tick 向观众广播一帧关键帧
+  feed      SpectatorFeed：tick 循环只调用 offer()，扇出由 flush() 每 tick_rate/rate 个 tick 做一次
+报告：
+  tick ms      step_all 的平均耗时（含 tick 循环里的广播）
+  fanout ms    每次扇出的耗时：per-tick 为 tick 耗时减去 none 的 tick 耗时，feed 为每次 flush 的耗时（不在 tick 循环里）
+  us/frame     每投递一帧给一个观众的平均耗时
+  KB/s/spec    每个观众每秒收到的数据量
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import socketio
+from engineio.socket import Socket
+
+from flow_control import FlowControlManager
+from simulations import TankSimulation
+from snapshots import encode_keyframe
+from spectators import SpectatorFeed, spectate_room
+from tick_engine import TickEngine
+
+PLAYERS = ['p0', 'p1', 'p2', 'p3']
+TICK_RATE = 20
+
+
+def make_server(rooms, spectators):
+    server = socketio.Server(async_mode='threading', client_manager=FlowControlManager())
+    server.manager.configure(drop=('state', 'spectate_state'))
+    sockets = []
+    for r in range(rooms):
+        for i in range(spectators):
+            eio_sid = f'e{r}-{i}'
+            socket = server.eio.sockets[eio_sid] = Socket(server.eio, eio_sid)
+            sockets.append(socket)
+            sid = server.manager.connect(eio_sid, '/')
+            server.manager.enter_room(sid, '/', spectate_room(f'room-{r}'))
+    return server, sockets
+
+
+def drain(sockets):
+    """模拟客户端读走发送队列，返回读到的字节数"""
+    received = 0
+    for socket in sockets:
+        while not socket.queue.empty():
+            received += len(socket.queue.get_nowait().data)
+    return received
+
+
+def run(mode, rooms, spectators, ticks, rate, baseline=0.0):
+    server, sockets = make_server(rooms, spectators if mode != 'none' else 0)
+    emit = lambda event, payload, to: server.emit(event, payload, to=to)
+    feed = SpectatorFeed(emit, rate=rate, keyframe_every=2 * rate)
+
+    def broadcast(room_id, snapshot):
+        if mode == 'per-tick':
+            emit('spectate_state', encode_keyframe(snapshot['tick'], snapshot), spectate_room(room_id))
+        elif mode == 'feed':
+            feed.offer(room_id, snapshot)
+
+    engine = TickEngine(broadcast, tick_rate=TICK_RATE)
+    room_ids = [f'room-{r}' for r in range(rooms)]
+    for room_id in room_ids:
+        engine.start_room(room_id, 'tank', list(PLAYERS))
+        if mode == 'feed':
+            for i in range(spectators):
+                feed.add(room_id, f'{room_id}-{i}')
+    engine.stop()
+    every = max(1, TICK_RATE // rate)
+    tick_ms, flush_ms, received, frames = [], [], 0, 0
+    for tick in range(ticks):
+        tick_ms.append(engine.step_all() * 1000)
+        if mode == 'feed' and tick % every == 0:
+            start = time.perf_counter()
+            feed.flush()
+            flush_ms.append((time.perf_counter() - start) * 1000)
+        if mode != 'none':
+            sent = sum(socket.queue.qsize() for socket in sockets)
+            frames += sent
+            received += drain(sockets)
+    seconds = ticks / TICK_RATE
+    tick_avg = sum(tick_ms) / len(tick_ms)
+    if mode == 'none':
+        return tick_avg, 0.0, 0.0, 0.0
+    if mode == 'feed':
+        fanout_total, fanout_avg = sum(flush_ms), sum(flush_ms) / len(flush_ms)
+    else:
+        fanout_total, fanout_avg = (tick_avg - baseline) * ticks, tick_avg - baseline
+    return tick_avg, fanout_avg, fanout_total * 1000 / frames, received / 1024 / len(sockets) / seconds
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rooms', type=int, default=10)
+    parser.add_argument('--spectators', default='10,100,500')
+    parser.add_argument('--ticks', type=int, default=200)
+    parser.add_argument('--rate', type=int, default=5)
+    args = parser.parse_args()
+    TankSimulation.MAX_HP = 30000  # 测量期间对局不结束
+
+    baseline = run('none', args.rooms, 0, args.ticks, args.rate)[0]
+    print(f'rooms={args.rooms} ticks={args.ticks} tick_rate={TICK_RATE} spectator rate={args.rate}/s '
+          f'baseline tick={baseline:.3f} ms')
+    print(f'{"spec/room":>10}{"mode":>10}{"tick ms":>10}{"fanout ms":>11}{"us/frame":>10}{"KB/s/spec":>11}')
+    for spectators in [int(n) for n in args.spectators.split(',')]:
+        for mode in ('per-tick', 'feed'):
+            tick_avg, fanout, us, kbs = run(mode, args.rooms, spectators, args.ticks, args.rate, baseline)
+            print(f'{spectators:>10}{mode:>10}{tick_avg:>10.3f}{fanout:>11.3f}{us:>10.2f}{kbs:>11.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""冷启动基准：导入 app 模块、预热（create_app）与首个请求的耗时
+
+用法：python benchmarks/bench_startup.py [--repeat N] [--root 目录]
+每轮在全新子进程中测量，模拟 gunicorn 新 worker 启动；输出各阶段耗时的中位数。
+--root 指向其他检出（如 git worktree）即可对比改动前后；没有 warmup() 的旧版本预热阶段记为 0。
+导入阶段不应读写任何数据文件，可配合 strace/inotify 检查。
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = r'''
+import json, sys, time
+sys.path.insert(0, {root!r})
+t0 = time.perf_counter()
+import app as module
+t1 = time.perf_counter()
+timings = module.warmup(module.app) if hasattr(module, 'warmup') else {{}}
+t2 = time.perf_counter()
+client = module.app.test_client()
+with client.session_transaction() as sess:
+    sess['user'] = 'bench'
+    sess['user_id'] = 'bench'
+client.get('/games')
+t3 = time.perf_counter()
+client.get('/games')
+t4 = time.perf_counter()
+print(json.dumps({{
+    'import_ms': (t1 - t0) * 1000,
+    'warmup_ms': (t2 - t1) * 1000,
+    'first_request_ms': (t3 - t2) * 1000,
+    'second_request_ms': (t4 - t3) * 1000,
+    **{{'warmup_' + k + '_ms': v for k, v in timings.items()}},
+}}))
+'''
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--root', default=ROOT, help='被测的代码目录')
+    args = parser.parse_args()
+    root = os.path.abspath(args.root)
+
+    runs = []
+    for _ in range(args.repeat):
+        out = subprocess.run([sys.executable, '-c', PROBE.format(root=root)],
+                             capture_output=True, text=True, check=True, cwd=root)
+        runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+    for key in runs[0]:
+        values = sorted(r.get(key, 0.0) for r in runs)
+        print(f'{key:<28}{values[len(values) // 2]:>10.1f}')
+
+
+if __name__ == '__main__':
+    main()
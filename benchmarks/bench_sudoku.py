@@ -0,0 +1,72 @@
+"""数独生成吞吐量、唯一解检查耗时和题库取题耗时
+
+用法：python benchmarks/bench_sudoku.py [--count 30] [--seed 1]
+
+对每个目标难度生成 count 题，报告：
+  puzzles/s   单进程生成速度（终盘 + 挖空时每格一次唯一解检查 + 评级）
+  clues       生成题目的提示数范围
+  graded      按实际评级的分布（生成结果归入实际难度的题库）
+  check ms    对生成的题目做一次 count_solutions(limit=2) 的平均耗时
+最后对比题库取题（PuzzleBank.take，O(1)）与请求时现场生成一题的耗时。
+"""
+import argparse
+import collections
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sudoku import DIFFICULTIES, PuzzleBank, count_solutions, fill_bank, generate
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--count', type=int, default=30)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    print(f'{"target":>8}{"puzzles/s":>11}{"clues":>9}{"check ms":>10}  graded')
+    generate_ms = []
+    for difficulty in DIFFICULTIES:
+        graded = collections.Counter()
+        puzzles = []
+        start = time.perf_counter()
+        for _ in range(args.count):
+            puzzle, _, actual = generate(difficulty, rng)
+            graded[actual] += 1
+            puzzles.append(puzzle)
+        elapsed = time.perf_counter() - start
+        generate_ms.append(elapsed / args.count * 1000)
+        start = time.perf_counter()
+        for puzzle in puzzles:
+            count_solutions(puzzle, 2)
+        check_ms = (time.perf_counter() - start) / len(puzzles) * 1000
+        clues = [81 - puzzle.count('0') for puzzle in puzzles]
+        print(f'{difficulty:>8}{args.count / elapsed:>11.1f}{f"{min(clues)}-{max(clues)}":>9}{check_ms:>10.2f}  '
+              + ' '.join(f'{d}={graded[d]}' for d in DIFFICULTIES))
+
+    directory = tempfile.mkdtemp(prefix='bench-sudoku-')
+    try:
+        start = time.perf_counter()
+        fill_bank(directory, 20, rng)
+        fill_s = time.perf_counter() - start
+        bank = PuzzleBank(directory, target=20)
+        bank.refresh()
+        takes = 100000
+        start = time.perf_counter()
+        for i in range(takes):
+            bank.take(DIFFICULTIES[i % len(DIFFICULTIES)], rng)
+        take_us = (time.perf_counter() - start) / takes * 1e6
+    finally:
+        shutil.rmtree(directory)
+    print(f'fill_bank: 20 puzzles per difficulty in {fill_s:.1f}s')
+    print(f'serve: bank take {take_us:.2f} us vs on-demand generate {sum(generate_ms) / len(generate_ms):.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""匹配质量与等待时间模拟：FIFO 匹配 vs 评分分桶匹配
+
+用法：python benchmarks/sim_matchmaking.py [--players 300,3000] [--hours 4] [--widen 2,5,10] [--rtt-scale 0,50]
+
+每个合成玩家有一个真实水平（正态分布，均值 1500，标准差 300）和固定的 RTT
+（对数正态分布，中位数 60ms），循环执行：
+空闲（指数分布，均值 --idle 秒）→ 排队 → 对局 --game 秒 → 空闲……
+对局胜者按真实水平（Elo 期望）随机产生，评分用 ratings.RatingStore 更新（只在内存中）。
+虚拟时钟按 0.5 秒推进，新入队玩家立即搜索，每 widen_after 秒对全部等待者重新搜索。
+前一半时间用于让评分收敛，只统计后一半：
+  wait          排队等待时间 p50 / p95（秒）
+  rating gap    同组玩家评分差（最高 - 最低）p50 / p95
+  skill gap     同组玩家真实水平差 p50 / p95，反映对局是否势均力敌
+  rtt gap       同组玩家 RTT 差 p50 / p95（毫秒），rtt_scale=0 时匹配不考虑 RTT
+  rmse          评分与真实水平的均方根误差（去掉整体偏移）
+"""
+import argparse
+import math
+import os
+import random
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from matchmaking import MatchmakingEngine, RatedMatchmakingEngine
+from ratings import RatingStore
+
+GAME = 'tank'
+STEP = 0.5
+
+
+def percentile(values, q):
+    if not values:
+        return float('nan')
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def simulate(engine, players, hours, idle, game_length, sweep_every, seed):
+    rng = random.Random(seed)
+    skills = {f'p{i}': rng.gauss(1500, 300) for i in range(players)}
+    rtts = {p: min(rng.lognormvariate(math.log(60), 0.6), 1000) for p in skills}
+    store = RatingStore(tempfile.gettempdir())  # 只读写内存，不调用 flush
+    store._ratings[GAME] = {}
+    wake_at = {p: rng.expovariate(1 / idle) for p in skills}
+    duration = hours * 3600
+    warmup = duration / 2
+    waits, rating_gaps, skill_gaps, rtt_gaps = [], [], [], []
+
+    def play(group, now):
+        members = [entry.user_id for entry in group]
+        if now >= warmup:
+            for entry in group:
+                waits.append(now - entry.joined_at)
+            ratings = [entry.rating for entry in group if entry.rating is not None]
+            if ratings:
+                rating_gaps.append(max(ratings) - min(ratings))
+            member_skills = [skills[m] for m in members]
+            skill_gaps.append(max(member_skills) - min(member_skills))
+            member_rtts = [rtts[m] for m in members]
+            rtt_gaps.append(max(member_rtts) - min(member_rtts))
+        weights = [10 ** (skills[m] / 400) for m in members]
+        winner = rng.choices(range(len(members)), weights)[0]
+        store.record_result(GAME, members, winner, now=now)
+        for m in members:
+            wake_at[m] = now + game_length + rng.expovariate(1 / idle)
+
+    now = 0.0
+    next_sweep = sweep_every
+    while now < duration:
+        for player, at in list(wake_at.items()):
+            if at <= now:
+                del wake_at[player]
+                engine.enqueue(player, player, GAME, now=now, rating=store.get(GAME, player).rating,
+                               rtt=rtts[player])
+                for group in engine.match(GAME, now=now, user_id=player):
+                    play(group, now)
+        if now >= next_sweep:
+            for group in engine.match(GAME, now=now):
+                play(group, now)
+            next_sweep += sweep_every
+        now += STEP
+
+    ratings = {p: store.get(GAME, p).rating for p in skills}
+    offset = sum(ratings[p] - skills[p] for p in skills) / len(skills)
+    rmse = math.sqrt(sum((ratings[p] - skills[p] - offset) ** 2 for p in skills) / len(skills))
+    return waits, rating_gaps, skill_gaps, rtt_gaps, rmse
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--players', default='300,3000', help='population sizes')
+    parser.add_argument('--hours', type=float, default=4)
+    parser.add_argument('--idle', type=float, default=300, help='mean idle seconds between games')
+    parser.add_argument('--game', type=float, default=120, help='game length in seconds')
+    parser.add_argument('--widen', default='2,5,10', help='widen_after values (seconds per bucket)')
+    parser.add_argument('--bucket', type=int, default=100)
+    parser.add_argument('--rtt-scale', default='0,50', help='rtt_scale values (ms per bucket of rating)')
+    parser.add_argument('--room-size', type=int, default=2)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    print(f'hours={args.hours} idle={args.idle}s game={args.game}s bucket={args.bucket} room_size={args.room_size}')
+    print(f'{"players":>8} {"engine":<17}{"groups":>7}{"wait p50":>9}{"p95":>7}'
+          f'{"rgap p50":>9}{"p95":>6}{"sgap p50":>9}{"p95":>6}{"tgap p50":>9}{"p95":>6}{"rmse":>6}')
+    for players in [int(n) for n in args.players.split(',')]:
+        configs = [('fifo', MatchmakingEngine(room_size=args.room_size), 2.0)]
+        for widen in [float(w) for w in args.widen.split(',')]:
+            for rtt_scale in [float(r) for r in args.rtt_scale.split(',')]:
+                engine = RatedMatchmakingEngine(room_size=args.room_size, bucket_width=args.bucket,
+                                                widen_after=widen, rtt_scale=rtt_scale)
+                configs.append((f'w={widen:g}s rtt={rtt_scale:g}', engine, widen))
+        for name, engine, sweep_every in configs:
+            waits, rating_gaps, skill_gaps, rtt_gaps, rmse = simulate(
+                engine, players, args.hours, args.idle, args.game, sweep_every, args.seed)
+            print(f'{players:>8} {name:<17}{len(skill_gaps):>7}{percentile(waits, 0.5):>9.1f}'
+                  f'{percentile(waits, 0.95):>7.1f}{percentile(rating_gaps, 0.5):>9.0f}'
+                  f'{percentile(rating_gaps, 0.95):>6.0f}{percentile(skill_gaps, 0.5):>9.0f}'
+                  f'{percentile(skill_gaps, 0.95):>6.0f}{percentile(rtt_gaps, 0.5):>9.0f}'
+                  f'{percentile(rtt_gaps, 0.95):>6.0f}{rmse:>6.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""房间聊天：每个房间一个定长环形缓冲保存最近的消息，供后加入 / 重连的玩家查看；
+消息较多时按 tick 合并成一批广播
+
+每个房间占用的内存有上限：历史最多 CHAT_HISTORY_SIZE 条、每批最多 MAX_BATCH 条，
+每条不超过 MAX_CHAT_LENGTH 个字符，与聊天总量无关。
+"""
+import collections
+import itertools
+import threading
+import time
+
+CHAT_HISTORY_SIZE = 50
+MAX_CHAT_LENGTH = 200
+MAX_BATCH = 32  # 一个 tick 内每个房间最多广播的消息数，超出的丢弃
+
+
+def clean_message(text):
+    """去掉首尾空白和控制字符并截断；无效或为空时返回 None"""
+    if not isinstance(text, str):
+        return None
+    text = ''.join(ch for ch in text[:MAX_CHAT_LENGTH * 2] if ch.isprintable()).strip()
+    return text[:MAX_CHAT_LENGTH] or None
+
+
+class ChatLog:
+    __slots__ = ('_messages',)
+
+    _ids = itertools.count(1)
+
+    def __init__(self, size=CHAT_HISTORY_SIZE):
+        self._messages = collections.deque(maxlen=size)
+
+    def __len__(self):
+        return len(self._messages)
+
+    def append(self, user_id, username, text, now=None):
+        message = {
+            'id': next(self._ids),
+            'user_id': user_id,
+            'username': username,
+            'text': text,
+            'ts': time.time() if now is None else now
+        }
+        self._messages.append(message)
+        return message
+
+    def recent(self):
+        return list(self._messages)
+
+
+class ChatBatcher:
+    """房间在一个 tick 内的第一条消息立即广播，之后的消息攒到下一个 tick 由 flush() 合并成一条 chat 事件"""
+
+    def __init__(self, emit, interval, max_batch=MAX_BATCH):
+        self.emit = emit  # emit(room_id, messages)
+        self.interval = interval
+        self.max_batch = max_batch
+        self._last_sent = {}  # room_id -> 最近一次广播的时间
+        self._pending = {}  # room_id -> [message]
+        self._lock = threading.Lock()
+        self.messages = 0
+        self.batches = 0
+        self.dropped = 0
+
+    def add(self, room_id, message, now=None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self.messages += 1
+            pending = self._pending.get(room_id)
+            if pending is None and now - self._last_sent.get(room_id, float('-inf')) >= self.interval:
+                self._last_sent[room_id] = now
+                send_now = True
+            elif pending is not None and len(pending) >= self.max_batch:
+                self.dropped += 1
+                return
+            else:
+                self._pending.setdefault(room_id, []).append(message)
+                send_now = False
+        if send_now:
+            self.emit(room_id, [message])
+
+    def flush(self, now=None):
+        """周期任务（每个 tick）：广播各房间攒下的消息"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            for room_id in pending:
+                self._last_sent[room_id] = now
+            # 长时间没有消息的房间不再记录
+            for room_id in [r for r, t in self._last_sent.items() if now - t > self.interval and r not in pending]:
+                del self._last_sent[room_id]
+        for room_id, messages in pending.items():
+            self.emit(room_id, messages)
+            self.batches += 1
+
+    def stats(self):
+        return {'messages': self.messages, 'batches': self.batches, 'dropped': self.dropped,
+                'pending_rooms': len(self._pending)}
@@ -0,0 +1,264 @@
+"""响应压缩：gzip/brotli 内容协商、静态资源预压缩缓存、动态页面流式压缩"""
+import gzip
+import hashlib
+import os
+import threading
+import zlib
+from collections import OrderedDict
+
+try:
+    import brotli  # 可选依赖，未安装时只提供 gzip
+except ImportError:
+    brotli = None
+
+# 值得压缩的 MIME 类型（图片等已压缩格式不再处理）
+COMPRESSIBLE_TYPES = {
+    'text/html',
+    'text/css',
+    'text/plain',
+    'text/javascript',
+    'application/javascript',
+    'application/json',
+    'image/svg+xml',
+}
+COMPRESSIBLE_EXTENSIONS = {'.html', '.css', '.js', '.json', '.svg', '.txt'}
+
+# 小于该字节数的响应压缩收益太小，直接原样返回
+MIN_COMPRESS_SIZE = 512
+
+# 预压缩（静态资源）用最高压缩率，动态内容用较快的级别
+STATIC_LEVELS = {'br': 11, 'gzip': 9}
+DYNAMIC_LEVELS = {'br': 5, 'gzip': 6}
+
+
+def supported_encodings():
+    """按优先级返回服务器支持的编码"""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def negotiate_encoding(accept_encoding):
+    """根据 Accept-Encoding 选择编码，返回 'br' / 'gzip' / None"""
+    if not accept_encoding:
+        return None
+    accepted = {}
+    for part in accept_encoding.split(','):
+        pieces = part.strip().split(';')
+        name = pieces[0].strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in pieces[1:]:
+            key, _, value = param.strip().partition('=')
+            if key.strip() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[name] = q
+    best, best_q = None, 0.0
+    for encoding in supported_encodings():
+        q = accepted.get(encoding, accepted.get('*', 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compress_bytes(data, encoding, level=None):
+    """一次性压缩整段数据"""
+    if encoding == 'br':
+        return brotli.compress(data, quality=DYNAMIC_LEVELS['br'] if level is None else level)
+    if encoding == 'gzip':
+        # mtime=0 保证相同输入得到相同输出，便于缓存与 ETag
+        return gzip.compress(data, compresslevel=DYNAMIC_LEVELS['gzip'] if level is None else level, mtime=0)
+    raise ValueError(f'unsupported encoding: {encoding}')
+
+
+def stream_compress(chunks, encoding, level=None):
+    """流式压缩生成器：边渲染边压缩，每个分块都 flush 以便尽早发送"""
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=DYNAMIC_LEVELS['br'] if level is None else level)
+
+        def _compress(chunk):
+            return compressor.process(chunk) + compressor.flush()
+
+        def _finish():
+            return compressor.finish()
+    else:
+        compressor = zlib.compressobj(DYNAMIC_LEVELS['gzip'] if level is None else level, zlib.DEFLATED, 31)
+
+        def _compress(chunk):
+            return compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+
+        def _finish():
+            return compressor.flush(zlib.Z_FINISH)
+
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            if chunk:
+                out = _compress(chunk)
+                if out:
+                    yield out
+        tail = _finish()
+        if tail:
+            yield tail
+    finally:
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            close()
+
+
+class CompressedCache:
+    """按内容摘要缓存压缩结果（LRU，按总字节数限制容量）；只用于与用户无关的匿名页面"""
+
+    def __init__(self, max_bytes=32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compress(self, data, encoding, level=None):
+        key = (hashlib.blake2b(data, digest_size=16).digest(), encoding)
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return cached
+            self.misses += 1
+        compressed = compress_bytes(data, encoding, level)
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = compressed
+                self._size += len(compressed)
+                while self._size > self.max_bytes and self._entries:
+                    _, evicted = self._entries.popitem(last=False)
+                    self._size -= len(evicted)
+        return compressed
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self._size, 'hits': self.hits, 'misses': self.misses}
+
+
+class StaticPrecompressor:
+    """静态文件预压缩：按 (路径, mtime, 大小) 缓存各编码的压缩结果"""
+
+    def __init__(self, static_folder):
+        self.static_folder = static_folder
+        self._files = {}  # 相对路径 -> (mtime, size, {encoding: bytes})
+        self._lock = threading.Lock()
+
+    def _compress_file(self, path, stat):
+        with open(path, 'rb') as f:
+            data = f.read()
+        variants = {}
+        for encoding in supported_encodings():
+            compressed = compress_bytes(data, encoding, STATIC_LEVELS[encoding])
+            # 压缩后反而更大的就不保存
+            if len(compressed) < len(data):
+                variants[encoding] = compressed
+        return (stat.st_mtime, stat.st_size, variants)
+
+    def get(self, filename, encoding):
+        """返回预压缩内容；文件改动后自动重新压缩，不可压缩时返回 None"""
+        if os.path.splitext(filename)[1].lower() not in COMPRESSIBLE_EXTENSIONS:
+            return None
+        path = os.path.join(self.static_folder, filename)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        with self._lock:
+            entry = self._files.get(filename)
+        if entry is None or entry[0] != stat.st_mtime or entry[1] != stat.st_size:
+            entry = self._compress_file(path, stat)
+            with self._lock:
+                self._files[filename] = entry
+        return entry[2].get(encoding)
+
+    def precompress_all(self):
+        """启动时遍历静态目录，一次性压缩全部可压缩文件"""
+        count = 0
+        for root, _, files in os.walk(self.static_folder):
+            for name in files:
+                rel = os.path.relpath(os.path.join(root, name), self.static_folder).replace(os.sep, '/')
+                for encoding in supported_encodings():
+                    if self.get(rel, encoding) is not None:
+                        count += 1
+                        break
+        return count
+
+    def stats(self):
+        with self._lock:
+            return {
+                'files': len(self._files),
+                'bytes': sum(len(v) for entry in self._files.values() for v in entry[2].values()),
+            }
+
+
+def _is_anonymous(request, response, session_cookie):
+    """请求不带会话 cookie、响应也不设置 cookie 且不是 private 时，页面内容与用户无关，可以缓存压缩结果"""
+    return (session_cookie not in request.cookies and 'Set-Cookie' not in response.headers
+            and not response.cache_control.private)
+
+
+def init_compression(app, static_endpoint='static'):
+    """为 Flask 应用注册响应压缩（after_request）"""
+    from flask import request
+
+    session_cookie = app.config['SESSION_COOKIE_NAME']
+    page_cache = CompressedCache()
+    static_cache = StaticPrecompressor(app.static_folder)
+    app.extensions['compression'] = {'pages': page_cache, 'static': static_cache}
+
+    @app.after_request
+    def compress_response(response):
+        if response.status_code != 200 or 'Content-Encoding' in response.headers:
+            return response
+        if response.mimetype not in COMPRESSIBLE_TYPES:
+            return response
+        response.vary.add('Accept-Encoding')
+        encoding = negotiate_encoding(request.headers.get('Accept-Encoding'))
+        if encoding is None:
+            return response
+
+        if request.endpoint == static_endpoint:
+            filename = (request.view_args or {}).get('filename')
+            compressed = static_cache.get(filename, encoding) if filename else None
+            if compressed is None:
+                return response
+            etag, weak = response.get_etag()
+            close = getattr(response.response, 'close', None)
+            if close is not None:
+                close()
+            response.direct_passthrough = False
+            response.set_data(compressed)
+            if etag:
+                response.set_etag(f'{etag}-{encoding}', weak)
+                # 浏览器回传的是带编码后缀的 ETag，需按实际发送的值重新做条件判断
+                response.make_conditional(request)
+                if response.status_code == 304:
+                    return response
+        elif response.direct_passthrough:
+            return response
+        elif response.is_streamed:
+            response.response = stream_compress(response.response, encoding)
+            response.headers.pop('Content-Length', None)
+        else:
+            data = response.get_data()
+            if len(data) < MIN_COMPRESS_SIZE:
+                return response
+            if _is_anonymous(request, response, session_cookie):
+                response.set_data(page_cache.get_or_compress(data, encoding))
+            else:
+                # 登录用户的页面按用户 / 会话各不相同，缓存命中率低且会占满缓存，直接压缩
+                response.set_data(compress_bytes(data, encoding))
+
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+    return static_cache
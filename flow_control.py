@@ -0,0 +1,212 @@
+"""Socket.IO 流量控制：入站按连接和事件类型的令牌桶限流，出站按连接的发送队列长度丢弃或合并
+
+入站：每个连接的每种事件一个令牌桶（每秒补充 rate 个，最多积累 burst 个），令牌不足的事件直接丢弃。
+出站：engine.io 为每个连接维护发送队列，客户端读得慢时队列变长。队列超过 soft_limit 时，
+  drop 集合中的事件不再发给该连接（状态帧是相对已确认 tick 的增量，丢掉的帧会合并进下一帧）；
+  coalesce 集合中的事件只保留每个连接最新的一条，队列回落后由 sweep() 补发；
+  队列超过 hard_limit 时由 sweep() 断开该连接，客户端重连后按断线重连流程恢复。
+"""
+import threading
+import time
+
+from engineio import packet as eio_packet
+from socketio import Manager, packet
+
+# 默认预算：事件 -> (每秒补充的令牌数, 桶容量)
+DEFAULT_BUDGETS = {
+    'join_matching': (0.5, 3),
+    'leave_matching': (1, 3),
+    'join_room': (1, 3),
+    'leave_room': (1, 3),
+    'toggle_ready': (2, 4),
+    'start_game': (0.5, 2),
+    'lobby_subscribe': (0.5, 3),
+    'lobby_unsubscribe': (1, 3),
+    'player_input': (30, 30),
+    'snapshot_ack': (30, 30),
+    'rtt_pong': (1, 3),
+    'send_chat': (1, 5),
+    'spectate': (0.5, 3),
+    'stop_spectating': (1, 3),
+}
+
+
+def parse_budgets(spec, defaults=DEFAULT_BUDGETS):
+    """解析 "事件=每秒令牌数/桶容量,..."，覆盖默认预算；每秒令牌数为 0 表示不限制该事件"""
+    budgets = dict(defaults)
+    for item in filter(None, (part.strip() for part in (spec or '').split(','))):
+        try:
+            event, budget = item.split('=')
+            rate, _, burst = budget.partition('/')
+            rate = float(rate)
+            if rate <= 0:
+                budgets.pop(event.strip(), None)
+            else:
+                budgets[event.strip()] = (rate, float(burst) if burst else max(rate, 1))
+        except ValueError:
+            print(f"Invalid rate limit '{item}', expected event=rate/burst")
+    return budgets
+
+
+class TokenBucket:
+    __slots__ = ('rate', 'burst', 'tokens', 'updated', 'denied')
+
+    def __init__(self, rate, burst, now):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+        self.denied = 0  # 连续被拒的次数
+
+    def take(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            self.denied = 0
+            return True
+        self.denied += 1
+        return False
+
+    def retry_after(self):
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+
+class EventRateLimiter:
+    """sid -> {事件 -> TokenBucket}；没有预算的事件不限流"""
+
+    def __init__(self, budgets=None):
+        self.budgets = DEFAULT_BUDGETS if budgets is None else budgets
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self.allowed = {}
+        self.throttled = {}
+
+    def allow(self, sid, event, now=None):
+        """返回 None 表示放行；被限流时返回令牌桶（denied == 1 表示本轮限流的第一条）"""
+        budget = self.budgets.get(event)
+        if budget is None:
+            return None
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            buckets = self._buckets.setdefault(sid, {})
+            bucket = buckets.get(event)
+            if bucket is None:
+                bucket = buckets[event] = TokenBucket(budget[0], budget[1], now)
+            if bucket.take(now):
+                self.allowed[event] = self.allowed.get(event, 0) + 1
+                return None
+            self.throttled[event] = self.throttled.get(event, 0) + 1
+            return bucket
+
+    def forget(self, sid):
+        with self._lock:
+            self._buckets.pop(sid, None)
+
+    def stats(self):
+        return {
+            'connections': len(self._buckets),
+            'budgets': {event: {'rate': rate, 'burst': burst} for event, (rate, burst) in self.budgets.items()},
+            'allowed': dict(self.allowed),
+            'throttled': dict(self.throttled),
+        }
+
+
+class FlowControlManager(Manager):
+    """在 socketio.Manager 的本地投递前检查各连接的发送队列；多进程时放在 PubSubManager 之后，
+    其他进程转发来的 emit 同样经过这里"""
+
+    drop_events = frozenset()
+    coalesce_events = frozenset()
+    soft_limit = 64  # 队列中的 engine.io 包数
+    hard_limit = 1024  # 0 表示不断开
+
+    def configure(self, drop=(), coalesce=(), soft_limit=64, hard_limit=1024):
+        self.drop_events = frozenset(drop)
+        self.coalesce_events = frozenset(coalesce)
+        self.soft_limit = soft_limit
+        self.hard_limit = hard_limit
+        self._deferred = {}  # (eio_sid, 事件) -> 待发的 engine.io 包
+        self._flow_lock = threading.Lock()
+        self.dropped = {}
+        self.coalesced = {}
+        self.deferred_sent = 0
+        self.disconnected = 0
+
+    def backlog(self, eio_sid):
+        socket = self.server.eio.sockets.get(eio_sid)
+        return socket.queue.qsize() if socket is not None else 0
+
+    def emit(self, event, data, namespace, room=None, skip_sid=None, callback=None, to=None, **kwargs):
+        if callback or (event not in self.drop_events and event not in self.coalesce_events):
+            return super().emit(event, data, namespace, room=room, skip_sid=skip_sid, callback=callback,
+                                to=to, **kwargs)
+        room = to or room
+        if namespace not in self.rooms:
+            return
+        if isinstance(data, tuple):
+            data = list(data)
+        elif data is not None:
+            data = [data]
+        else:
+            data = []
+        if not isinstance(skip_sid, list):
+            skip_sid = [skip_sid]
+        encoded = self.server.packet_class(packet.EVENT, namespace=namespace, data=[event] + data).encode()
+        if not isinstance(encoded, list):
+            encoded = [encoded]
+        eio_pkts = [eio_packet.Packet(eio_packet.MESSAGE, p) for p in encoded]
+        for sid, eio_sid in self.get_participants(namespace, room):
+            if sid in skip_sid:
+                continue
+            if self.backlog(eio_sid) > self.soft_limit:
+                with self._flow_lock:
+                    if event in self.drop_events:
+                        self.dropped[event] = self.dropped.get(event, 0) + 1
+                    else:
+                        if (eio_sid, event) in self._deferred:
+                            self.coalesced[event] = self.coalesced.get(event, 0) + 1
+                        self._deferred[(eio_sid, event)] = eio_pkts
+                continue
+            with self._flow_lock:
+                self._deferred.pop((eio_sid, event), None)
+            for p in eio_pkts:
+                self.server._send_eio_packet(eio_sid, p)
+
+    def sweep(self):
+        """周期任务：队列回落的连接补发合并后的最新消息，队列超过 hard_limit 的连接断开"""
+        with self._flow_lock:
+            deferred, self._deferred = self._deferred, {}
+        for (eio_sid, event), eio_pkts in deferred.items():
+            if eio_sid not in self.server.eio.sockets:
+                continue
+            if self.backlog(eio_sid) > self.soft_limit:
+                with self._flow_lock:
+                    self._deferred.setdefault((eio_sid, event), eio_pkts)
+                continue
+            for p in eio_pkts:
+                self.server._send_eio_packet(eio_sid, p)
+            self.deferred_sent += 1
+        if not self.hard_limit:
+            return
+        for eio_sid, socket in list(self.server.eio.sockets.items()):
+            if socket.queue.qsize() > self.hard_limit:
+                print(f"Disconnecting slow consumer {eio_sid}: {socket.queue.qsize()} packets queued")
+                # 不等待队列排空（慢连接正是排不空），也不再追加 close 包
+                socket.close(wait=False, abort=True)
+                self.server.eio.sockets.pop(eio_sid, None)
+                self.disconnected += 1
+
+    def flow_stats(self):
+        backlogs = sorted(socket.queue.qsize() for socket in list(self.server.eio.sockets.values()))
+        return {
+            'soft_limit': self.soft_limit,
+            'hard_limit': self.hard_limit,
+            'max_backlog': backlogs[-1] if backlogs else 0,
+            'congested': sum(1 for n in backlogs if n > self.soft_limit),
+            'dropped': dict(self.dropped),
+            'coalesced': dict(self.coalesced),
+            'deferred': len(self._deferred),
+            'deferred_sent': self.deferred_sent,
+            'disconnected': self.disconnected,
+        }
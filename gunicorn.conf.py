@@ -0,0 +1,9 @@
+"""gunicorn 配置文件（Procfile 使用），配置项与 serve.py 共用"""
+import os
+
+from serve import detect_async_mode, gunicorn_settings, install_graceful_shutdown
+
+_async_mode = detect_async_mode(os.environ.get('SOCKETIO_ASYNC_MODE'))
+os.environ['SOCKETIO_ASYNC_MODE'] = _async_mode
+globals().update(gunicorn_settings(_async_mode))
+post_worker_init = install_graceful_shutdown
@@ -0,0 +1,82 @@
+"""多语言文案目录：每种语言一个文件，首次使用时加载并缓存"""
+import json
+import marshal
+import os
+import threading
+from collections.abc import Mapping
+
+DEFAULT_LANG = 'zh'
+COMPILED_SUBDIR = '__compiled__'
+
+
+def _compiled_path(directory, lang):
+    return os.path.join(directory, COMPILED_SUBDIR, f'{lang}.marshal')
+
+
+def compile_catalogs(directory, languages):
+    """把 <lang>.json 编译成 marshal 格式，加载时省去 JSON 解析"""
+    os.makedirs(os.path.join(directory, COMPILED_SUBDIR), exist_ok=True)
+    compiled = []
+    for lang in languages:
+        with open(os.path.join(directory, f'{lang}.json'), 'r', encoding='utf-8') as f:
+            table = json.load(f)
+        with open(_compiled_path(directory, lang), 'wb') as f:
+            marshal.dump(table, f)
+        compiled.append(lang)
+    return compiled
+
+
+def load_catalog(directory, lang):
+    """读取单个语言目录；有最新的编译文件时优先使用"""
+    source = os.path.join(directory, f'{lang}.json')
+    compiled = _compiled_path(directory, lang)
+    try:
+        if os.path.getmtime(compiled) >= os.path.getmtime(source):
+            with open(compiled, 'rb') as f:
+                return marshal.load(f)
+    except (OSError, EOFError, ValueError, TypeError):
+        pass
+    with open(source, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+class LazyCatalogs(Mapping):
+    """语言 -> 文案字典 的只读映射，每种语言只在第一次访问时加载"""
+
+    def __init__(self, directory, languages):
+        self.directory = directory
+        self.languages = tuple(languages)
+        self._catalogs = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, lang):
+        catalog = self._catalogs.get(lang)
+        if catalog is not None:
+            return catalog
+        if lang not in self.languages:
+            raise KeyError(lang)
+        with self._lock:
+            catalog = self._catalogs.get(lang)
+            if catalog is None:
+                catalog = load_catalog(self.directory, lang)
+                self._catalogs[lang] = catalog
+        return catalog
+
+    def __iter__(self):
+        return iter(self.languages)
+
+    def __len__(self):
+        return len(self.languages)
+
+    def __contains__(self, lang):
+        return lang in self.languages
+
+    def loaded(self):
+        """已加载的语言列表"""
+        return list(self._catalogs)
+
+    def preload(self):
+        """预热：加载全部语言"""
+        for lang in self.languages:
+            self[lang]
+        return self.loaded()
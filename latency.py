@@ -0,0 +1,65 @@
+"""连接往返时延（RTT）：服务器定时发送 rtt_ping，客户端回 rtt_pong，
+平滑值按 TCP 的做法（RFC 6298）用 EWMA 更新并存在会话里，同时按游戏类型统计分布"""
+import time
+
+from tick_engine import TickHistogram
+
+RTT_BUCKETS_MS = (10, 25, 50, 75, 100, 150, 200, 300, 500, 1000)
+RTT_ALPHA = 1 / 8  # 平滑 RTT 的权重
+RTT_BETA = 1 / 4  # RTT 波动的权重
+MAX_RTT_MS = 30000  # 超过此值的样本视为过期的回包，丢弃
+
+
+def _percentile(histogram, q):
+    """按桶估计分位数（返回所在桶的上界）"""
+    if not histogram.total:
+        return 0.0
+    target = q * histogram.total
+    seen = 0
+    for bound, count in zip(histogram.buckets, histogram.counts):
+        seen += count
+        if seen >= target:
+            return bound
+    return histogram.max_ms
+
+
+class RttTracker:
+    def __init__(self, buckets=RTT_BUCKETS_MS):
+        self.buckets = buckets
+        self.histograms = {}  # game_type -> TickHistogram
+        self._seq = 0
+
+    def ping(self, user_session, now=None):
+        """生成一次 ping 的负载，并在会话里记下发送时间（客户端只回序号，无法伪造时延）"""
+        self._seq += 1
+        user_session['rtt_ping'] = (self._seq, time.monotonic() if now is None else now)
+        return {'seq': self._seq}
+
+    def observe(self, user_session, seq, now=None):
+        """处理 pong，返回新的平滑 RTT（毫秒）；序号不匹配时返回 None"""
+        pending = user_session.get('rtt_ping')
+        if pending is None or pending[0] != seq:
+            return None
+        del user_session['rtt_ping']
+        sample = ((time.monotonic() if now is None else now) - pending[1]) * 1000
+        if not 0 <= sample <= MAX_RTT_MS:
+            return None
+        srtt = user_session.get('rtt')
+        if srtt is None:
+            user_session['rtt'] = sample
+            user_session['rtt_var'] = sample / 2
+        else:
+            user_session['rtt_var'] = (1 - RTT_BETA) * user_session['rtt_var'] + RTT_BETA * abs(srtt - sample)
+            user_session['rtt'] = (1 - RTT_ALPHA) * srtt + RTT_ALPHA * sample
+        game_type = user_session.get('game_type') or 'lobby'
+        histogram = self.histograms.get(game_type)
+        if histogram is None:
+            histogram = self.histograms[game_type] = TickHistogram(self.buckets)
+        histogram.observe(sample)
+        return user_session['rtt']
+
+    def stats(self):
+        return {game_type: dict(histogram.to_dict(),
+                                p50_ms=_percentile(histogram, 0.5),
+                                p95_ms=_percentile(histogram, 0.95))
+                for game_type, histogram in self.histograms.items()}
@@ -0,0 +1,327 @@
+"""单人游戏排行榜：每个游戏按日 / 周 / 总榜各一个榜单，常驻内存，定期写回 leaderboards/<game_type>.json
+
+榜单用可索引跳表（每层链接记录跨过的节点数）按成绩排序：提交、删除、按玩家查名次都是 O(log n)，
+前 N 名从表头顺序读取为 O(N)。每个玩家在每个榜单只保留最好成绩，成绩相同时先达到的排前面。
+写回与 RatingStore 相同：提交只修改内存并标记为脏，由定时任务 flush() 批量写文件（write-behind）。
+日榜 / 周榜按 UTC 日期和 ISO 周划分，周期切换后旧榜单不再加载。
+"""
+import json
+import math
+import os
+import random
+import threading
+import time
+
+PERIODS = ('daily', 'weekly', 'all')
+MAX_SCORE = 10 ** 9
+
+
+class _Largest:
+    """跳表尾哨兵的键，比任何键都大"""
+
+    def __lt__(self, other):
+        return False
+
+    def __le__(self, other):
+        return False
+
+    def __gt__(self, other):
+        return True
+
+    def __ge__(self, other):
+        return True
+
+
+class _Node:
+    __slots__ = ('key', 'next', 'width')
+
+    def __init__(self, key, next, width):
+        self.key = key
+        self.next = next  # 各层的后继
+        self.width = width  # 各层链接跨过的底层节点数
+
+
+class IndexableSkipList:
+    """有序键集合：insert / remove / rank 为 O(log n)，按下标访问为 O(log n)"""
+
+    def __init__(self, expected_size=1 << 20, seed=None):
+        self.levels = max(1, int(math.log2(expected_size)) + 1)
+        self._tail = _Node(_Largest(), [], [])
+        self._head = _Node(None, [self._tail] * self.levels, [1] * self.levels)
+        self._size = 0
+        self._random = random.Random(seed)
+
+    def __len__(self):
+        return self._size
+
+    def __iter__(self):
+        node = self._head.next[0]
+        while node is not self._tail:
+            yield node.key
+            node = node.next[0]
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError(index)
+        node = self._head
+        remaining = index + 1
+        for level in reversed(range(self.levels)):
+            while node.width[level] <= remaining:
+                remaining -= node.width[level]
+                node = node.next[level]
+        return node.key
+
+    def _random_level(self):
+        # 每个节点以 1/2 的概率再高一层
+        level = 1
+        while level < self.levels and self._random.random() < 0.5:
+            level += 1
+        return level
+
+    def insert(self, key):
+        chain = [None] * self.levels
+        steps_at_level = [0] * self.levels
+        node = self._head
+        for level in reversed(range(self.levels)):
+            while node.next[level].key <= key:
+                steps_at_level[level] += node.width[level]
+                node = node.next[level]
+            chain[level] = node
+        height = self._random_level()
+        new_node = _Node(key, [None] * height, [None] * height)
+        steps = 0
+        for level in range(height):
+            prev = chain[level]
+            new_node.next[level] = prev.next[level]
+            prev.next[level] = new_node
+            new_node.width[level] = prev.width[level] - steps
+            prev.width[level] = steps + 1
+            steps += steps_at_level[level]
+        for level in range(height, self.levels):
+            chain[level].width[level] += 1
+        self._size += 1
+
+    def build(self, keys):
+        """用已排序的键一次性建表（从文件加载时），O(n)；只能在空表上调用"""
+        if self._size:
+            raise ValueError('build() requires an empty skip list')
+        last = [self._head] * self.levels
+        last_pos = [0] * self.levels
+        pos = 0
+        for pos, key in enumerate(keys, 1):
+            height = self._random_level()
+            node = _Node(key, [None] * height, [None] * height)
+            for level in range(height):
+                last[level].next[level] = node
+                last[level].width[level] = pos - last_pos[level]
+                last[level], last_pos[level] = node, pos
+        for level in range(self.levels):
+            last[level].next[level] = self._tail
+            last[level].width[level] = pos + 1 - last_pos[level]
+        self._size = pos
+
+    def remove(self, key):
+        chain = [None] * self.levels
+        node = self._head
+        for level in reversed(range(self.levels)):
+            while node.next[level].key < key:
+                node = node.next[level]
+            chain[level] = node
+        target = chain[0].next[0]
+        if target is self._tail or target.key != key:
+            raise KeyError(key)
+        for level in range(len(target.next)):
+            prev = chain[level]
+            prev.width[level] += target.width[level] - 1
+            prev.next[level] = target.next[level]
+        for level in range(len(target.next), self.levels):
+            chain[level].width[level] -= 1
+        self._size -= 1
+
+    def rank(self, key):
+        """键的下标（从 0 开始）；不存在时返回 None"""
+        node = self._head
+        index = 0
+        for level in reversed(range(self.levels)):
+            while node.next[level].key < key:
+                index += node.width[level]
+                node = node.next[level]
+        target = node.next[0]
+        if target is self._tail or target.key != key:
+            return None
+        return index
+
+    def first(self, n):
+        """前 n 个键"""
+        keys = []
+        node = self._head.next[0]
+        while node is not self._tail and len(keys) < n:
+            keys.append(node.key)
+            node = node.next[0]
+        return keys
+
+
+class Leaderboard:
+    """一个榜单：玩家 -> 最好成绩。ascending=True 表示成绩越小越好（用时、步数）"""
+
+    def __init__(self, ascending=False):
+        self.ascending = ascending
+        self._list = IndexableSkipList()
+        self._keys = {}  # 玩家 -> 跳表中的键 (排序值, 提交时间, 玩家)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def _score(self, key):
+        return key[0] if self.ascending else -key[0]
+
+    def submit(self, player, score, at):
+        """记录一次成绩，刷新最好成绩时返回 True"""
+        key = (score if self.ascending else -score, at, player)
+        old = self._keys.get(player)
+        if old is not None:
+            if key[0] >= old[0]:
+                return False
+            self._list.remove(old)
+        self._list.insert(key)
+        self._keys[player] = key
+        return True
+
+    def load(self, entries):
+        """从 entries() 的结果恢复（空榜单上调用）"""
+        keys = {}
+        for player, score, at in entries:
+            key = (score if self.ascending else -score, at, player)
+            if player not in keys or key < keys[player]:
+                keys[player] = key
+        self._list.build(sorted(keys.values()))
+        self._keys = keys
+
+    def rank(self, player):
+        """玩家的名次（从 1 开始）和最好成绩；未上榜时返回 (None, None)"""
+        key = self._keys.get(player)
+        if key is None:
+            return None, None
+        return self._list.rank(key) + 1, self._score(key)
+
+    def top(self, n):
+        return [{'rank': i + 1, 'player': key[2], 'score': self._score(key), 'at': key[1]}
+                for i, key in enumerate(self._list.first(n))]
+
+    def entries(self):
+        return [[key[2], self._score(key), key[1]] for key in self._list]
+
+
+def period_key(period, now):
+    """周期标识：日榜为 UTC 日期，周榜为 ISO 周，总榜固定为 all"""
+    if period == 'daily':
+        return time.strftime('%Y-%m-%d', time.gmtime(now))
+    if period == 'weekly':
+        return time.strftime('%G-W%V', time.gmtime(now))
+    return 'all'
+
+
+class LeaderboardStore:
+    """game_type -> {周期 -> (周期标识, Leaderboard)}；首次访问某游戏时加载文件，修改后标记为脏，由 flush() 写回"""
+
+    def __init__(self, directory, games):
+        self.directory = directory
+        self.games = games  # game_type -> ascending
+        self._boards = {}
+        self._dirty = set()
+        self._lock = threading.Lock()
+        self.submissions = 0
+        self.improved = 0
+
+    def _path(self, game_type):
+        return os.path.join(self.directory, f'{game_type}.json')
+
+    def _load(self, game_type):
+        boards = self._boards.get(game_type)
+        if boards is None:
+            boards = self._boards[game_type] = {}
+            try:
+                with open(self._path(game_type), 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                for period, saved in data.items():
+                    board = Leaderboard(self.games[game_type])
+                    board.load(saved['entries'])
+                    boards[period] = (saved['key'], board)
+            except FileNotFoundError:
+                pass
+            except (json.JSONDecodeError, KeyError, TypeError, ValueError) as e:
+                print(f"Error loading leaderboards for {game_type}: {e}")
+        return boards
+
+    def _board(self, game_type, period, now):
+        """当前周期的榜单；周期已切换时换成空榜单"""
+        boards = self._load(game_type)
+        key = period_key(period, now)
+        current = boards.get(period)
+        if current is None or current[0] != key:
+            current = boards[period] = (key, Leaderboard(self.games[game_type]))
+        return current[1]
+
+    def submit(self, game_type, player, score, now=None):
+        """提交成绩，返回 {周期: {'rank', 'best', 'improved'}}"""
+        now = time.time() if now is None else now
+        at = int(now * 1000)
+        result = {}
+        with self._lock:
+            self.submissions += 1
+            for period in PERIODS:
+                board = self._board(game_type, period, now)
+                improved = board.submit(player, score, at)
+                rank, best = board.rank(player)
+                result[period] = {'rank': rank, 'best': best, 'improved': improved}
+                if improved:
+                    self._dirty.add(game_type)
+                    self.improved += 1
+        return result
+
+    def top(self, game_type, period, n=10, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            board = self._board(game_type, period, now)
+            return {'period': period, 'key': period_key(period, now), 'total': len(board), 'entries': board.top(n)}
+
+    def rank(self, game_type, period, player, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            board = self._board(game_type, period, now)
+            rank, best = board.rank(player)
+            return {'rank': rank, 'best': best, 'total': len(board)}
+
+    def flush(self):
+        """把有变化的游戏写回文件（先写临时文件再替换，写到一半崩溃不会损坏原文件）"""
+        with self._lock:
+            pending = {g: {period: {'key': key, 'entries': board.entries()}
+                           for period, (key, board) in self._boards[g].items()}
+                       for g in self._dirty}
+            self._dirty.clear()
+        if not pending:
+            return 0
+        os.makedirs(self.directory, exist_ok=True)
+        for game_type, data in pending.items():
+            path = self._path(game_type)
+            try:
+                with open(path + '.tmp', 'w', encoding='utf-8') as f:
+                    json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+                os.replace(path + '.tmp', path)
+            except IOError as e:
+                print(f"Error saving leaderboards for {game_type}: {e}")
+                with self._lock:
+                    self._dirty.add(game_type)
+        return len(pending)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'submissions': self.submissions,
+                'improved': self.improved,
+                'players': {g: {period: len(board) for period, (_, board) in boards.items()}
+                            for g, boards in self._boards.items()},
+                'dirty': sorted(self._dirty),
+            }
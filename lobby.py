@@ -0,0 +1,77 @@
+"""大厅订阅：按游戏类型推送可加入房间的变化
+
+订阅时先发完整列表（lobby_rooms），之后房间的新建 / 变化 / 关闭先合并到待发集合，
+由定时任务每 interval 秒向该游戏类型的 Socket.IO 房间 lobby:<game_type> 广播一次 lobby_update。
+同一房间在一个周期内的多次变化只发最终状态，周期内新建又关闭的房间不发；
+房间变动再频繁，每个订阅者每个周期也最多收到一条消息，且消息只序列化一次。
+"""
+import threading
+
+LOBBY_ROOM_PREFIX = 'lobby:'
+
+
+def lobby_room(game_type):
+    return LOBBY_ROOM_PREFIX + game_type
+
+
+class LobbyFeed:
+    def __init__(self, registry, emit, max_rooms=100):
+        self.registry = registry
+        self.emit = emit  # emit(event, payload, to)
+        self.max_rooms = max_rooms  # 完整列表最多包含的房间数；一个周期的变化超过此数时改发完整列表
+        self._pending = {}  # game_type -> {room_id: GameRoom 或 None（已关闭）}
+        self._listed = {}  # game_type -> 订阅者已知的 room_id 集合（截至上次广播）
+        self._lock = threading.Lock()
+        self.changes = 0
+        self.updates = 0
+        self.resets = 0
+
+    def room_changed(self, game_type, room_id, room):
+        """RoomRegistry.on_open_change 回调"""
+        with self._lock:
+            self._pending.setdefault(game_type, {})[room_id] = room
+            self.changes += 1
+
+    def snapshot(self, game_type):
+        rooms = self.registry.open_rooms(game_type)
+        return {
+            'game_type': game_type,
+            'rooms': [room.summary() for room in rooms[:self.max_rooms]],
+            'total': len(rooms)
+        }
+
+    def flush(self):
+        """周期任务：把各游戏类型合并后的变化广播给订阅者"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for game_type, changes in pending.items():
+            listed = self._listed.setdefault(game_type, set())
+            if len(changes) > self.max_rooms:
+                self._listed[game_type] = {room.room_id for room in self.registry.open_rooms(game_type)}
+                self.emit('lobby_rooms', dict(self.snapshot(game_type), reset=True), lobby_room(game_type))
+                self.resets += 1
+                continue
+            created, changed, closed = [], [], []
+            for room_id, room in changes.items():
+                if room is not None and room.is_joinable() and room.registry is self.registry:
+                    (changed if room_id in listed else created).append(room.summary())
+                    listed.add(room_id)
+                elif room_id in listed:
+                    listed.discard(room_id)
+                    closed.append(room_id)
+            if created or changed or closed:
+                self.emit('lobby_update', {
+                    'game_type': game_type,
+                    'created': created,
+                    'changed': changed,
+                    'closed': closed
+                }, lobby_room(game_type))
+                self.updates += 1
+
+    def stats(self):
+        return {
+            'changes': self.changes,
+            'updates': self.updates,
+            'resets': self.resets,
+            'listed': {game_type: len(listed) for game_type, listed in self._listed.items()},
+        }
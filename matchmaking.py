@@ -0,0 +1,307 @@
+"""匹配引擎：按游戏类型分开的 FIFO 队列，入队/出队/取消均为 O(1)；
+RatedMatchmakingEngine 在此基础上按评分分桶，只与评分相近的玩家成组"""
+import time
+from collections import OrderedDict, deque
+
+
+class QueueEntry:
+    __slots__ = ('user_id', 'username', 'game_type', 'joined_at', 'timer', 'sid', 'rating', 'rtt', 'bucket',
+                 'searched')
+
+    def __init__(self, user_id, username, game_type, joined_at, sid=None, rating=None, rtt=None):
+        self.user_id = user_id
+        self.username = username
+        self.game_type = game_type
+        self.joined_at = joined_at
+        self.timer = None  # 匹配超时定时器句柄，出队时由调用方取消
+        self.sid = sid  # 玩家的 Socket.IO 连接（可能在其他 worker 上），匹配成功后据此加入房间
+        self.rating = rating
+        self.rtt = rtt  # 平滑 RTT（毫秒），未知时为 None
+        self.bucket = None  # 评分桶编号（RatedMatchmakingEngine 使用）
+        self.searched = -1  # 上次搜索时的放宽级别，级别不变时不必重复搜索
+
+    def to_dict(self):
+        return {'username': self.username, 'game_type': self.game_type, 'joined_at': self.joined_at,
+                'rating': self.rating, 'rtt': self.rtt}
+
+
+class WaitStats:
+    """单个游戏类型的排队等待时间统计（保留最近 window 个样本计算分位数）"""
+
+    def __init__(self, window=1000):
+        self.samples = deque(maxlen=window)
+        self.matched = 0
+        self.cancelled = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record(self, wait):
+        self.samples.append(wait)
+        self.matched += 1
+        self.total_wait += wait
+        if wait > self.max_wait:
+            self.max_wait = wait
+
+    def summary(self):
+        ordered = sorted(self.samples)
+
+        def percentile(p):
+            if not ordered:
+                return 0.0
+            return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+        return {
+            'matched': self.matched,
+            'cancelled': self.cancelled,
+            'avg_wait': self.total_wait / self.matched if self.matched else 0.0,
+            'p50_wait': percentile(0.50),
+            'p95_wait': percentile(0.95),
+            'max_wait': self.max_wait,
+        }
+
+
+class MatchmakingEngine:
+    """每个 game_type 一个有序队列；user_id -> game_type 索引使取消为 O(1)"""
+
+    def __init__(self, room_size=4, min_players=2):
+        self.room_size = room_size
+        self.min_players = min_players
+        self._queues = {}  # game_type -> OrderedDict(user_id -> QueueEntry)
+        self._index = {}  # user_id -> game_type
+        self._stats = {}  # game_type -> WaitStats
+
+    def __contains__(self, user_id):
+        return user_id in self._index
+
+    def __len__(self):
+        return len(self._index)
+
+    def get(self, user_id):
+        game_type = self._index.get(user_id)
+        if game_type is None:
+            return None
+        return self._queues[game_type].get(user_id)
+
+    def _stats_for(self, game_type):
+        stats = self._stats.get(game_type)
+        if stats is None:
+            stats = self._stats[game_type] = WaitStats()
+        return stats
+
+    def enqueue(self, user_id, username, game_type, now=None, sid=None, rating=None, rtt=None):
+        """加入队尾；已在队列中返回 None"""
+        if user_id in self._index:
+            return None
+        entry = QueueEntry(user_id, username, game_type, time.time() if now is None else now, sid, rating, rtt)
+        queue = self._queues.get(game_type)
+        if queue is None:
+            queue = self._queues[game_type] = OrderedDict()
+        queue[user_id] = entry
+        self._index[user_id] = game_type
+        return entry
+
+    def _take(self, user_id):
+        game_type = self._index.pop(user_id, None)
+        if game_type is None:
+            return None
+        return self._queues[game_type].pop(user_id)
+
+    def cancel(self, user_id):
+        """离开队列，返回被移除的条目（不在队列中返回 None）"""
+        entry = self._take(user_id)
+        if entry is not None:
+            self._stats_for(entry.game_type).cancelled += 1
+        return entry
+
+    def dequeue(self, game_type):
+        """取出队首条目"""
+        queue = self._queues.get(game_type)
+        if not queue:
+            return None
+        _, entry = queue.popitem(last=False)
+        del self._index[entry.user_id]
+        return entry
+
+    def game_types(self):
+        return list(self._queues)
+
+    def queue_length(self, game_type):
+        return len(self._queues.get(game_type, ()))
+
+    def entries(self, game_type):
+        """按入队顺序遍历某游戏类型的队列（只读）"""
+        return list(self._queues.get(game_type, {}).values())
+
+    def match(self, game_type, room_size=None, now=None, user_id=None):
+        """把队首玩家按 room_size 一组批量取出，凑不够 min_players 的留在队列里（FIFO 不区分 user_id）"""
+        room_size = room_size or self.room_size
+        now = time.time() if now is None else now
+        stats = self._stats_for(game_type)
+        groups = []
+        while self.queue_length(game_type) >= self.min_players:
+            count = min(room_size, self.queue_length(game_type))
+            group = [self.dequeue(game_type) for _ in range(count)]
+            for entry in group:
+                stats.record(now - entry.joined_at)
+            groups.append(group)
+        return groups
+
+    def stats(self, now=None):
+        """各游戏类型的排队人数、最早入队者的等待时间与等待时间统计"""
+        now = time.time() if now is None else now
+        result = {}
+        for game_type in set(self._queues) | set(self._stats):
+            queue = self._queues.get(game_type) or {}
+            oldest = next(iter(queue.values()), None)
+            result[game_type] = {
+                'queued': len(queue),
+                'oldest_wait': now - oldest.joined_at if oldest else 0.0,
+                **self._stats_for(game_type).summary(),
+            }
+        return result
+
+
+class RatedMatchmakingEngine(MatchmakingEngine):
+    """按评分分桶的匹配：桶编号为 rating // bucket_width。
+
+    玩家可接受的范围随等待时间放宽：每等待 widen_after 秒多接受两侧各一个桶，最多 max_spread 个。
+    搜索由近到远只看可接受范围内的桶，桶内按入队先后取人；对方也要接受自己的桶才会成组。
+    RTT 也按同样方式放宽：双方都已测得 RTT 时，RTT 差不超过 rtt_scale ×（较小的放宽档数 + 1）才可同组。
+    最多收集 candidate_limit 个候选，按评分差（以桶宽为单位）加 RTT 差（以 rtt_scale 毫秒为单位）
+    从小到大选人，评分相近时优先和延迟相近的玩家同组；每个入选的人都要与组内所有人两两满足上述条件。
+    新入队的玩家在 match(user_id=...) 时搜索一次，之后由周期性的 match() 在放宽级别变化时重新搜索。
+    """
+
+    def __init__(self, room_size=4, min_players=2, bucket_width=100, widen_after=5.0, max_spread=10,
+                 default_rating=1500.0, rtt_scale=50.0, candidate_limit=8):
+        super().__init__(room_size, min_players)
+        self.bucket_width = bucket_width
+        self.widen_after = widen_after
+        self.max_spread = max_spread
+        self.default_rating = default_rating
+        self.rtt_scale = rtt_scale
+        self.candidate_limit = candidate_limit
+        self._buckets = {}  # game_type -> {桶编号: OrderedDict(user_id -> QueueEntry)}
+        self._gaps = {}  # game_type -> 最近成组的评分差（最高 - 最低）
+        self._rtt_gaps = {}  # game_type -> 最近成组的 RTT 差（双方 RTT 已知时）
+
+    def enqueue(self, user_id, username, game_type, now=None, sid=None, rating=None, rtt=None):
+        entry = super().enqueue(user_id, username, game_type, now, sid,
+                                self.default_rating if rating is None else rating, rtt)
+        if entry is not None:
+            entry.bucket = int(entry.rating // self.bucket_width)
+            buckets = self._buckets.setdefault(game_type, {})
+            bucket = buckets.get(entry.bucket)
+            if bucket is None:
+                bucket = buckets[entry.bucket] = OrderedDict()
+            bucket[user_id] = entry
+        return entry
+
+    def _take(self, user_id):
+        entry = super()._take(user_id)
+        if entry is not None:
+            buckets = self._buckets[entry.game_type]
+            bucket = buckets[entry.bucket]
+            del bucket[user_id]
+            if not bucket:
+                del buckets[entry.bucket]
+        return entry
+
+    def dequeue(self, game_type):
+        queue = self._queues.get(game_type)
+        if not queue:
+            return None
+        return self._take(next(iter(queue)))
+
+    def spread(self, entry, now):
+        """当前可接受的桶距离"""
+        return min(self.max_spread, int((now - entry.joined_at) / self.widen_after))
+
+    def _cost(self, entry, other):
+        cost = abs(other.rating - entry.rating) / self.bucket_width
+        if self.rtt_scale and entry.rtt is not None and other.rtt is not None:
+            cost += abs(other.rtt - entry.rtt) / self.rtt_scale
+        return cost
+
+    def _rtt_acceptable(self, entry, other, spread):
+        if not self.rtt_scale or entry.rtt is None or other.rtt is None:
+            return True
+        return abs(other.rtt - entry.rtt) <= self.rtt_scale * (spread + 1)
+
+    def _compatible(self, entry, other, now):
+        """双方都接受对方的桶，且 RTT 差在两人较小的放宽档数允许的范围内"""
+        spread = min(self.spread(entry, now), self.spread(other, now))
+        return abs(other.bucket - entry.bucket) <= spread and self._rtt_acceptable(entry, other, spread)
+
+    def _candidates(self, entry, limit, now):
+        buckets = self._buckets.get(entry.game_type, {})
+        spread = self.spread(entry, now)
+        others = []
+        for distance in range(spread + 1):
+            for bucket_id in ((entry.bucket,) if distance == 0 else (entry.bucket - distance, entry.bucket + distance)):
+                for other in buckets.get(bucket_id, {}).values():
+                    if other is not entry and self._compatible(entry, other, now):
+                        others.append(other)
+                        if len(others) >= limit:
+                            return others
+        return others
+
+    def _find_group(self, entry, room_size, now):
+        others = self._candidates(entry, max(room_size - 1, self.candidate_limit), now)
+        if len(others) + 1 < self.min_players:
+            return None
+        others.sort(key=lambda other: self._cost(entry, other))
+        group = [entry]
+        for other in others:
+            # 候选只与搜索者比较过，还要与已入选的其他人两两兼容
+            if all(self._compatible(member, other, now) for member in group[1:]):
+                group.append(other)
+                if len(group) >= room_size:
+                    break
+        if len(group) < self.min_players:
+            return None
+        return group
+
+    def match(self, game_type, room_size=None, now=None, user_id=None):
+        """user_id 指定时只为该玩家搜索；否则按入队先后，为放宽级别变化了的玩家重新搜索"""
+        room_size = room_size or self.room_size
+        now = time.time() if now is None else now
+        if user_id is not None:
+            entry = self.get(user_id)
+            candidates = [entry] if entry is not None and entry.game_type == game_type else []
+        else:
+            candidates = self.entries(game_type)
+        stats = self._stats_for(game_type)
+        gaps = self._gaps.setdefault(game_type, deque(maxlen=1000))
+        rtt_gaps = self._rtt_gaps.setdefault(game_type, deque(maxlen=1000))
+        groups = []
+        for entry in candidates:
+            if entry.user_id not in self._index:
+                continue  # 本轮已被分进其他组
+            spread = self.spread(entry, now)
+            if spread == entry.searched:
+                continue
+            entry.searched = spread
+            group = self._find_group(entry, room_size, now)
+            if group is None:
+                continue
+            for member in group:
+                self._take(member.user_id)
+                stats.record(now - member.joined_at)
+            ratings = [member.rating for member in group]
+            gaps.append(max(ratings) - min(ratings))
+            rtts = [member.rtt for member in group if member.rtt is not None]
+            if len(rtts) > 1:
+                rtt_gaps.append(max(rtts) - min(rtts))
+            groups.append(group)
+        return groups
+
+    def stats(self, now=None):
+        result = super().stats(now)
+        for game_type, summary in result.items():
+            summary['buckets'] = len(self._buckets.get(game_type, ()))
+            for name, samples in (('rating_gap', self._gaps), ('rtt_gap', self._rtt_gaps)):
+                gaps = sorted(samples.get(game_type, ()))
+                summary[f'p50_{name}'] = gaps[len(gaps) // 2] if gaps else 0.0
+                summary[f'p95_{name}'] = gaps[min(len(gaps) - 1, int(0.95 * len(gaps)))] if gaps else 0.0
+        return result
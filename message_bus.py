@@ -0,0 +1,394 @@
+"""进程间消息总线：发布/订阅接口和可插拔的后端
+
+  local://                 进程内总线（单 worker、测试）
+  unix:///tmp/bus.sock     仓库内置的 Unix socket 代理（python message_bus.py --path /tmp/bus.sock）
+  redis://host:6379/0      Redis pub/sub（需要 redis 包）
+
+BusClientManager 把 python-socketio 的跨进程 emit / enter_room 接到任意后端上，
+worker 之间的分片请求也走同一条总线。消息体为 JSON 可序列化对象。
+"""
+import argparse
+import itertools
+import json
+import os
+import queue
+import selectors
+import signal
+import socket
+import struct
+import subprocess
+import sys
+import threading
+import time
+import urllib.parse
+
+from socketio import PubSubManager
+
+from flow_control import FlowControlManager
+
+# 帧格式：操作(1 字节) + 频道长度(2 字节) + 负载长度(4 字节) + 频道 + 负载
+HEADER = struct.Struct('>BHI')
+OP_SUBSCRIBE = 1
+OP_PUBLISH = 2
+
+
+def encode_frame(op, channel, payload=b''):
+    channel = channel.encode('utf-8')
+    return HEADER.pack(op, len(channel), len(payload)) + channel + payload
+
+
+def decode_frames(buffer):
+    """从缓冲区解析完整的帧，返回 ([(op, channel, payload, 原始帧)], 剩余字节)"""
+    frames = []
+    offset = 0
+    while len(buffer) - offset >= HEADER.size:
+        op, channel_size, payload_size = HEADER.unpack_from(buffer, offset)
+        end = offset + HEADER.size + channel_size + payload_size
+        if len(buffer) < end:
+            break
+        start = offset + HEADER.size
+        channel = bytes(buffer[start:start + channel_size]).decode('utf-8')
+        frames.append((op, channel, bytes(buffer[start + channel_size:end]), bytes(buffer[offset:end])))
+        offset = end
+    return frames, buffer[offset:]
+
+
+def _dumps(message):
+    return json.dumps(message, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+class MessageBus:
+    """后端基类：subscribe 注册回调，publish 发给所有订阅该频道的进程（包括自己）"""
+
+    def __init__(self):
+        self._handlers = {}  # channel -> [handler]
+
+    def subscribe(self, channel, handler):
+        first = channel not in self._handlers
+        self._handlers.setdefault(channel, []).append(handler)
+        if first:
+            self._subscribe(channel)
+
+    def _subscribe(self, channel):
+        pass
+
+    def _dispatch(self, channel, message):
+        for handler in self._handlers.get(channel, ()):
+            try:
+                handler(message)
+            except Exception as e:
+                print(f"Error handling bus message on {channel}: {e}")
+
+    def publish(self, channel, message):
+        raise NotImplementedError
+
+    def start(self, start_background_task=None):
+        """启动接收循环（每个进程一次）"""
+
+    def close(self):
+        pass
+
+
+class LocalBus(MessageBus):
+    """进程内总线：publish 直接调用本进程的订阅者"""
+
+    def publish(self, channel, message):
+        self._dispatch(channel, message)
+
+
+class UnixSocketBus(MessageBus):
+    """连接 Broker 的客户端；收到的消息在后台任务里按顺序分发"""
+
+    def __init__(self, path, connect_timeout=10.0):
+        super().__init__()
+        self.path = path
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        deadline = time.time() + connect_timeout
+        while True:
+            try:
+                self._sock.connect(path)
+                break
+            except (FileNotFoundError, ConnectionRefusedError):
+                # 代理可能和 worker 同时启动，稍等重试
+                if time.time() > deadline:
+                    raise
+                time.sleep(0.05)
+        self._send_lock = threading.Lock()
+        self._started = False
+        self._closed = False
+
+    def _send(self, frame):
+        with self._send_lock:
+            self._sock.sendall(frame)
+
+    def _subscribe(self, channel):
+        self._send(encode_frame(OP_SUBSCRIBE, channel))
+
+    def publish(self, channel, message):
+        self._send(encode_frame(OP_PUBLISH, channel, _dumps(message)))
+
+    def start(self, start_background_task=None):
+        if self._started:
+            return
+        self._started = True
+        if start_background_task is not None:
+            start_background_task(self._reader)
+        else:
+            threading.Thread(target=self._reader, daemon=True).start()
+
+    def _reader(self):
+        buffer = b''
+        while True:
+            try:
+                chunk = self._sock.recv(256 * 1024)
+            except OSError:
+                return
+            if not chunk:
+                if not self._closed:
+                    print(f"Message bus connection to {self.path} closed")
+                return
+            frames, buffer = decode_frames(buffer + chunk)
+            for _, channel, payload, _ in frames:
+                self._dispatch(channel, json.loads(payload))
+
+    def close(self):
+        self._closed = True
+        try:
+            self._sock.close()
+        except OSError:
+            pass
+
+
+class RedisBus(MessageBus):
+    """Redis pub/sub 后端，适合多台机器部署"""
+
+    def __init__(self, url):
+        super().__init__()
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError('redis:// message bus requires the redis package')
+        self._redis = redis.Redis.from_url(url)
+        self._pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        self._started = False
+
+    def _subscribe(self, channel):
+        self._pubsub.subscribe(channel)
+
+    def publish(self, channel, message):
+        self._redis.publish(channel, _dumps(message))
+
+    def start(self, start_background_task=None):
+        if self._started:
+            return
+        self._started = True
+        (start_background_task or (lambda f: threading.Thread(target=f, daemon=True).start()))(self._reader)
+
+    def _reader(self):
+        for item in self._pubsub.listen():
+            if item['type'] == 'message':
+                self._dispatch(item['channel'].decode('utf-8'), json.loads(item['data']))
+
+    def close(self):
+        self._pubsub.close()
+
+
+def create_bus(url):
+    """按 URL 创建总线；url 为空时返回 None（单进程部署，不需要总线）"""
+    if not url:
+        return None
+    parsed = urllib.parse.urlparse(url)
+    if parsed.scheme == 'local':
+        return LocalBus()
+    if parsed.scheme == 'unix':
+        return UnixSocketBus(parsed.path)
+    if parsed.scheme in ('redis', 'rediss'):
+        return RedisBus(url)
+    raise ValueError(f'unsupported message bus url: {url}')
+
+
+class BusClientManager(PubSubManager, FlowControlManager):
+    """python-socketio 客户端管理器：跨进程的 emit / enter_room / close_room 通过 MessageBus 传递，
+    投递给本进程连接时经过 FlowControlManager 的出站限制"""
+
+    name = 'bus'
+
+    def __init__(self, bus, channel='socketio'):
+        super().__init__(channel=channel)
+        self.bus = bus
+        self._inbox = queue.Queue()
+
+    def initialize(self):
+        # 第一个客户端连接时才订阅，没有客户端的进程不会堆积消息
+        self.bus.subscribe(self.channel, self._inbox.put)
+        super().initialize()
+
+    def _publish(self, data):
+        self.bus.publish(self.channel, data)
+
+    def _listen(self):
+        while True:
+            yield self._inbox.get()
+
+
+class Broker:
+    """Unix socket 消息代理：单线程 selectors 循环，只解析帧头，把发布的帧原样转发给订阅者"""
+
+    def __init__(self, path):
+        self.path = path
+        self.selector = selectors.DefaultSelector()
+        self.subscribers = {}  # channel -> set(conn)
+        self.buffers = {}  # conn -> 未解析完的输入
+        self.pending = {}  # conn -> 待发送的输出
+        self.forwarded = 0
+
+    def serve_forever(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listener.bind(self.path)
+        listener.listen(128)
+        listener.setblocking(False)
+        self.selector.register(listener, selectors.EVENT_READ)
+        try:
+            while True:
+                for key, events in self.selector.select():
+                    if key.fileobj is listener:
+                        conn, _ = listener.accept()
+                        conn.setblocking(False)
+                        self.buffers[conn] = b''
+                        self.pending[conn] = bytearray()
+                        self.selector.register(conn, selectors.EVENT_READ)
+                        continue
+                    if events & selectors.EVENT_WRITE:
+                        self._flush(key.fileobj)
+                    if events & selectors.EVENT_READ:
+                        self._read(key.fileobj)
+        finally:
+            listener.close()
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+
+    def _read(self, conn):
+        try:
+            chunk = conn.recv(256 * 1024)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            chunk = b''
+        if not chunk:
+            self._drop(conn)
+            return
+        frames, self.buffers[conn] = decode_frames(self.buffers[conn] + chunk)
+        touched = set()
+        for op, channel, _, raw in frames:
+            if op == OP_SUBSCRIBE:
+                self.subscribers.setdefault(channel, set()).add(conn)
+            elif op == OP_PUBLISH:
+                for subscriber in self.subscribers.get(channel, ()):
+                    self.pending[subscriber] += raw
+                    touched.add(subscriber)
+                self.forwarded += 1
+        for subscriber in touched:
+            self._flush(subscriber)
+
+    def _flush(self, conn):
+        data = self.pending.get(conn)
+        if data is None:
+            return
+        try:
+            sent = conn.send(data) if data else 0
+        except (BlockingIOError, InterruptedError):
+            sent = 0
+        except OSError:
+            self._drop(conn)
+            return
+        del data[:sent]
+        # 慢订阅者：剩余数据等可写时再发
+        self.selector.modify(conn, selectors.EVENT_READ | (selectors.EVENT_WRITE if data else 0))
+
+    def _drop(self, conn):
+        self.selector.unregister(conn)
+        self.buffers.pop(conn, None)
+        self.pending.pop(conn, None)
+        for subscribers in self.subscribers.values():
+            subscribers.discard(conn)
+        conn.close()
+
+
+def start_broker(path, timeout=10.0):
+    """在子进程中启动代理并等待其就绪，返回 Popen 对象"""
+    process = subprocess.Popen([sys.executable, os.path.abspath(__file__), '--path', path])
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(path)
+            return process
+        except OSError:
+            time.sleep(0.05)
+        finally:
+            probe.close()
+    process.kill()
+    raise RuntimeError(f'message broker did not start at {path}')
+
+
+def broker_is_running(path):
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+        return True
+    except OSError:
+        return False
+    finally:
+        probe.close()
+
+
+_request_ids = itertools.count(1)
+
+
+class ShardClient:
+    """分片之间的请求/响应：request() 把查询发到目标分片的频道，在本进程的回复频道上等待结果"""
+
+    def __init__(self, bus, shard_id, event_class=threading.Event):
+        self.bus = bus
+        self.reply_channel = f'reply.{shard_id}.{os.getpid()}'
+        self.event_class = event_class
+        self._pending = {}  # request id -> [event, result]
+        bus.subscribe(self.reply_channel, self._on_reply)
+
+    def _on_reply(self, message):
+        waiter = self._pending.get(message.get('id'))
+        if waiter is not None:
+            waiter[1] = message.get('result')
+            waiter[0].set()
+
+    def request(self, channel, op, timeout=2.0, **args):
+        request_id = next(_request_ids)
+        waiter = self._pending[request_id] = [self.event_class(), None]
+        try:
+            self.bus.publish(channel, {'op': op, 'args': args, 'reply_to': self.reply_channel, 'id': request_id})
+            if not waiter[0].wait(timeout):
+                raise TimeoutError(f'shard request {op} on {channel} timed out')
+            return waiter[1]
+        finally:
+            self._pending.pop(request_id, None)
+
+    def reply(self, message, result):
+        self.bus.publish(message['reply_to'], {'id': message['id'], 'result': result})
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Unix socket message broker for multi-worker deployments')
+    parser.add_argument('--path', required=True)
+    args = parser.parse_args()
+    # SIGTERM 时正常退出并删除 socket 文件
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        Broker(args.path).serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
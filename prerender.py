@@ -0,0 +1,106 @@
+"""静态游戏页面预渲染：每种语言渲染一次，请求时只替换与用户相关的片段"""
+import os
+import threading
+
+from markupsafe import escape
+
+# 渲染时用占位符代替按请求变化的变量，之后再做字符串替换
+_MARKERS = (
+    {'user': '\x00user-a\x00', 'year': '\x00year-a\x00'},
+    {'user': '\x00user-b\x00', 'year': '\x00year-b\x00'},
+)
+
+
+class PrerenderedPages:
+    """(模板, 语言) -> 预渲染外壳 的缓存，支持部署时写盘、运行时按需补齐"""
+
+    def __init__(self, flask_app, pages_dir, translations_dir, template_dirs):
+        self.app = flask_app
+        self.pages_dir = pages_dir
+        self.translations_dir = translations_dir
+        self.template_dirs = template_dirs  # 预渲染结果依赖的模板目录（用于判断磁盘缓存是否过期）
+        self._shells = {}  # (template, lang) -> 预渲染 HTML；None 表示该模板不适合预渲染
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _render(self, template_name, text, markers, languages, lang):
+        from flask import render_template
+        with self.app.test_request_context():
+            return render_template(template_name, lang=lang, languages=languages, text=text, **markers)
+
+    def build_shell(self, template_name, lang, text, languages):
+        """用两组不同占位符各渲染一次；若只在占位符处不同，说明页面只把 user/year 当作普通输出，可以安全预渲染"""
+        first = self._render(template_name, text, _MARKERS[0], languages, lang)
+        second = self._render(template_name, text, _MARKERS[1], languages, lang)
+        swapped = first
+        for key, marker in _MARKERS[0].items():
+            swapped = swapped.replace(marker, _MARKERS[1][key])
+        return first if swapped == second else None
+
+    def _page_path(self, template_name, lang):
+        return os.path.join(self.pages_dir, lang, template_name)
+
+    def _sources_mtime(self, template_name, lang):
+        mtimes = [os.path.getmtime(os.path.join(self.translations_dir, f'{lang}.json'))]
+        for loader_dir in self.template_dirs:
+            path = os.path.join(loader_dir, template_name)
+            if os.path.exists(path):
+                mtimes.append(os.path.getmtime(path))
+        return max(mtimes)
+
+    def _load_from_disk(self, template_name, lang):
+        path = self._page_path(template_name, lang)
+        try:
+            if os.path.getmtime(path) < self._sources_mtime(template_name, lang):
+                return None
+            with open(path, 'r', encoding='utf-8') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def get_shell(self, template_name, lang, text, languages):
+        key = (template_name, lang)
+        if key in self._shells:
+            self.hits += 1
+            return self._shells[key]
+        with self._lock:
+            if key not in self._shells:
+                self.misses += 1
+                shell = self._load_from_disk(template_name, lang)
+                if shell is None:
+                    shell = self.build_shell(template_name, lang, text, languages)
+                self._shells[key] = shell
+        return self._shells[key]
+
+    def render(self, template_name, lang, text, languages, user, year):
+        """返回完整页面；不适合预渲染的模板回退为正常渲染"""
+        shell = self.get_shell(template_name, lang, text, languages)
+        if shell is None:
+            from flask import render_template
+            return render_template(template_name, lang=lang, languages=languages, text=text, user=user, year=year)
+        markers = _MARKERS[0]
+        return shell.replace(markers['user'], str(escape(user))).replace(markers['year'], str(year))
+
+    def prerender_all(self, template_names, catalogs, languages):
+        """部署时调用：把所有 (模板, 语言) 组合渲染并写入 pages_dir，返回写入的文件数"""
+        written = 0
+        for lang in languages:
+            os.makedirs(os.path.join(self.pages_dir, lang), exist_ok=True)
+            for template_name in template_names:
+                shell = self.build_shell(template_name, lang, catalogs[lang], languages)
+                path = self._page_path(template_name, lang)
+                if shell is None:
+                    if os.path.exists(path):
+                        os.remove(path)
+                    continue
+                with open(path, 'w', encoding='utf-8') as f:
+                    f.write(shell)
+                written += 1
+                with self._lock:
+                    self._shells[(template_name, lang)] = shell
+        return written
+
+    def clear(self):
+        with self._lock:
+            self._shells.clear()
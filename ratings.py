@@ -0,0 +1,157 @@
+"""按游戏类型的 Glicko 评分：对局结果更新评分，定期写回 ratings/<game_type>.json
+
+多人房间按两两对局处理：胜者对每名其他玩家记一胜，其余玩家之间记平局；没有胜者时全部记平局。
+每个游戏类型一个文件，多 worker 部署时只有负责该游戏类型的分片会写它。
+"""
+import json
+import math
+import os
+import threading
+import time
+
+DEFAULT_RATING = 1500.0
+DEFAULT_RD = 350.0  # 新玩家的评分偏差（不确定度）
+MIN_RD = 30.0
+# 长期不玩时 RD 逐渐回升：约 100 天从 50 回到 350
+RD_GROWTH_PER_DAY = math.sqrt((DEFAULT_RD ** 2 - 50.0 ** 2) / 100)
+_Q = math.log(10) / 400
+
+
+def _g(rd):
+    return 1 / math.sqrt(1 + 3 * _Q * _Q * rd * rd / (math.pi * math.pi))
+
+
+def expected_score(rating, opponent_rating, opponent_rd=0.0):
+    return 1 / (1 + 10 ** (-_g(opponent_rd) * (rating - opponent_rating) / 400))
+
+
+class Rating:
+    __slots__ = ('rating', 'rd', 'games', 'updated_at')
+
+    def __init__(self, rating=DEFAULT_RATING, rd=DEFAULT_RD, games=0, updated_at=None):
+        self.rating = rating
+        self.rd = rd
+        self.games = games
+        self.updated_at = updated_at
+
+    def current_rd(self, now):
+        """计入未参赛时间后的 RD"""
+        if self.updated_at is None:
+            return self.rd
+        days = max(now - self.updated_at, 0) / 86400
+        return min(math.sqrt(self.rd ** 2 + RD_GROWTH_PER_DAY ** 2 * days), DEFAULT_RD)
+
+    def to_list(self):
+        return [round(self.rating, 2), round(self.rd, 2), self.games, self.updated_at]
+
+    def to_dict(self, now=None):
+        now = time.time() if now is None else now
+        return {'rating': round(self.rating), 'rd': round(self.current_rd(now)), 'games': self.games}
+
+
+def glicko_update(rating, rd, results):
+    """results: [(对手评分, 对手 RD, 得分 1/0.5/0)]，返回 (新评分, 新 RD)"""
+    if not results:
+        return rating, rd
+    d_inv = 0.0
+    delta = 0.0
+    for opponent, opponent_rd, score in results:
+        g = _g(opponent_rd)
+        e = expected_score(rating, opponent, opponent_rd)
+        d_inv += _Q * _Q * g * g * e * (1 - e)
+        delta += g * (score - e)
+    denominator = 1 / (rd * rd) + d_inv
+    new_rating = rating + _Q / denominator * delta
+    new_rd = max(math.sqrt(1 / denominator), MIN_RD)
+    return new_rating, new_rd
+
+
+class RatingStore:
+    """game_type -> {玩家 -> Rating}；首次访问某游戏类型时加载文件，修改后标记为脏，由 flush() 写回"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._ratings = {}
+        self._dirty = set()
+        self._lock = threading.Lock()
+        self.updates = 0
+
+    def _path(self, game_type):
+        return os.path.join(self.directory, f'{game_type}.json')
+
+    def _table(self, game_type):
+        table = self._ratings.get(game_type)
+        if table is None:
+            table = {}
+            try:
+                with open(self._path(game_type), 'r', encoding='utf-8') as f:
+                    for player, values in json.load(f).items():
+                        table[player] = Rating(*values)
+            except FileNotFoundError:
+                pass
+            except (json.JSONDecodeError, TypeError) as e:
+                print(f"Error loading ratings for {game_type}: {e}")
+            self._ratings[game_type] = table
+        return table
+
+    def get(self, game_type, player):
+        """玩家的评分；没有记录（或 player 为 None，即游客）时返回默认评分"""
+        if player is None:
+            return Rating()
+        with self._lock:
+            return self._table(game_type).get(player) or Rating()
+
+    def record_result(self, game_type, players, winner=None, now=None):
+        """按一局的结果更新评分。players 为玩家标识列表（None 表示不计分的游客，按默认评分参与计算），
+        winner 为胜者在 players 中的下标，None 表示平局"""
+        now = time.time() if now is None else now
+        with self._lock:
+            table = self._table(game_type)
+            current = [(p, table.get(p) or Rating()) if p is not None else (None, Rating()) for p in players]
+            snapshot = [(r.rating, r.current_rd(now)) for _, r in current]
+            for i, (player, rating) in enumerate(current):
+                if player is None:
+                    continue
+                results = []
+                for j, (other, _) in enumerate(current):
+                    if i == j:
+                        continue
+                    if winner is None or winner not in (i, j):
+                        score = 0.5
+                    else:
+                        score = 1.0 if winner == i else 0.0
+                    results.append((snapshot[j][0], snapshot[j][1], score))
+                rating.rating, rating.rd = glicko_update(snapshot[i][0], snapshot[i][1], results)
+                rating.games += 1
+                rating.updated_at = now
+                table[player] = rating
+            self._dirty.add(game_type)
+            self.updates += 1
+
+    def flush(self):
+        """把有变化的游戏类型写回文件（先写临时文件再替换，写到一半崩溃不会损坏原文件）"""
+        with self._lock:
+            pending = {g: {p: r.to_list() for p, r in self._ratings[g].items()} for g in self._dirty}
+            self._dirty.clear()
+        if not pending:
+            return 0
+        os.makedirs(self.directory, exist_ok=True)
+        for game_type, data in pending.items():
+            path = self._path(game_type)
+            try:
+                with open(path + '.tmp', 'w', encoding='utf-8') as f:
+                    json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+                os.replace(path + '.tmp', path)
+            except IOError as e:
+                print(f"Error saving ratings for {game_type}: {e}")
+                with self._lock:
+                    self._dirty.add(game_type)
+        return len(pending)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'updates': self.updates,
+                'players': {g: len(t) for g, t in self._ratings.items()},
+                'dirty': sorted(self._dirty),
+            }
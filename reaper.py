@@ -0,0 +1,121 @@
+"""过期对象回收：清理空闲会话、无人的等待房间和超时的匹配队列条目"""
+import time
+
+
+class Reaper:
+    """由调度器周期调用 run()。
+
+    会话：连接已断开超过 reconnect_grace 秒，或超过 session_ttl 秒没有任何事件；
+    房间：未在对局中（waiting/finished）且超过 room_ttl 秒没有变化，或已经没有玩家；
+    队列：排队超过 queue_ttl 秒。
+    通过 notify(event, payload, to) 通知受影响的客户端。
+    """
+
+    def __init__(self, sessions, rooms, queue, notify, close_room=None, cancel_timer=None,
+                 is_connected=None, session_ttl=1800, room_ttl=600, queue_ttl=300, reconnect_grace=0):
+        self.sessions = sessions
+        self.rooms = rooms
+        self.queue = queue
+        self.notify = notify
+        self.close_room = close_room
+        self.cancel_timer = cancel_timer
+        self.is_connected = is_connected
+        self.session_ttl = session_ttl
+        self.room_ttl = room_ttl
+        self.queue_ttl = queue_ttl
+        self.reconnect_grace = reconnect_grace
+        self.totals = {'sessions': 0, 'rooms': 0, 'queue_entries': 0}
+        self.runs = 0
+        self.last_run = None
+
+    def _drop_from_queue(self, user_id):
+        entry = self.queue.cancel(user_id)
+        if entry is not None and self.cancel_timer is not None:
+            self.cancel_timer(entry.timer)
+        return entry
+
+    def _leave_room(self, user_id, session):
+        room_id = session.get('current_room')
+        room = self.rooms.get(room_id) if room_id else None
+        if room is None or room.remove_player(user_id) is None:
+            return
+        self.notify('player_left', {
+            'user_id': user_id,
+            'username': session.get('username'),
+            'players': room.players,
+            'reason': 'expired'
+        }, room_id)
+        if room.is_empty():
+            self._close_room(room_id)
+
+    def _close_room(self, room_id):
+        self.rooms.remove(room_id)
+        if self.close_room is not None:
+            self.close_room(room_id)
+
+    def reap_sessions(self, now):
+        reaped = 0
+        for user_id, session in list(self.sessions.items()):
+            last_seen = session.get('last_seen', session.get('connected_at', now))
+            disconnected = self.is_connected is not None and not self.is_connected(session.get('sid'))
+            if not disconnected and now - last_seen <= self.session_ttl:
+                continue
+            # 断线后的保留期内不回收，等待重连恢复
+            if disconnected and now - session.get('disconnected_at', 0) <= self.reconnect_grace:
+                continue
+            self._drop_from_queue(user_id)
+            self._leave_room(user_id, session)
+            self.sessions.pop(user_id, None)
+            if not disconnected:
+                self.notify('session_expired', {'message': '会话已过期，请刷新页面'}, user_id)
+            reaped += 1
+        return reaped
+
+    def reap_rooms(self, now):
+        reaped = 0
+        for room_id, room in list(self.rooms.items()):
+            abandoned = room.status != 'playing' and now - room.updated_at > self.room_ttl
+            if not abandoned and not room.is_empty():
+                continue
+            for user_id in room.player_ids():
+                session = self.sessions.get(user_id)
+                if session and session.get('current_room') == room_id:
+                    session['current_room'] = None
+            self.notify('room_closed', {'room_id': room_id, 'message': '房间长时间无人操作，已关闭'}, room_id)
+            self._close_room(room_id)
+            reaped += 1
+        return reaped
+
+    def reap_queue(self, now):
+        reaped = 0
+        for game_type in list(self.queue.game_types()):
+            for entry in self.queue.entries(game_type):
+                if now - entry.joined_at <= self.queue_ttl:
+                    # 队列按入队时间排序，后面的都更新
+                    break
+                self._drop_from_queue(entry.user_id)
+                self.notify('matching_expired', {'message': '匹配等待时间过长，已退出匹配队列'}, entry.user_id)
+                reaped += 1
+        return reaped
+
+    def run(self, now=None):
+        now = time.time() if now is None else now
+        counts = {
+            'queue_entries': self.reap_queue(now),
+            'sessions': self.reap_sessions(now),
+            'rooms': self.reap_rooms(now),
+        }
+        for key, value in counts.items():
+            self.totals[key] += value
+        self.runs += 1
+        self.last_run = now
+        return counts
+
+    def stats(self):
+        return {
+            'runs': self.runs,
+            'last_run': self.last_run,
+            'reaped': dict(self.totals),
+            'ttl': {'session': self.session_ttl, 'room': self.room_ttl, 'queue': self.queue_ttl,
+                    'reconnect_grace': self.reconnect_grace},
+        }
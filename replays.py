@@ -0,0 +1,262 @@
+"""联机对局录像：按 tick 追加输入、房间事件和状态增量的紧凑二进制文件，每个房间一个 replays/<room_id>.rpl
+
+模拟中的随机数（发球角度、小行星生成等）不按房间播种，单靠输入无法重演对局，
+因此同时记录状态：每 keyframe_interval 个 tick 一个关键帧，其余 tick 记录相对上一 tick 的增量
+（与下发给客户端的增量格式相同），回放时按顺序应用即可得到每个 tick 的完整状态。
+
+文件格式：
+  文件头：MAGIC（4 字节）+ 头部长度（4 字节，大端）+ MessagePack 头部
+          {'room_id', 'game_type', 'players', 'tick_rate', 'started_at'}（时间戳均为整数毫秒）
+  记录：类型（1 字节）+ tick（4 字节）+ 负载长度（4 字节）+ MessagePack 负载
+    KEYFRAME  完整状态
+    DELTA     相对上一 tick 状态的差异
+    INPUT     {user_id: 指令}，只记录发生变化的玩家，从下一个 tick 起生效
+    EVENT     {'event': 事件名, 'data': 负载}
+    END       {'ended_at': 时间戳}
+
+写入全部交给后台线程：tick 循环只把快照引用追加到 deque（无锁），计算增量、编码和写文件都在后台线程；
+后台线程在 tick 结束（end_tick）时才被唤醒，在两个 tick 之间的空闲时间处理，不与 tick 争用 GIL。
+文件按 64KB 缓冲写入，空闲时刷盘；读取用 mmap，不把整个文件读进内存。
+"""
+import collections
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+
+from snapshots import apply_diff, delta, pack, unpack
+
+MAGIC = b'RPL1'
+HEADER_SIZE = struct.Struct('>I')
+RECORD = struct.Struct('>BII')  # 类型、tick、负载长度
+KEYFRAME, DELTA, INPUT, EVENT, END = 1, 2, 3, 4, 5
+RECORD_TYPES = {KEYFRAME: 'keyframe', DELTA: 'delta', INPUT: 'input', EVENT: 'event', END: 'end'}
+WRITE_BUFFER = 64 * 1024
+_ROOM_ID = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+
+
+def _now_ms():
+    # MessagePack 编码用单精度浮点，秒级时间戳会丢精度，统一存整数毫秒
+    return int(time.time() * 1000)
+
+
+def replay_path(directory, room_id):
+    """房间录像的路径；room_id 不是合法的房间 ID 时返回 None"""
+    if not isinstance(room_id, str) or not _ROOM_ID.match(room_id):
+        return None
+    return os.path.join(directory, f'{room_id}.rpl')
+
+
+class _ReplayFile:
+    __slots__ = ('file', 'tick', 'state', 'inputs', 'keyframe_interval')
+
+    def __init__(self, path, header, keyframe_interval):
+        self.file = open(path, 'wb', buffering=WRITE_BUFFER)
+        data = pack(header)
+        self.file.write(MAGIC + HEADER_SIZE.pack(len(data)) + data)
+        self.tick = 0
+        self.state = None
+        self.inputs = {}
+        self.keyframe_interval = keyframe_interval
+
+    def write(self, kind, payload):
+        data = pack(payload)
+        self.file.write(RECORD.pack(kind, self.tick, len(data)))
+        self.file.write(data)
+        return RECORD.size + len(data)
+
+    def write_state(self, tick, state):
+        self.tick = tick
+        if self.state is None or tick % self.keyframe_interval == 0:
+            size = self.write(KEYFRAME, state)
+        else:
+            size = self.write(DELTA, delta(self.state, state))
+        self.state = state
+        return size
+
+
+class ReplayRecorder:
+    """后台线程写录像；只有 start() 过的房间会被记录，其他房间的调用直接返回"""
+
+    def __init__(self, directory, keyframe_interval=100, flush_interval=1.0, max_queue=100000):
+        self.directory = directory
+        self.keyframe_interval = keyframe_interval
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self._queue = collections.deque()
+        self._wake = threading.Event()
+        self._active = set()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.records = 0
+        self.bytes_written = 0
+        self.dropped = 0  # 队列满时丢弃的记录（写盘跟不上），不阻塞 tick 循环
+        self.replays = 0
+
+    def _put(self, item):
+        if len(self._queue) >= self.max_queue:
+            self.dropped += 1
+        else:
+            self._queue.append(item)
+
+    def end_tick(self):
+        """tick 引擎每个 tick 结束时调用：唤醒后台线程处理本 tick 的记录"""
+        if self._queue:
+            self._wake.set()
+
+    def _ensure_thread(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='replay-writer', daemon=True)
+                self._thread.start()
+
+    def start(self, room_id, game_type, players, tick_rate):
+        if replay_path(self.directory, room_id) is None:
+            return
+        self._ensure_thread()
+        self._active.add(room_id)
+        self._put(('start', room_id, {'room_id': room_id, 'game_type': game_type, 'players': players,
+                                      'tick_rate': tick_rate, 'started_at': _now_ms()}))
+
+    def is_recording(self, room_id):
+        return room_id in self._active
+
+    def record_tick(self, room_id, snapshot):
+        """snapshot 之后不能再被修改（tick 引擎每个 tick 生成新的快照）"""
+        if room_id in self._active:
+            self._put(('tick', room_id, snapshot))
+
+    def record_input(self, room_id, user_id, command):
+        if room_id in self._active:
+            self._put(('input', room_id, (user_id, command)))
+
+    def record_event(self, room_id, event, payload):
+        if room_id in self._active:
+            self._put(('event', room_id, {'event': event, 'data': payload}))
+
+    def finish(self, room_id):
+        if room_id in self._active:
+            self._active.discard(room_id)
+            self._put(('finish', room_id, None))
+
+    def close(self, timeout=5):
+        """结束全部录像并等待后台线程写完（关闭时调用）"""
+        for room_id in list(self._active):
+            self.finish(room_id)
+        if self._thread is not None:
+            self._queue.append(None)
+            self._wake.set()
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        files = {}
+        while True:
+            if not self._wake.wait(self.flush_interval):
+                for replay in files.values():
+                    replay.file.flush()
+            self._wake.clear()
+            if not self._drain(files):
+                break
+        for replay in files.values():
+            replay.write(END, {'ended_at': _now_ms()})
+            replay.file.close()
+
+    def _drain(self, files):
+        """处理队列中的全部记录；遇到结束标记返回 False"""
+        while self._queue:
+            item = self._queue.popleft()
+            if item is None:
+                return False
+            kind, room_id, payload = item
+            try:
+                self._handle(files, kind, room_id, payload)
+            except (OSError, TypeError, ValueError) as e:
+                print(f"Error recording replay {room_id}: {e}")
+                replay = files.pop(room_id, None)
+                if replay is not None:
+                    replay.file.close()
+                self._active.discard(room_id)
+        return True
+
+    def _handle(self, files, kind, room_id, payload):
+        if kind == 'start':
+            os.makedirs(self.directory, exist_ok=True)
+            previous = files.pop(room_id, None)
+            if previous is not None:
+                previous.file.close()
+            files[room_id] = _ReplayFile(replay_path(self.directory, room_id), payload, self.keyframe_interval)
+            self.replays += 1
+            return
+        replay = files.get(room_id)
+        if replay is None:
+            return
+        if kind == 'tick':
+            size = replay.write_state(payload['tick'], payload)
+        elif kind == 'input':
+            user_id, command = payload
+            if replay.inputs.get(user_id) == command:
+                return
+            replay.inputs[user_id] = command
+            size = replay.write(INPUT, {user_id: command})
+        elif kind == 'event':
+            size = replay.write(EVENT, payload)
+        else:
+            size = replay.write(END, {'ended_at': _now_ms()})
+            replay.file.close()
+            del files[room_id]
+        self.records += 1
+        self.bytes_written += size
+
+    def stats(self):
+        return {
+            'recording': len(self._active),
+            'replays': self.replays,
+            'records': self.records,
+            'bytes_written': self.bytes_written,
+            'queued': len(self._queue),
+            'dropped': self.dropped,
+        }
+
+
+def iter_chunks(path, chunk_size=64 * 1024, limit=None):
+    """以 mmap 方式分块读取录像文件（用于流式响应）；录制中的文件读到当前长度（或 limit）为止"""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            end = len(mm) if limit is None else min(len(mm), limit)
+            for offset in range(0, end, chunk_size):
+                yield mm[offset:min(offset + chunk_size, end)]
+
+
+def read_replay(path):
+    """解析录像文件，返回 (头部, [(类型名, tick, 负载)])；DELTA 记录已展开为完整状态。
+    末尾不完整的记录（录制中或进程中断）被忽略"""
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        view = memoryview(mm)
+        try:
+            if view[:4] != MAGIC:
+                raise ValueError(f'{path} is not a replay file')
+            (header_size,) = HEADER_SIZE.unpack_from(view, 4)
+            offset = 8 + header_size
+            header = unpack(bytes(view[8:offset]))
+            records = []
+            state = None
+            while offset + RECORD.size <= len(view):
+                kind, tick, size = RECORD.unpack_from(view, offset)
+                start = offset + RECORD.size
+                if start + size > len(view):
+                    break
+                payload = unpack(bytes(view[start:start + size]))
+                if kind == KEYFRAME:
+                    state = payload
+                elif kind == DELTA:
+                    state = payload = apply_diff(state, payload)
+                records.append((RECORD_TYPES.get(kind, kind), tick, payload))
+                offset = start + size
+            return header, records
+        finally:
+            view.release()
@@ -0,0 +1,257 @@
+"""游戏房间与房间索引"""
+import collections
+import itertools
+import time
+
+from chat import ChatLog
+
+DEFAULT_ROOM_SIZE = 4  # 每个房间的最大人数，匹配时也按此分组
+EVENT_BUFFER_SIZE = 64  # 每个房间保留的最近事件数，用于断线重连补发
+
+
+class Player:
+    __slots__ = ('id', 'username', 'joined_at', 'ready', 'sid', 'connected', 'rtt')
+
+    def __init__(self, user_id, username, joined_at=None, sid=None):
+        self.id = user_id
+        self.username = username
+        self.joined_at = time.time() if joined_at is None else joined_at
+        self.ready = False
+        self.sid = sid  # 当前连接；断线重连后更新
+        self.connected = True  # 断线后座位保留期间为 False
+        self.rtt = None  # 平滑后的往返时延（毫秒），由玩家连接所在的 worker 上报
+
+    def to_dict(self):
+        return {'id': self.id, 'username': self.username, 'joined_at': self.joined_at, 'ready': self.ready,
+                'connected': self.connected, 'rtt': self.rtt}
+
+
+class RoomEventLog:
+    """房间广播事件的环形缓冲，每条事件带递增序号；重连的玩家按最后收到的序号补发"""
+
+    __slots__ = ('_events', 'seq')
+
+    def __init__(self, size=EVENT_BUFFER_SIZE):
+        self._events = collections.deque(maxlen=size)
+        self.seq = 0
+
+    def __len__(self):
+        return len(self._events)
+
+    def append(self, event, payload):
+        self.seq += 1
+        self._events.append((self.seq, event, payload))
+        return self.seq
+
+    def since(self, seq):
+        """返回序号大于 seq 的事件 [(seq, event, payload)]；需要的事件已被覆盖时返回 None"""
+        if seq >= self.seq:
+            return []
+        if not self._events or self._events[0][0] > seq + 1:
+            return None
+        return [item for item in self._events if item[0] > seq]
+
+
+class GameRoom:
+    """玩家按 user_id 存在字典里（保持加入顺序），成员判断 O(1)；
+    ready_count 随准备状态增减，can_start() 为 O(1)。"""
+
+    __slots__ = ('room_id', 'game_type', 'max_players', '_players', 'ready_count', 'owner',
+                 '_status', 'created_at', 'updated_at', 'game_data', 'registry', 'events', 'chat')
+
+    def __init__(self, room_id, game_type, max_players=DEFAULT_ROOM_SIZE):
+        self.room_id = room_id
+        self.game_type = game_type
+        self.max_players = max_players
+        self._players = {}  # user_id -> Player
+        self.ready_count = 0
+        self.owner = None
+        self._status = 'waiting'  # waiting, playing, finished
+        self.created_at = time.time()
+        self.updated_at = self.created_at  # 最近一次人数/状态变化，回收器据此判断房间是否被遗弃
+        self.game_data = {}
+        self.registry = None  # 所属的 RoomRegistry，状态变化时通知它更新索引
+        self.events = RoomEventLog()
+        self.chat = ChatLog()  # 最近的聊天消息，不计入 events（聊天多时会挤掉需要补发的房间事件）
+
+    @property
+    def status(self):
+        return self._status
+
+    @status.setter
+    def status(self, value):
+        self._status = value
+        self._changed()
+
+    @property
+    def players(self):
+        """按加入顺序返回玩家信息（用于推送给客户端）"""
+        return [p.to_dict() for p in self._players.values()]
+
+    def _changed(self):
+        self.updated_at = time.time()
+        if self.registry is not None:
+            self.registry.update(self)
+
+    @property
+    def player_count(self):
+        return len(self._players)
+
+    def __contains__(self, user_id):
+        return user_id in self._players
+
+    def is_empty(self):
+        return not self._players
+
+    def player_ids(self):
+        return list(self._players)
+
+    def get_player(self, user_id):
+        return self._players.get(user_id)
+
+    def add_player(self, user_id, username, sid=None):
+        if len(self._players) < self.max_players and user_id not in self._players:
+            self._players[user_id] = Player(user_id, username, sid=sid)
+            if not self.owner:
+                self.owner = user_id
+            self._changed()
+            return True
+        return False
+
+    def remove_player(self, user_id):
+        player = self._players.pop(user_id, None)
+        if player is None:
+            return None
+        if player.ready:
+            self.ready_count -= 1
+        if self.owner == user_id:
+            # 房主离开时由最早加入的玩家接任
+            self.owner = next(iter(self._players), None)
+        self._changed()
+        return player
+
+    def set_ready(self, user_id, ready):
+        player = self._players.get(user_id)
+        if player is None:
+            return None
+        if player.ready != ready:
+            player.ready = ready
+            self.ready_count += 1 if ready else -1
+            self.updated_at = time.time()
+        return ready
+
+    def set_connected(self, user_id, connected, sid=None):
+        """标记玩家断线（座位保留）或重连，返回玩家；不在房间时返回 None"""
+        player = self._players.get(user_id)
+        if player is None:
+            return None
+        player.connected = connected
+        if sid is not None:
+            player.sid = sid
+        self.updated_at = time.time()
+        return player
+
+    def toggle_ready(self, user_id):
+        """切换准备状态，返回新状态；玩家不在房间时返回 None"""
+        player = self._players.get(user_id)
+        if player is None:
+            return None
+        return self.set_ready(user_id, not player.ready)
+
+    def is_full(self):
+        return len(self._players) >= self.max_players
+
+    def is_joinable(self):
+        return self._status == 'waiting' and len(self._players) < self.max_players
+
+    def can_start(self):
+        return len(self._players) >= 2 and self.ready_count == len(self._players)
+
+    def summary(self):
+        """大厅列表里展示的房间信息"""
+        return {
+            'room_id': self.room_id,
+            'player_count': len(self._players),
+            'max_players': self.max_players
+        }
+
+
+class RoomRegistry:
+    """room_id -> GameRoom 的映射，同时按 game_type 维护可加入房间的索引。
+
+    房间人数或状态变化时由 GameRoom 回调 update()，列出可加入房间只需
+    O(该类型的可加入房间数)，不再遍历全部房间。
+    设置 on_open_change 后，可加入房间新建、变化或关闭时回调 on_open_change(game_type, room_id, room)，
+    关闭时 room 为 None（大厅订阅据此推送增量）。
+    """
+
+    def __init__(self):
+        self._rooms = {}
+        self._open = {}  # game_type -> {room_id: room}，保持创建顺序便于分页
+        self.on_open_change = None
+
+    def __contains__(self, room_id):
+        return room_id in self._rooms
+
+    def __getitem__(self, room_id):
+        return self._rooms[room_id]
+
+    def __setitem__(self, room_id, room):
+        self.add(room)
+
+    def __delitem__(self, room_id):
+        if self.remove(room_id) is None:
+            raise KeyError(room_id)
+
+    def __len__(self):
+        return len(self._rooms)
+
+    def __iter__(self):
+        return iter(self._rooms)
+
+    def get(self, room_id, default=None):
+        return self._rooms.get(room_id, default)
+
+    def items(self):
+        return self._rooms.items()
+
+    def values(self):
+        return self._rooms.values()
+
+    def add(self, room):
+        self._rooms[room.room_id] = room
+        room.registry = self
+        self.update(room)
+
+    def remove(self, room_id):
+        room = self._rooms.pop(room_id, None)
+        if room is not None:
+            room.registry = None
+            open_rooms = self._open.get(room.game_type)
+            if open_rooms and open_rooms.pop(room_id, None) is not None and self.on_open_change:
+                self.on_open_change(room.game_type, room_id, None)
+        return room
+
+    def update(self, room):
+        """根据房间当前状态加入或移出可加入索引"""
+        if room.room_id not in self._rooms:
+            return
+        open_rooms = self._open.setdefault(room.game_type, {})
+        if room.is_joinable():
+            open_rooms[room.room_id] = room
+        elif open_rooms.pop(room.room_id, None) is None:
+            return
+        if self.on_open_change:
+            self.on_open_change(room.game_type, room.room_id, room if room.is_joinable() else None)
+
+    def open_rooms(self, game_type):
+        return list(self._open.get(game_type, {}).values())
+
+    def open_count(self, game_type):
+        return len(self._open.get(game_type, ()))
+
+    def page(self, game_type, page=1, per_page=20):
+        """分页查询可加入房间，返回 (房间列表, 总数)"""
+        open_rooms = self._open.get(game_type, {})
+        start = max(page - 1, 0) * per_page
+        return list(itertools.islice(open_rooms.values(), start, start + per_page)), len(open_rooms)
@@ -0,0 +1,131 @@
+"""延时任务调度器：一个后台任务 + 最小堆，替代“每个延时事件一个 sleep 线程”"""
+import heapq
+import itertools
+import threading
+import time
+
+
+def _start_thread(target, *args):
+    thread = threading.Thread(target=target, args=args, daemon=True)
+    thread.start()
+    return thread
+
+
+class TimerHandle:
+    __slots__ = ('deadline', 'interval', 'callback', 'args', 'cancelled', 'queued')
+
+    def __init__(self, deadline, interval, callback, args):
+        self.deadline = deadline
+        self.interval = interval  # None 表示一次性任务
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+        self.queued = False  # 是否仍在堆中
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class TimerScheduler:
+    """所有延时事件共用一个后台循环。
+
+    start_background_task / sleep 传入 socketio.start_background_task 与
+    socketio.sleep，即可在 threading / eventlet / gevent 各种异步模式下运行。
+    取消只打标记（O(1)），到期弹出时跳过；已取消的条目过多时整理堆。
+    """
+
+    def __init__(self, start_background_task=None, sleep=None, resolution=0.1, clock=time.monotonic):
+        self._start_background_task = start_background_task or _start_thread
+        self._sleep = sleep or time.sleep
+        self.resolution = resolution
+        self.clock = clock
+        self._heap = []
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self._running = False
+        self._cancelled = 0
+        self.fired = 0
+        self.errors = 0
+
+    def __len__(self):
+        return len(self._heap) - self._cancelled
+
+    def _push(self, handle):
+        with self._lock:
+            handle.queued = True
+            heapq.heappush(self._heap, (handle.deadline, next(self._counter), handle))
+        self.start()
+        return handle
+
+    def call_later(self, delay, callback, *args):
+        """delay 秒后执行一次 callback(*args)，返回可取消的句柄"""
+        return self._push(TimerHandle(self.clock() + delay, None, callback, args))
+
+    def call_every(self, interval, callback, *args):
+        """每隔 interval 秒执行一次 callback(*args)，直到句柄被取消"""
+        return self._push(TimerHandle(self.clock() + interval, interval, callback, args))
+
+    def cancel(self, handle):
+        if handle is None or handle.cancelled:
+            return
+        with self._lock:
+            handle.cancel()
+            if handle.queued:
+                self._cancelled += 1
+                # 已取消条目超过一半时重建堆，防止大量取消后堆无限增长
+                if self._cancelled > 64 and self._cancelled * 2 > len(self._heap):
+                    for item in self._heap:
+                        if item[2].cancelled:
+                            item[2].queued = False
+                    self._heap = [item for item in self._heap if not item[2].cancelled]
+                    heapq.heapify(self._heap)
+                    self._cancelled = 0
+
+    def run_due(self, now=None):
+        """执行所有已到期的任务，返回执行的个数"""
+        now = self.clock() if now is None else now
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                _, _, handle = heapq.heappop(self._heap)
+                handle.queued = False
+                if handle.cancelled:
+                    self._cancelled -= 1
+                    continue
+                due.append(handle)
+                if handle.interval is not None:
+                    handle.queued = True
+                    handle.deadline += handle.interval
+                    if handle.deadline <= now:
+                        # 落后太多时不补跑，直接从现在开始计下一个周期
+                        handle.deadline = now + handle.interval
+                    heapq.heappush(self._heap, (handle.deadline, next(self._counter), handle))
+        for handle in due:
+            if handle.cancelled:
+                continue
+            try:
+                handle.callback(*handle.args)
+            except Exception as e:
+                self.errors += 1
+                print(f"Scheduled task {getattr(handle.callback, '__name__', handle.callback)} failed: {e}")
+            self.fired += 1
+        return len(due)
+
+    def _loop(self):
+        while self._running:
+            self.run_due()
+            self._sleep(self.resolution)
+
+    def start(self):
+        """启动后台循环（幂等）；第一次调度任务时自动调用"""
+        with self._lock:
+            if self._running:
+                return
+            self._running = True
+        self._start_background_task(self._loop)
+
+    def stop(self):
+        self._running = False
+
+    def stats(self):
+        return {'pending': len(self), 'fired': self.fired, 'errors': self.errors, 'running': self._running}
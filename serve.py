@@ -0,0 +1,161 @@
+"""生产入口：选择 Socket.IO 异步模式，用 gunicorn 启动应用
+
+用法：python serve.py [--mode eventlet|gevent|threading] [--port N]
+或：gunicorn -c gunicorn.conf.py 'app:create_app()'（两者使用同一套配置）
+
+异步模式由 SOCKETIO_ASYNC_MODE 指定，未指定时按 eventlet > gevent > threading 自动选择。
+threading 模式使用 gthread worker，WebSocket 由 simple-websocket 提供，每个连接占用线程，
+适合几百个并发连接；更多连接请安装 eventlet 或 gevent。
+WEB_CONCURRENCY > 1 时每个 worker 是一个分片（SHARD_ID），房间和匹配队列按一致性哈希分到各分片，
+跨进程消息默认经主进程启动的 Unix socket 代理（message_bus.py）转发，也可用 MESSAGE_BUS_URL 指定 Redis。
+本模块不导入 app，gunicorn 主进程加载配置时不会提前初始化应用。
+"""
+import argparse
+import importlib.util
+import os
+import signal
+import tempfile
+import urllib.parse
+
+ASYNC_MODES = ('eventlet', 'gevent', 'threading')
+WORKER_CLASSES = {'eventlet': 'eventlet', 'gevent': 'gevent', 'threading': 'gthread'}
+
+
+def _available(module):
+    return importlib.util.find_spec(module) is not None
+
+
+def detect_async_mode(preferred=None):
+    """返回可用的异步模式；指定的模式缺少依赖时抛出 RuntimeError"""
+    if preferred:
+        if preferred not in ASYNC_MODES:
+            raise RuntimeError(f'unknown async mode: {preferred}')
+        required = {'eventlet': 'eventlet', 'gevent': 'gevent', 'threading': 'simple_websocket'}[preferred]
+        if not _available(required):
+            raise RuntimeError(f'async mode {preferred} requires the {required} package')
+        return preferred
+    for mode in ('eventlet', 'gevent'):
+        if _available(mode):
+            return mode
+    if not _available('simple_websocket'):
+        raise RuntimeError('install eventlet, gevent or simple-websocket for WebSocket support')
+    return 'threading'
+
+
+def gunicorn_settings(async_mode):
+    """gunicorn 配置项，数值都可以用环境变量覆盖"""
+    env = os.environ
+    drain_timeout = int(env.get('DRAIN_TIMEOUT', 30))
+    settings = {
+        'bind': f"0.0.0.0:{env.get('PORT', 5000)}",
+        'workers': int(env.get('WEB_CONCURRENCY', 1)),
+        'worker_class': WORKER_CLASSES[async_mode],
+        # 每个 worker 的并发连接上限（eventlet/gevent 为协程数，gthread 为连接数）
+        'worker_connections': int(env.get('WORKER_CONNECTIONS', 10000 if async_mode != 'threading' else 1000)),
+        'backlog': int(env.get('LISTEN_BACKLOG', 2048)),
+        'keepalive': 5,
+        # 长连接不会结束，超过 graceful_timeout 后 gunicorn 强制关闭；要留出排空对局的时间
+        'graceful_timeout': drain_timeout + 10,
+        'timeout': 120,
+        'preload_app': False,  # eventlet/gevent 需要在导入应用之前打补丁
+        'raw_env': [f'SOCKETIO_ASYNC_MODE={async_mode}', f'DRAIN_TIMEOUT={drain_timeout}'],
+    }
+    if async_mode == 'threading':
+        # gthread：每个 WebSocket 连接占一个线程（simple-websocket 还会再起一个读线程）
+        settings['threads'] = int(env.get('WORKER_THREADS', 500))
+        settings['worker_connections'] = max(settings['worker_connections'], settings['threads'])
+    if settings['workers'] > 1:
+        bus_url = env.get('MESSAGE_BUS_URL') or \
+            'unix://' + os.path.join(tempfile.gettempdir(), f"blog-bus-{env.get('PORT', 5000)}.sock")
+        settings['raw_env'] += [f"SHARD_COUNT={settings['workers']}", f'MESSAGE_BUS_URL={bus_url}']
+        settings.update(on_starting=start_message_broker, pre_fork=assign_shard,
+                        post_fork=export_shard, on_exit=stop_message_broker)
+    return settings
+
+
+# 多 worker 分片：主进程启动消息代理，fork 时给每个 worker 分配固定的分片号，
+# worker 重启后接管同一分片，路由不变
+_broker = []
+
+
+def _broker_path():
+    parsed = urllib.parse.urlparse(os.environ.get('MESSAGE_BUS_URL', ''))
+    return parsed.path if parsed.scheme == 'unix' else None
+
+
+def start_message_broker(server):
+    from message_bus import broker_is_running, start_broker
+
+    path = _broker_path()
+    if path and not broker_is_running(path):
+        _broker.append(start_broker(path))
+        server.log.info('message broker listening on %s', path)
+
+
+def stop_message_broker(server):
+    while _broker:
+        process = _broker.pop()
+        process.terminate()
+        process.wait(timeout=10)
+
+
+def assign_shard(server, worker):
+    taken = {getattr(w, 'shard_id', None) for w in server.WORKERS.values()}
+    worker.shard_id = min(set(range(len(server.WORKERS) + 1)) - taken)
+
+
+def export_shard(server, worker):
+    os.environ['SHARD_ID'] = str(worker.shard_id)
+    server.log.info('worker %s serves shard %s', worker.pid, worker.shard_id)
+
+
+def install_graceful_shutdown(worker):
+    """gunicorn post_worker_init 钩子：收到 SIGTERM 时先排空对局、刷新写入，再交给 gunicorn 退出"""
+    import app as blog
+
+    drain_timeout = int(os.environ.get('DRAIN_TIMEOUT', 30))
+    original = signal.getsignal(signal.SIGTERM)
+
+    def handle_term(signum, frame):
+        signal.signal(signal.SIGTERM, original)  # 再次收到 SIGTERM 时直接退出
+        worker.log.info('draining online rooms (up to %ss)', drain_timeout)
+
+        # gevent/eventlet 的信号处理函数在事件循环回调里执行，不能阻塞，排空放到后台任务
+        def drain():
+            blog.graceful_shutdown(drain_timeout)
+            if callable(original):
+                original(signum, frame)
+
+        blog.socketio.start_background_task(drain)
+
+    signal.signal(signal.SIGTERM, handle_term)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the blog with an async Socket.IO worker')
+    parser.add_argument('--mode', choices=ASYNC_MODES, default=os.environ.get('SOCKETIO_ASYNC_MODE'))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('PORT', 5000)))
+    args = parser.parse_args()
+
+    os.environ['PORT'] = str(args.port)
+    async_mode = detect_async_mode(args.mode)
+    os.environ['SOCKETIO_ASYNC_MODE'] = async_mode
+
+    from gunicorn.app.base import BaseApplication
+
+    class Server(BaseApplication):
+        def load_config(self):
+            for key, value in gunicorn_settings(async_mode).items():
+                self.cfg.set(key, value)
+            self.cfg.set('post_worker_init', install_graceful_shutdown)
+
+        def load(self):
+            import app as blog
+            return blog.create_app()
+
+    print(f'[serve] async_mode={async_mode} port={args.port}')
+    Server().run()
+
+
+if __name__ == '__main__':
+    main()
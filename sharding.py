@@ -0,0 +1,107 @@
+"""一致性哈希分片：决定游戏类型（匹配队列）和房间由哪个 worker 进程负责"""
+import bisect
+import hashlib
+import math
+import uuid
+
+
+def _hash(key):
+    return int.from_bytes(hashlib.blake2b(str(key).encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+class HashRing:
+    """一致性哈希环，每个节点放 replicas 个虚拟节点；增删节点只会移动相邻区间的键"""
+
+    def __init__(self, nodes=(), replicas=128):
+        self.replicas = replicas
+        self._points = []  # 有序的虚拟节点哈希值
+        self._owners = []  # 与 _points 对应的节点
+        for node in nodes:
+            self.add(node)
+
+    def __len__(self):
+        return len(set(self._owners))
+
+    def add(self, node):
+        for i in range(self.replicas):
+            point = _hash(f'{node}#{i}')
+            index = bisect.bisect(self._points, point)
+            self._points.insert(index, point)
+            self._owners.insert(index, node)
+
+    def remove(self, node):
+        keep = [(p, o) for p, o in zip(self._points, self._owners) if o != node]
+        self._points = [p for p, _ in keep]
+        self._owners = [o for _, o in keep]
+
+    def node_for(self, key):
+        if not self._points:
+            raise LookupError('hash ring is empty')
+        index = bisect.bisect(self._points, _hash(key)) % len(self._points)
+        return self._owners[index]
+
+    def assign_bounded(self, keys, load_factor=1.0):
+        """有界负载的一致性哈希：键很少时（例如 12 个游戏类型）普通哈希会严重不均，
+        这里每个节点最多分到 ceil(load_factor * 平均数) 个键，超出时沿环顺时针找下一个未满的节点。
+        结果只取决于键集合和节点集合，各进程计算出的分配相同"""
+        nodes = set(self._owners)
+        if not nodes:
+            raise LookupError('hash ring is empty')
+        capacity = math.ceil(load_factor * len(keys) / len(nodes))
+        loads = dict.fromkeys(nodes, 0)
+        assignment = {}
+        for key in sorted(keys, key=_hash):
+            index = bisect.bisect(self._points, _hash(key))
+            for step in range(len(self._points)):
+                node = self._owners[(index + step) % len(self._points)]
+                if loads[node] < capacity:
+                    break
+            loads[node] += 1
+            assignment[key] = node
+        return assignment
+
+
+class ShardRouter:
+    """本进程的分片编号与路由。
+
+    游戏类型按名称、房间按 room_id 哈希到分片。新房间的 ID 在生成时就选成落在本分片上，
+    所以匹配出的房间和它的匹配队列总在同一进程，而任何 worker 只凭 room_id 就能找到房间。
+    """
+
+    def __init__(self, shard_id=0, shard_count=1, game_types=(), replicas=128):
+        if not 0 <= shard_id < shard_count:
+            raise ValueError(f'shard id {shard_id} out of range for {shard_count} shards')
+        self.shard_id = shard_id
+        self.shard_count = shard_count
+        self.ring = HashRing(range(shard_count), replicas)
+        # 已知的游戏类型按有界负载均匀分配，未知类型按普通一致性哈希
+        self._games = self.ring.assign_bounded([f'game:{g}' for g in game_types])
+
+    def shard_for_game(self, game_type):
+        if self.shard_count == 1:
+            return 0
+        key = f'game:{game_type}'
+        shard = self._games.get(key)
+        return self.ring.node_for(key) if shard is None else shard
+
+    def game_types_for(self, shard):
+        return [key[len('game:'):] for key, owner in self._games.items() if owner == shard]
+
+    def shard_for_room(self, room_id):
+        if self.shard_count == 1:
+            return 0
+        return self.ring.node_for(f'room:{room_id}')
+
+    def is_local_game(self, game_type):
+        return self.shard_for_game(game_type) == self.shard_id
+
+    def is_local_room(self, room_id):
+        return self.shard_for_room(room_id) == self.shard_id
+
+    def new_room_id(self, shard=None):
+        """生成落在指定分片（默认本分片）上的房间 ID，平均尝试 shard_count 次"""
+        shard = self.shard_id if shard is None else shard
+        while True:
+            room_id = str(uuid.uuid4())
+            if self.shard_count == 1 or self.shard_for_room(room_id) == shard:
+                return room_id
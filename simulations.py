@@ -0,0 +1,365 @@
+"""服务器端权威游戏模拟：每种 game_type 一个 Simulation 子类，由 TickEngine 固定步长驱动"""
+import math
+import random
+
+# 与前端画布一致的场地尺寸
+ARENA_WIDTH = 800
+ARENA_HEIGHT = 400
+
+
+def _clamp(value, low, high):
+    return low if value < low else high if value > high else value
+
+
+def _axis(value):
+    """把客户端输入规范为 -1 / 0 / 1"""
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return 0
+    return 1 if value > 0 else -1 if value < 0 else 0
+
+
+class Simulation:
+    """模拟基类。inputs 为 {user_id: 最新输入 dict}，dt 为固定步长（秒）"""
+
+    game_type = None
+
+    def __init__(self, player_ids, rng=None):
+        self.player_ids = list(player_ids)
+        self.rng = rng or random.Random()
+        self.tick = 0
+        self.finished = False
+        self.winner = None
+        self.events = []  # 本 tick 产生的事件（命中、得分等），随快照一起下发
+
+    @staticmethod
+    def sanitize_input(data):
+        return {}
+
+    def remove_player(self, user_id):
+        if user_id in self.player_ids:
+            self.player_ids.remove(user_id)
+
+    def step(self, inputs, dt):
+        self.tick += 1
+        self.events = []
+
+    def snapshot(self):
+        return {'tick': self.tick, 'finished': self.finished, 'winner': self.winner, 'events': self.events}
+
+
+class PongSimulation(Simulation):
+    """双人乒乓：前两名玩家分别控制左右球拍，先得 WIN_SCORE 分者获胜"""
+
+    game_type = 'pong'
+    PADDLE_HEIGHT = 80
+    PADDLE_WIDTH = 10
+    PADDLE_SPEED = 360.0
+    BALL_RADIUS = 8
+    BALL_SPEED = 300.0
+    MAX_BALL_SPEED = 700.0
+    WIN_SCORE = 5
+
+    def __init__(self, player_ids, rng=None):
+        super().__init__(player_ids, rng)
+        self.sides = {}
+        for side, user_id in zip(('left', 'right'), self.player_ids):
+            self.sides[user_id] = side
+        self.paddles = {'left': ARENA_HEIGHT / 2, 'right': ARENA_HEIGHT / 2}
+        self.scores = {'left': 0, 'right': 0}
+        self._serve(self.rng.choice((-1, 1)))
+
+    @staticmethod
+    def sanitize_input(data):
+        return {'dy': _axis((data or {}).get('dy', 0))}
+
+    def _serve(self, direction):
+        angle = self.rng.uniform(-math.pi / 6, math.pi / 6)
+        self.ball = [ARENA_WIDTH / 2, ARENA_HEIGHT / 2]
+        self.velocity = [direction * self.BALL_SPEED * math.cos(angle), self.BALL_SPEED * math.sin(angle)]
+
+    def remove_player(self, user_id):
+        super().remove_player(user_id)
+        side = self.sides.pop(user_id, None)
+        if side and not self.finished:
+            # 一方离开，另一方直接获胜
+            self.finished = True
+            self.winner = next(iter(self.sides), None)
+
+    def step(self, inputs, dt):
+        super().step(inputs, dt)
+        if self.finished:
+            return
+        half = self.PADDLE_HEIGHT / 2
+        for user_id, side in self.sides.items():
+            dy = inputs.get(user_id, {}).get('dy', 0)
+            self.paddles[side] = _clamp(self.paddles[side] + dy * self.PADDLE_SPEED * dt, half, ARENA_HEIGHT - half)
+
+        self.ball[0] += self.velocity[0] * dt
+        self.ball[1] += self.velocity[1] * dt
+        if self.ball[1] < self.BALL_RADIUS or self.ball[1] > ARENA_HEIGHT - self.BALL_RADIUS:
+            self.velocity[1] = -self.velocity[1]
+            self.ball[1] = _clamp(self.ball[1], self.BALL_RADIUS, ARENA_HEIGHT - self.BALL_RADIUS)
+
+        for side, x_edge, direction in (('left', self.PADDLE_WIDTH, 1), ('right', ARENA_WIDTH - self.PADDLE_WIDTH, -1)):
+            moving_towards = self.velocity[0] * direction < 0
+            crossed = self.ball[0] - self.BALL_RADIUS <= x_edge if direction == 1 else self.ball[0] + self.BALL_RADIUS >= x_edge
+            if moving_towards and crossed and abs(self.ball[1] - self.paddles[side]) <= half + self.BALL_RADIUS:
+                # 击中位置决定反弹角度，每次击球加速
+                offset = (self.ball[1] - self.paddles[side]) / half
+                speed = min(math.hypot(*self.velocity) * 1.05, self.MAX_BALL_SPEED)
+                angle = offset * math.pi / 4
+                self.velocity = [direction * speed * math.cos(angle), speed * math.sin(angle)]
+                self.ball[0] = x_edge + direction * self.BALL_RADIUS
+                self.events.append({'type': 'hit', 'side': side})
+
+        scorer = 'right' if self.ball[0] < 0 else 'left' if self.ball[0] > ARENA_WIDTH else None
+        if scorer:
+            self.scores[scorer] += 1
+            self.events.append({'type': 'score', 'side': scorer})
+            if self.scores[scorer] >= self.WIN_SCORE:
+                self.finished = True
+                self.winner = next((uid for uid, side in self.sides.items() if side == scorer), None)
+            else:
+                self._serve(1 if scorer == 'left' else -1)
+
+    def snapshot(self):
+        state = super().snapshot()
+        state.update({
+            'ball': [round(self.ball[0], 1), round(self.ball[1], 1)],
+            'paddles': {side: round(y, 1) for side, y in self.paddles.items()},
+            'scores': dict(self.scores),
+            'sides': dict(self.sides),
+        })
+        return state
+
+
+class TankSimulation(Simulation):
+    """俯视角坦克对战：移动、转向、开火，子弹有存活时间，最后存活者获胜"""
+
+    game_type = 'tank'
+    TANK_RADIUS = 16
+    TANK_SPEED = 120.0
+    TURN_SPEED = math.pi  # 弧度/秒
+    BULLET_SPEED = 320.0
+    BULLET_RADIUS = 3
+    BULLET_LIFETIME = 2.0
+    FIRE_COOLDOWN = 0.5
+    MAX_HP = 3
+
+    def __init__(self, player_ids, rng=None):
+        super().__init__(player_ids, rng)
+        self.tanks = {}
+        count = max(len(self.player_ids), 1)
+        for index, user_id in enumerate(self.player_ids):
+            # 出生点均匀分布在场地四周，朝向中心
+            angle = 2 * math.pi * index / count
+            x = ARENA_WIDTH / 2 - math.cos(angle) * (ARENA_WIDTH / 2 - 60)
+            y = ARENA_HEIGHT / 2 - math.sin(angle) * (ARENA_HEIGHT / 2 - 60)
+            self.tanks[user_id] = {
+                'x': x, 'y': y, 'angle': angle, 'hp': self.MAX_HP, 'cooldown': 0.0,
+            }
+        self.bullets = []  # [x, y, vx, vy, ttl, owner]
+        self.started_with = len(self.tanks)
+
+    @staticmethod
+    def sanitize_input(data):
+        data = data or {}
+        return {'move': _axis(data.get('move', 0)), 'turn': _axis(data.get('turn', 0)), 'fire': bool(data.get('fire'))}
+
+    def remove_player(self, user_id):
+        super().remove_player(user_id)
+        self.tanks.pop(user_id, None)
+
+    def alive(self):
+        return [uid for uid, tank in self.tanks.items() if tank['hp'] > 0]
+
+    def step(self, inputs, dt):
+        super().step(inputs, dt)
+        if self.finished:
+            return
+        r = self.TANK_RADIUS
+        for user_id, tank in self.tanks.items():
+            if tank['hp'] <= 0:
+                continue
+            command = inputs.get(user_id, {})
+            tank['angle'] = (tank['angle'] + command.get('turn', 0) * self.TURN_SPEED * dt) % (2 * math.pi)
+            distance = command.get('move', 0) * self.TANK_SPEED * dt
+            tank['x'] = _clamp(tank['x'] + math.cos(tank['angle']) * distance, r, ARENA_WIDTH - r)
+            tank['y'] = _clamp(tank['y'] + math.sin(tank['angle']) * distance, r, ARENA_HEIGHT - r)
+            tank['cooldown'] = max(0.0, tank['cooldown'] - dt)
+            if command.get('fire') and tank['cooldown'] == 0.0:
+                tank['cooldown'] = self.FIRE_COOLDOWN
+                cos_a, sin_a = math.cos(tank['angle']), math.sin(tank['angle'])
+                self.bullets.append([tank['x'] + cos_a * (r + 4), tank['y'] + sin_a * (r + 4),
+                                     cos_a * self.BULLET_SPEED, sin_a * self.BULLET_SPEED,
+                                     self.BULLET_LIFETIME, user_id])
+
+        hit_distance = (r + self.BULLET_RADIUS) ** 2
+        remaining = []
+        for bullet in self.bullets:
+            bullet[0] += bullet[2] * dt
+            bullet[1] += bullet[3] * dt
+            bullet[4] -= dt
+            if bullet[4] <= 0 or not (0 <= bullet[0] <= ARENA_WIDTH and 0 <= bullet[1] <= ARENA_HEIGHT):
+                continue
+            target = None
+            for user_id, tank in self.tanks.items():
+                if user_id != bullet[5] and tank['hp'] > 0 and \
+                        (tank['x'] - bullet[0]) ** 2 + (tank['y'] - bullet[1]) ** 2 <= hit_distance:
+                    target = user_id
+                    break
+            if target is None:
+                remaining.append(bullet)
+            else:
+                self.tanks[target]['hp'] -= 1
+                self.events.append({'type': 'hit', 'target': target, 'by': bullet[5]})
+        self.bullets = remaining
+
+        alive = self.alive()
+        if not alive or len(alive) == 1 and self.started_with > 1:
+            self.finished = True
+            self.winner = alive[0] if alive else None
+
+    def snapshot(self):
+        state = super().snapshot()
+        state.update({
+            'tanks': {uid: {'x': round(t['x'], 1), 'y': round(t['y'], 1), 'angle': round(t['angle'], 3), 'hp': t['hp']}
+                      for uid, t in self.tanks.items()},
+            'bullets': [[round(b[0], 1), round(b[1], 1)] for b in self.bullets],
+        })
+        return state
+
+
+class AsteroidsSimulation(Simulation):
+    """多人小行星：飞船转向、推进、开火，击碎小行星得分；场地上下左右相连。
+    被小行星撞到掉一点生命，有人先到 WIN_SCORE 分或全部飞船被摧毁时结束，分数最高者获胜"""
+
+    game_type = 'asteroids'
+    SHIP_RADIUS = 12
+    TURN_SPEED = math.pi * 1.5
+    THRUST = 200.0
+    DRAG = 0.8  # 每秒速度衰减比例
+    BULLET_SPEED = 400.0
+    BULLET_RADIUS = 2
+    BULLET_LIFETIME = 1.0
+    FIRE_COOLDOWN = 0.25
+    ASTEROID_COUNT = 8
+    ASTEROID_RADII = (12, 20, 30)
+    ASTEROID_SPEED = (30.0, 90.0)
+    MAX_HP = 3
+    WIN_SCORE = 20
+
+    def __init__(self, player_ids, rng=None):
+        super().__init__(player_ids, rng)
+        self.ships = {}
+        count = max(len(self.player_ids), 1)
+        for index, user_id in enumerate(self.player_ids):
+            # 飞船从中心附近出发，朝外
+            angle = 2 * math.pi * index / count
+            self.ships[user_id] = {
+                'x': ARENA_WIDTH / 2 + math.cos(angle) * 100, 'y': ARENA_HEIGHT / 2 + math.sin(angle) * 100,
+                'vx': 0.0, 'vy': 0.0, 'angle': angle, 'hp': self.MAX_HP, 'cooldown': 0.0, 'score': 0,
+            }
+        self.asteroids = [self._spawn_asteroid() for _ in range(self.ASTEROID_COUNT)]  # [x, y, vx, vy, radius]
+        self.bullets = []  # [x, y, vx, vy, ttl, owner]
+
+    @staticmethod
+    def sanitize_input(data):
+        data = data or {}
+        return {'thrust': bool(data.get('thrust')), 'turn': _axis(data.get('turn', 0)), 'fire': bool(data.get('fire'))}
+
+    def _spawn_asteroid(self):
+        """在场地边缘生成一颗小行星，方向和速度随机"""
+        rng = self.rng
+        if rng.random() < 0.5:
+            x, y = rng.choice((0.0, float(ARENA_WIDTH))), rng.uniform(0, ARENA_HEIGHT)
+        else:
+            x, y = rng.uniform(0, ARENA_WIDTH), rng.choice((0.0, float(ARENA_HEIGHT)))
+        angle = rng.uniform(0, 2 * math.pi)
+        speed = rng.uniform(*self.ASTEROID_SPEED)
+        return [x, y, math.cos(angle) * speed, math.sin(angle) * speed, rng.choice(self.ASTEROID_RADII)]
+
+    def remove_player(self, user_id):
+        super().remove_player(user_id)
+        self.ships.pop(user_id, None)
+
+    def step(self, inputs, dt):
+        super().step(inputs, dt)
+        if self.finished:
+            return
+        damping = max(0.0, 1 - self.DRAG * dt)
+        for user_id, ship in self.ships.items():
+            if ship['hp'] <= 0:
+                continue
+            command = inputs.get(user_id, {})
+            ship['angle'] = (ship['angle'] + command.get('turn', 0) * self.TURN_SPEED * dt) % (2 * math.pi)
+            cos_a, sin_a = math.cos(ship['angle']), math.sin(ship['angle'])
+            if command.get('thrust'):
+                ship['vx'] += cos_a * self.THRUST * dt
+                ship['vy'] += sin_a * self.THRUST * dt
+            ship['vx'] *= damping
+            ship['vy'] *= damping
+            ship['x'] = (ship['x'] + ship['vx'] * dt) % ARENA_WIDTH
+            ship['y'] = (ship['y'] + ship['vy'] * dt) % ARENA_HEIGHT
+            ship['cooldown'] = max(0.0, ship['cooldown'] - dt)
+            if command.get('fire') and ship['cooldown'] == 0.0:
+                ship['cooldown'] = self.FIRE_COOLDOWN
+                self.bullets.append([ship['x'], ship['y'], cos_a * self.BULLET_SPEED, sin_a * self.BULLET_SPEED,
+                                     self.BULLET_LIFETIME, user_id])
+
+        for asteroid in self.asteroids:
+            asteroid[0] = (asteroid[0] + asteroid[2] * dt) % ARENA_WIDTH
+            asteroid[1] = (asteroid[1] + asteroid[3] * dt) % ARENA_HEIGHT
+
+        remaining = []
+        for bullet in self.bullets:
+            bullet[0] = (bullet[0] + bullet[2] * dt) % ARENA_WIDTH
+            bullet[1] = (bullet[1] + bullet[3] * dt) % ARENA_HEIGHT
+            bullet[4] -= dt
+            if bullet[4] <= 0:
+                continue
+            target = self._first_asteroid_hit(bullet[0], bullet[1], self.BULLET_RADIUS)
+            if target is None:
+                remaining.append(bullet)
+                continue
+            self.asteroids[target] = self._spawn_asteroid()
+            if bullet[5] in self.ships:
+                self.ships[bullet[5]]['score'] += 1
+            self.events.append({'type': 'destroy', 'by': bullet[5]})
+        self.bullets = remaining
+
+        for user_id, ship in self.ships.items():
+            if ship['hp'] <= 0:
+                continue
+            target = self._first_asteroid_hit(ship['x'], ship['y'], self.SHIP_RADIUS)
+            if target is not None:
+                self.asteroids[target] = self._spawn_asteroid()
+                ship['hp'] -= 1
+                self.events.append({'type': 'crash', 'target': user_id})
+
+        if not any(ship['hp'] > 0 for ship in self.ships.values()) or \
+                any(ship['score'] >= self.WIN_SCORE for ship in self.ships.values()):
+            self.finished = True
+            self.winner = max(self.ships, key=lambda uid: self.ships[uid]['score'], default=None)
+
+    def _first_asteroid_hit(self, x, y, radius):
+        for index, asteroid in enumerate(self.asteroids):
+            if (asteroid[0] - x) ** 2 + (asteroid[1] - y) ** 2 <= (asteroid[4] + radius) ** 2:
+                return index
+        return None
+
+    def snapshot(self):
+        state = super().snapshot()
+        state.update({
+            'ships': {uid: {'x': round(s['x'], 1), 'y': round(s['y'], 1), 'angle': round(s['angle'], 3),
+                            'hp': s['hp'], 'score': s['score']}
+                      for uid, s in self.ships.items()},
+            'asteroids': [[round(a[0], 1), round(a[1], 1), a[4]] for a in self.asteroids],
+            'bullets': [[round(b[0], 1), round(b[1], 1)] for b in self.bullets],
+        })
+        return state
+
+
+SIMULATIONS = {cls.game_type: cls for cls in (TankSimulation, PongSimulation, AsteroidsSimulation)}
@@ -0,0 +1,152 @@
+"""状态快照的二进制编码：MessagePack 帧 + 按客户端确认的基准做增量（delta）压缩
+
+帧格式：1 字节类型（0 = 关键帧，1 = 增量帧）+ MessagePack 负载
+  关键帧负载：{'t': tick, 's': 完整状态}
+  增量帧负载：{'t': tick, 'b': 基准 tick, 'd': 差异}
+差异规则：dict 逐键递归比较，只发送变化的键；被删除的键放在 '~' 列表里；
+其他类型（列表、数字、字符串）不相等时整体替换。
+"""
+from collections import OrderedDict
+
+import msgpack
+
+KEYFRAME = 0
+DELTA = 1
+REMOVED_KEY = '~'
+
+
+def pack(obj):
+    # 快照中的坐标已四舍五入，单精度浮点足够，省一半字节
+    return msgpack.packb(obj, use_bin_type=True, use_single_float=True)
+
+
+def unpack(data):
+    return msgpack.unpackb(data, raw=False, strict_map_key=False)
+
+
+# ---- 增量计算 ----
+
+def diff(old, new):
+    """计算 new 相对 old 的差异；没有差异返回 None"""
+    if isinstance(old, dict) and isinstance(new, dict):
+        changes = {}
+        for key, value in new.items():
+            if key not in old:
+                changes[key] = _Replace(value)
+            else:
+                sub = diff(old[key], value)
+                if sub is not None:
+                    changes[key] = sub
+        removed = [key for key in old if key not in new]
+        if removed:
+            changes[REMOVED_KEY] = removed
+        return changes or None
+    if old == new and type(old) is type(new):
+        return None
+    # 类型变化（例如 dict -> 标量）或值变化：整体替换
+    return _Replace(new)
+
+
+class _Replace:
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+
+def _materialize(changes):
+    """把 diff 结果转成可序列化结构：替换值直接给出，dict 差异递归处理"""
+    if isinstance(changes, _Replace):
+        return changes.value
+    return {key: (value if key == REMOVED_KEY else _materialize(value)) for key, value in changes.items()}
+
+
+def delta(old, new):
+    """new 相对 old 的可序列化差异；没有差异时为空 dict"""
+    changes = diff(old, new)
+    return _materialize(changes) if changes is not None else {}
+
+
+def apply_diff(old, changes):
+    """客户端侧逻辑的 Python 版本（用于测试/回放）：把差异应用到旧状态上"""
+    if not isinstance(changes, dict) or not isinstance(old, dict):
+        return changes
+    result = dict(old)
+    for key in changes.get(REMOVED_KEY, ()):
+        result.pop(key, None)
+    for key, value in changes.items():
+        if key == REMOVED_KEY:
+            continue
+        if isinstance(value, dict) and isinstance(result.get(key), dict):
+            result[key] = apply_diff(result[key], value)
+        else:
+            result[key] = value
+    return result
+
+
+def encode_keyframe(tick, state):
+    return bytes([KEYFRAME]) + pack({'t': tick, 's': state})
+
+
+def encode_delta(tick, base_tick, changes):
+    return bytes([DELTA]) + pack({'t': tick, 'b': base_tick, 'd': changes})
+
+
+def decode_frame(frame, history):
+    """解码一帧；history 为 {tick: state}，返回 (tick, state)"""
+    payload = unpack(frame[1:])
+    if frame[0] == KEYFRAME:
+        return payload['t'], payload['s']
+    return payload['t'], apply_diff(history[payload['b']], payload['d'])
+
+
+class SnapshotStream:
+    """单个房间的快照流：保存最近 history 个 tick 的状态和每个客户端确认到的 tick。
+
+    对确认过的客户端发送相对其确认基准的增量帧；基准已过期或从未确认的发关键帧。
+    同一 tick 内基准相同的客户端共用一次编码结果。
+    """
+
+    def __init__(self, history=32):
+        self.history_size = history
+        self.history = OrderedDict()  # tick -> state
+        self.acks = {}  # client_id -> 已确认 tick
+        self.bytes_sent = 0
+        self.keyframes = 0
+        self.deltas = 0
+
+    def ack(self, client_id, tick):
+        if tick in self.history and tick > self.acks.get(client_id, -1):
+            self.acks[client_id] = tick
+
+    def forget(self, client_id):
+        self.acks.pop(client_id, None)
+
+    def encode(self, tick, state, clients):
+        """返回 {client_id: 二进制帧}"""
+        self.history[tick] = state
+        while len(self.history) > self.history_size:
+            self.history.popitem(last=False)
+
+        frames = {}
+        by_base = {}
+        for client_id in clients:
+            base = self.acks.get(client_id)
+            if base not in self.history or base == tick:
+                base = None
+            frame = by_base.get(base)
+            if frame is None:
+                if base is None:
+                    frame = encode_keyframe(tick, state)
+                    self.keyframes += 1
+                else:
+                    frame = encode_delta(tick, base, delta(self.history[base], state))
+                    self.deltas += 1
+                by_base[base] = frame
+            frames[client_id] = frame
+            self.bytes_sent += len(frame)
+        return frames
+
+    def stats(self):
+        return {'bytes_sent': self.bytes_sent, 'keyframes': self.keyframes, 'deltas': self.deltas,
+                'clients': len(self.acks)}
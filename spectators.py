@@ -0,0 +1,127 @@
+"""观战：不占座位的观众按较低的频率收到进行中对局的状态快照
+
+tick 循环每个 tick 只调用 offer() 替换房间的最新快照（有观众的房间才保存，O(1)），
+由定时任务每 1/rate 秒调用 flush()：每个有观众的房间编码一帧，
+向 Socket.IO 房间 spectate:<room_id> 广播一次（整帧只编码、序列化一次，与观众人数无关），
+两次 flush 之间的 tick 合并为最新一帧。观众数再多，扇出也不在 tick 循环里进行。
+
+帧格式与玩家的 state 帧相同（snapshots.encode_keyframe / encode_delta）。观众不确认 tick，
+增量帧都相对房间最近的关键帧（每 keyframe_every 帧一个），因此任何一帧被流量控制丢弃都不影响后续帧；
+新观众加入时先单独收到当前关键帧。
+"""
+import threading
+
+from snapshots import delta, encode_delta, encode_keyframe
+
+SPECTATE_ROOM_PREFIX = 'spectate:'
+
+
+def spectate_room(room_id):
+    return SPECTATE_ROOM_PREFIX + room_id
+
+
+class _Feed:
+    __slots__ = ('spectators', 'latest', 'sent_tick', 'keyframe', 'keyframe_tick', 'keyframe_state', 'frames')
+
+    def __init__(self):
+        self.spectators = set()  # sid
+        self.latest = None  # 最近一个 tick 的快照
+        self.sent_tick = None
+        self.keyframe = None  # 编码后的关键帧
+        self.keyframe_tick = None
+        self.keyframe_state = None
+        self.frames = 0  # 距上一个关键帧的帧数
+
+
+class SpectatorFeed:
+    def __init__(self, emit, rate=5, keyframe_every=10, max_spectators=500):
+        self.emit = emit  # emit(event, payload, to)
+        self.rate = rate  # 每秒发给观众的帧数
+        self.keyframe_every = keyframe_every
+        self.max_spectators = max_spectators  # 每个房间的观众上限
+        self._feeds = {}  # room_id -> _Feed
+        self._lock = threading.Lock()
+        self.offered = 0
+        self.frames_sent = 0
+        self.keyframes = 0
+        self.bytes_sent = 0  # 每帧只计一次（广播前的帧大小）
+
+    @property
+    def interval(self):
+        return 1.0 / self.rate
+
+    def add(self, room_id, sid):
+        """登记观众；房间观众已满时返回 False。返回 True 后应由调用方把 sid 加入 spectate_room"""
+        with self._lock:
+            feed = self._feeds.get(room_id)
+            if feed is None:
+                feed = self._feeds[room_id] = _Feed()
+            elif sid not in feed.spectators and len(feed.spectators) >= self.max_spectators:
+                return False
+            feed.spectators.add(sid)
+            keyframe = feed.keyframe
+        if keyframe is not None:
+            self.emit('spectate_state', keyframe, sid)
+        return True
+
+    def remove(self, room_id, sid):
+        with self._lock:
+            feed = self._feeds.get(room_id)
+            if feed is None:
+                return
+            feed.spectators.discard(sid)
+            if not feed.spectators:
+                del self._feeds[room_id]
+
+    def count(self, room_id):
+        feed = self._feeds.get(room_id)
+        return len(feed.spectators) if feed is not None else 0
+
+    def offer(self, room_id, snapshot):
+        """tick 引擎每个 tick 调用；没有观众的房间直接返回"""
+        feed = self._feeds.get(room_id)
+        if feed is not None:
+            feed.latest = snapshot
+            self.offered += 1
+
+    def end(self, room_id, payload):
+        """对局结束或房间关闭：通知观众并清除该房间；返回原有观众的 sid 列表"""
+        with self._lock:
+            feed = self._feeds.pop(room_id, None)
+        if feed is None:
+            return []
+        self.emit('spectate_end', payload, spectate_room(room_id))
+        return list(feed.spectators)
+
+    def flush(self):
+        """周期任务：每个有观众且有新快照的房间广播一帧"""
+        with self._lock:
+            feeds = [(room_id, feed) for room_id, feed in self._feeds.items()
+                     if feed.latest is not None and feed.latest['tick'] != feed.sent_tick]
+        for room_id, feed in feeds:
+            snapshot = feed.latest
+            tick = snapshot['tick']
+            if feed.keyframe is None or feed.frames >= self.keyframe_every:
+                frame = feed.keyframe = encode_keyframe(tick, snapshot)
+                feed.keyframe_tick, feed.keyframe_state, feed.frames = tick, snapshot, 0
+                self.keyframes += 1
+            else:
+                frame = encode_delta(tick, feed.keyframe_tick, delta(feed.keyframe_state, snapshot))
+            feed.frames += 1
+            feed.sent_tick = tick
+            self.emit('spectate_state', frame, spectate_room(room_id))
+            self.frames_sent += 1
+            self.bytes_sent += len(frame)
+
+    def stats(self):
+        counts = [len(feed.spectators) for feed in list(self._feeds.values())]
+        return {
+            'rate': self.rate,
+            'rooms': len(counts),
+            'spectators': sum(counts),
+            'max_per_room': max(counts, default=0),
+            'ticks_offered': self.offered,
+            'frames_sent': self.frames_sent,
+            'keyframes': self.keyframes,
+            'bytes_sent': self.bytes_sent,
+        }
@@ -0,0 +1,28 @@
+// 单人游戏成绩上榜：游戏结束时提交成绩，提示各榜单名次（游客不上榜，静默忽略）
+const LEADERBOARD_PERIODS = { daily: '今日', weekly: '本周', all: '总榜' };
+
+// extra 为需要随成绩一起校验的字段（如数独的题目和答案）
+function submitScore(gameType, score, extra) {
+    return fetch('/api/scores/' + gameType, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify(Object.assign({ score: score }, extra))
+    }).then(response => response.json()).then(data => {
+        if (!data.success) return null;
+        const parts = Object.keys(LEADERBOARD_PERIODS)
+            .filter(period => data.periods[period] && data.periods[period].rank)
+            .map(period => LEADERBOARD_PERIODS[period] + '第 ' + data.periods[period].rank + ' 名');
+        if (parts.length) showLeaderboardToast(parts.join(' · '));
+        return data;
+    }).catch(() => null);
+}
+
+function showLeaderboardToast(text) {
+    const toast = document.createElement('div');
+    toast.textContent = '🏆 ' + text;
+    toast.style.cssText = 'position:fixed;bottom:2rem;left:50%;transform:translateX(-50%);padding:0.75rem 1.5rem;' +
+        'border-radius:12px;background:var(--bg-glass,rgba(0,0,0,0.7));color:var(--text-primary,#fff);' +
+        'border:1px solid var(--border,rgba(255,255,255,0.1));backdrop-filter:blur(10px);z-index:1000;';
+    document.body.appendChild(toast);
+    setTimeout(() => toast.remove(), 4000);
+}
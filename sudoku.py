@@ -0,0 +1,318 @@
+"""数独题库：位掩码求解 / 唯一解检查 / 难度评级 / 生成，以及服务器使用的内存题库
+
+盘面是 81 个字符的字符串，'0' 表示空格。求解用行 / 列 / 宫各 9 个位掩码记录已用数字，
+每步选候选数最少的空格（MRV）回溯；count_solutions(limit=2) 找到第二个解即停止，用于检查唯一解。
+评级按人工解题的难度：只用唯一候选数（naked single）即可解出为 easy，还需要排除法（hidden single）为 medium，
+两者都不够、必须试探时按回溯中的分支次数分为 hard / expert。
+生成：随机填满一个终盘，按随机顺序挖空，每挖一格检查仍有唯一解，挖到该难度的最少提示数为止，再评级。
+
+题库离线生成（flask --app app build-sudoku-bank 或 python sudoku.py --bank <目录>），按难度追加到
+<目录>/<difficulty>.txt（每行一题），生成好的 sudoku_bank/ 随代码提交，启动时不生成；
+服务器的 PuzzleBank 定期读入新增的行，取题为 O(1)。
+"""
+import argparse
+import os
+import random
+import threading
+import time
+
+DIFFICULTIES = ('easy', 'medium', 'hard', 'expert')
+# 生成时挖空到的最少提示数（挖不动时提前停止）
+MIN_CLUES = {'easy': 36, 'medium': 30, 'hard': 17, 'expert': 17}
+EXPERT_MIN_GUESSES = 4  # 回溯中的分支次数达到此数为 expert
+
+ALL = 0x1FF
+ROW = [i // 9 for i in range(81)]
+COL = [i % 9 for i in range(81)]
+BOX = [(i // 27) * 3 + (i % 9) // 3 for i in range(81)]
+UNITS = ([[r * 9 + c for c in range(9)] for r in range(9)] +
+         [[r * 9 + c for r in range(9)] for c in range(9)] +
+         [[i for i in range(81) if BOX[i] == b] for b in range(9)])
+POPCOUNT = [bin(m).count('1') for m in range(512)]
+DIGITS = [[d + 1 for d in range(9) if m >> d & 1] for m in range(512)]
+
+
+def _parse(puzzle):
+    if not isinstance(puzzle, str) or len(puzzle) != 81 or not puzzle.isdigit():
+        raise ValueError('puzzle must be 81 digits, 0 for empty cells')
+    return [ord(ch) - 48 for ch in puzzle]
+
+
+def _masks(grid):
+    """已填数字的行 / 列 / 宫位掩码；有冲突时返回 None"""
+    rows, cols, boxes = [0] * 9, [0] * 9, [0] * 9
+    for i, d in enumerate(grid):
+        if d:
+            bit = 1 << (d - 1)
+            r, c, b = ROW[i], COL[i], BOX[i]
+            if (rows[r] | cols[c] | boxes[b]) & bit:
+                return None
+            rows[r] |= bit
+            cols[c] |= bit
+            boxes[b] |= bit
+    return rows, cols, boxes
+
+
+def _search(grid, rows, cols, boxes, empties, limit, solutions, stats):
+    best = -1
+    best_mask = 0
+    best_count = 10
+    for k, i in enumerate(empties):
+        mask = ALL & ~(rows[ROW[i]] | cols[COL[i]] | boxes[BOX[i]])
+        count = POPCOUNT[mask]
+        if count < best_count:
+            best, best_mask, best_count = k, mask, count
+            if count <= 1:
+                break
+    if best < 0:
+        solutions.append(''.join(map(str, grid)))
+        return
+    if best_count == 0:
+        return
+    if best_count > 1:
+        stats['guesses'] += 1
+    i = empties[best]
+    empties[best] = empties[-1]
+    empties.pop()
+    r, c, b = ROW[i], COL[i], BOX[i]
+    for d in DIGITS[best_mask]:
+        bit = 1 << (d - 1)
+        grid[i] = d
+        rows[r] |= bit
+        cols[c] |= bit
+        boxes[b] |= bit
+        _search(grid, rows, cols, boxes, empties, limit, solutions, stats)
+        rows[r] ^= bit
+        cols[c] ^= bit
+        boxes[b] ^= bit
+        if len(solutions) >= limit:
+            break
+    grid[i] = 0
+    empties.append(i)
+    empties[best], empties[-1] = empties[-1], empties[best]
+
+
+def count_solutions(puzzle, limit=2, stats=None):
+    """返回 (解的个数（最多 limit）, 第一个解或 None)"""
+    grid = _parse(puzzle)
+    masks = _masks(grid)
+    if masks is None:
+        return 0, None
+    solutions = []
+    stats = {'guesses': 0} if stats is None else stats
+    _search(grid, *masks, [i for i in range(81) if not grid[i]], limit, solutions, stats)
+    return len(solutions), (solutions[0] if solutions else None)
+
+
+def solve(puzzle):
+    """唯一解；无解或多解时返回 None"""
+    count, solution = count_solutions(puzzle, 2)
+    return solution if count == 1 else None
+
+
+def is_solution(puzzle, solution):
+    """solution 是否填满、无冲突且保留了 puzzle 的全部提示数"""
+    try:
+        grid = _parse(solution)
+    except ValueError:
+        return False
+    return (0 not in grid and _masks(grid) is not None
+            and all(p == '0' or p == s for p, s in zip(puzzle, solution)))
+
+
+def _apply_singles(grid):
+    """反复填入唯一候选数和排除法确定的格子，返回 (是否填满, 用到的 hidden single 数)；盘面矛盾时返回 (False, None)"""
+    masks = _masks(grid)
+    if masks is None:
+        return False, None
+    rows, cols, boxes = masks
+    hidden = 0
+    while True:
+        candidates = {}
+        for i in range(81):
+            if not grid[i]:
+                candidates[i] = ALL & ~(rows[ROW[i]] | cols[COL[i]] | boxes[BOX[i]])
+        if not candidates:
+            return True, hidden
+        placed = {i: mask for i, mask in candidates.items() if POPCOUNT[mask] == 1}
+        if any(mask == 0 for mask in candidates.values()):
+            return False, None
+        if not placed:
+            for unit in UNITS:
+                for d in range(9):
+                    bit = 1 << d
+                    cells = [i for i in unit if candidates.get(i, 0) & bit]
+                    if len(cells) == 1 and cells[0] not in placed:
+                        placed[cells[0]] = bit
+                        hidden += 1
+                if placed:
+                    break
+            if not placed:
+                return False, hidden
+        for i, bit in placed.items():
+            r, c, b = ROW[i], COL[i], BOX[i]
+            if (rows[r] | cols[c] | boxes[b]) & bit:
+                return False, None
+            grid[i] = bit.bit_length()
+            rows[r] |= bit
+            cols[c] |= bit
+            boxes[b] |= bit
+
+
+def grade(puzzle):
+    """评级：easy / medium / hard / expert（假定 puzzle 有唯一解）"""
+    grid = _parse(puzzle)
+    solved, hidden = _apply_singles(grid)
+    if solved:
+        return 'easy' if hidden == 0 else 'medium'
+    stats = {'guesses': 0}
+    count_solutions(''.join(map(str, grid)), 2, stats)
+    return 'hard' if stats['guesses'] < EXPERT_MIN_GUESSES else 'expert'
+
+
+def random_solution(rng=random):
+    """随机终盘"""
+    grid = [0] * 81
+    rows, cols, boxes = [0] * 9, [0] * 9, [0] * 9
+    order = list(range(1, 10))
+
+    def fill(i):
+        if i == 81:
+            return True
+        r, c, b = ROW[i], COL[i], BOX[i]
+        rng.shuffle(order)
+        for d in list(order):
+            bit = 1 << (d - 1)
+            if (rows[r] | cols[c] | boxes[b]) & bit:
+                continue
+            grid[i] = d
+            rows[r] |= bit
+            cols[c] |= bit
+            boxes[b] |= bit
+            if fill(i + 1):
+                return True
+            rows[r] ^= bit
+            cols[c] ^= bit
+            boxes[b] ^= bit
+        grid[i] = 0
+        return False
+
+    fill(0)
+    return ''.join(map(str, grid))
+
+
+def generate(difficulty, rng=random):
+    """生成一题，返回 (题目, 答案, 实际难度)；实际难度可能与目标不同"""
+    solution = random_solution(rng)
+    puzzle = list(solution)
+    clues = 81
+    cells = list(range(81))
+    rng.shuffle(cells)
+    for i in cells:
+        if clues <= MIN_CLUES[difficulty]:
+            break
+        digit, puzzle[i] = puzzle[i], '0'
+        if count_solutions(''.join(puzzle), 2)[0] == 1:
+            clues -= 1
+        else:
+            puzzle[i] = digit
+    puzzle = ''.join(puzzle)
+    return puzzle, solution, grade(puzzle)
+
+
+def bank_path(directory, difficulty):
+    return os.path.join(directory, f'{difficulty}.txt')
+
+
+def fill_bank(directory, target, rng=random, max_attempts=None):
+    """生成到每个难度都有 target 题为止（追加写入，每题一行）；返回新生成的题数"""
+    os.makedirs(directory, exist_ok=True)
+    counts = {}
+    for difficulty in DIFFICULTIES:
+        try:
+            with open(bank_path(directory, difficulty), 'r', encoding='ascii') as f:
+                counts[difficulty] = sum(1 for _ in f)
+        except FileNotFoundError:
+            counts[difficulty] = 0
+    added = 0
+    attempts = 0
+    while max_attempts is None or attempts < max_attempts:
+        wanted = [d for d in DIFFICULTIES if counts[d] < target]
+        if not wanted:
+            break
+        attempts += 1
+        puzzle, _, actual = generate(rng.choice(wanted), rng)
+        if counts[actual] >= target:
+            continue
+        with open(bank_path(directory, actual), 'a', encoding='ascii') as f:
+            f.write(puzzle + '\n')
+        counts[actual] += 1
+        added += 1
+    return added
+
+
+class PuzzleBank:
+    """服务器内存中的题库：难度 -> 题目列表，取题 O(1)。refresh() 读入题库文件新追加的行"""
+
+    def __init__(self, directory, target=500):
+        self.directory = directory
+        self.target = target
+        self._puzzles = {difficulty: [] for difficulty in DIFFICULTIES}
+        self._offsets = {difficulty: 0 for difficulty in DIFFICULTIES}
+        self._known = set()  # 全部题目，用于校验提交的成绩确实来自题库
+        self._lock = threading.Lock()
+        self.served = 0
+        self.misses = 0
+
+    def refresh(self):
+        """周期任务：读入各难度文件新增的完整行"""
+        for difficulty in DIFFICULTIES:
+            try:
+                with open(bank_path(self.directory, difficulty), 'rb') as f:
+                    f.seek(self._offsets[difficulty])
+                    data = f.read()
+            except FileNotFoundError:
+                continue
+            end = data.rfind(b'\n') + 1  # 生成命令写到一半的行留到下次
+            lines = [line.decode('ascii') for line in data[:end].split(b'\n')]
+            puzzles = [line for line in lines if len(line) == 81 and line.isdigit()]
+            with self._lock:
+                self._puzzles[difficulty].extend(puzzles)
+                self._known.update(puzzles)
+                self._offsets[difficulty] += end
+
+    def __contains__(self, puzzle):
+        return puzzle in self._known
+
+    def take(self, difficulty, rng=random):
+        """随机取一题；该难度还没有题目时返回 None"""
+        with self._lock:
+            puzzles = self._puzzles.get(difficulty)
+            if not puzzles:
+                self.misses += 1
+                return None
+            self.served += 1
+            return puzzles[rng.randrange(len(puzzles))]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'puzzles': {difficulty: len(puzzles) for difficulty, puzzles in self._puzzles.items()},
+                'target': self.target,
+                'served': self.served,
+                'misses': self.misses,
+            }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='生成数独题库')
+    parser.add_argument('--bank', required=True, help='题库目录')
+    parser.add_argument('--target', type=int, default=500, help='每个难度的题数')
+    args = parser.parse_args()
+    start = time.time()
+    added = fill_bank(args.bank, args.target, random.SystemRandom())
+    print(f'sudoku bank: generated {added} puzzles in {time.time() - start:.1f}s')
+
+
+if __name__ == '__main__':
+    main()
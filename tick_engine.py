@@ -0,0 +1,197 @@
+"""固定步长的服务器 tick 引擎：收集玩家输入、推进模拟、广播状态快照"""
+import bisect
+import threading
+import time
+
+from simulations import SIMULATIONS
+from vector_physics import create_batches
+
+# tick 耗时直方图的桶上界（毫秒），最后一个桶收集更慢的 tick
+TICK_BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 50, 100)
+
+
+class TickHistogram:
+    def __init__(self, buckets=TICK_BUCKETS_MS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, ms):
+        self.counts[bisect.bisect_left(self.buckets, ms)] += 1
+        self.total += 1
+        self.sum_ms += ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+
+    def to_dict(self):
+        labels = [f'<={b}ms' for b in self.buckets] + [f'>{self.buckets[-1]}ms']
+        return {
+            'count': self.total,
+            'avg_ms': self.sum_ms / self.total if self.total else 0.0,
+            'max_ms': self.max_ms,
+            'buckets': dict(zip(labels, self.counts)),
+        }
+
+
+class RoomSimulation:
+    __slots__ = ('room_id', 'game_type', 'simulation', 'inputs', 'started_at', 'batched')
+
+    def __init__(self, room_id, game_type, simulation, batched=False):
+        self.room_id = room_id
+        self.game_type = game_type
+        self.simulation = simulation
+        self.inputs = {}  # user_id -> 最新输入；同一 tick 内多次输入只保留最后一次
+        self.started_at = time.time()
+        self.batched = batched  # simulation 是 vector_physics.BatchedRoom，由批量统一推进
+
+
+class TickEngine:
+    """所有 playing 房间共用一个后台循环，每 1/tick_rate 秒推进一次。
+
+    broadcast(room_id, snapshot) 发送快照；on_finish(room_id, simulation) 在对局结束时调用；
+    on_tick_end() 在每个 tick 的全部房间推进完之后调用。
+    vectorized=True 时，tank/asteroids 房间放进共享数组，每个 tick 一次推进同类型全部房间。
+    """
+
+    def __init__(self, broadcast, on_finish=None, tick_rate=20, start_background_task=None, sleep=None,
+                 clock=time.perf_counter, vectorized=True, max_players=4, on_tick_end=None):
+        self.broadcast = broadcast
+        self.on_finish = on_finish
+        self.on_tick_end = on_tick_end
+        self.tick_rate = tick_rate
+        self.dt = 1.0 / tick_rate
+        self._start_background_task = start_background_task
+        self._sleep = sleep or time.sleep
+        self.clock = clock
+        self.rooms = {}
+        self._lock = threading.Lock()
+        self._running = False
+        self.ticks = 0
+        self.overruns = 0  # 单次 tick 耗时超过步长的次数
+        self.histogram = TickHistogram()  # 整个 tick（全部房间）的耗时
+        self.room_histograms = {}  # game_type -> 单个房间单步耗时；批量类型为整批一次推进的耗时
+        self.batches = create_batches(max_players) if vectorized else {}  # game_type -> RoomBatch
+
+    def supports(self, game_type):
+        return game_type in SIMULATIONS
+
+    def start_room(self, room_id, game_type, player_ids):
+        """房间开始游戏时调用；不支持服务器模拟的游戏类型返回 None"""
+        cls = SIMULATIONS.get(game_type)
+        if cls is None:
+            return None
+        batch = self.batches.get(game_type)
+        with self._lock:
+            if batch is not None:
+                room_sim = RoomSimulation(room_id, game_type, batch.add_room(room_id, player_ids), batched=True)
+            else:
+                room_sim = RoomSimulation(room_id, game_type, cls(player_ids))
+            self.rooms[room_id] = room_sim
+        self.start()
+        return room_sim
+
+    def stop_room(self, room_id):
+        with self._lock:
+            room_sim = self.rooms.pop(room_id, None)
+            if room_sim is not None and room_sim.batched:
+                self.batches[room_sim.game_type].remove_room(room_id)
+            return room_sim
+
+    def remove_player(self, room_id, user_id):
+        room_sim = self.rooms.get(room_id)
+        if room_sim is not None:
+            room_sim.simulation.remove_player(user_id)
+            room_sim.inputs.pop(user_id, None)
+
+    def submit_input(self, room_id, user_id, data):
+        """记录玩家输入，返回是否被接受"""
+        room_sim = self.rooms.get(room_id)
+        if room_sim is None or user_id not in room_sim.simulation.player_ids:
+            return False
+        command = room_sim.inputs[user_id] = room_sim.simulation.sanitize_input(data)
+        if room_sim.batched:
+            room_sim.simulation.set_input(user_id, command)
+        return True
+
+    def _histogram_for(self, game_type):
+        histogram = self.room_histograms.get(game_type)
+        if histogram is None:
+            histogram = self.room_histograms[game_type] = TickHistogram()
+        return histogram
+
+    def step_all(self):
+        """推进所有房间一个 tick"""
+        tick_start = self.clock()
+        with self._lock:
+            room_sims = list(self.rooms.values())
+            for game_type, batch in self.batches.items():
+                if len(batch):
+                    start = self.clock()
+                    batch.step(self.dt)
+                    self._histogram_for(game_type).observe((self.clock() - start) * 1000)
+        finished = []
+        for room_sim in room_sims:
+            simulation = room_sim.simulation
+            if not room_sim.batched:
+                start = self.clock()
+                simulation.step(room_sim.inputs, self.dt)
+                self._histogram_for(room_sim.game_type).observe((self.clock() - start) * 1000)
+            self.broadcast(room_sim.room_id, simulation.snapshot())
+            if simulation.finished:
+                finished.append(room_sim)
+        for room_sim in finished:
+            self.stop_room(room_sim.room_id)
+            if self.on_finish is not None:
+                self.on_finish(room_sim.room_id, room_sim.simulation)
+        elapsed = self.clock() - tick_start
+        if self.on_tick_end is not None:
+            self.on_tick_end()
+        self.histogram.observe(elapsed * 1000)
+        self.ticks += 1
+        if elapsed > self.dt:
+            self.overruns += 1
+        return elapsed
+
+    def _loop(self):
+        next_tick = self.clock()
+        while self._running:
+            if not self.rooms:
+                # 没有进行中的对局时退出循环，下次开局再启动
+                with self._lock:
+                    if not self.rooms:
+                        self._running = False
+                        return
+            self.step_all()
+            next_tick += self.dt
+            delay = next_tick - self.clock()
+            if delay < 0:
+                # 落后时不追帧，从当前时间重新对齐
+                next_tick = self.clock()
+                delay = 0
+            self._sleep(delay)
+
+    def start(self):
+        with self._lock:
+            if self._running:
+                return
+            self._running = True
+        if self._start_background_task is not None:
+            self._start_background_task(self._loop)
+        else:
+            threading.Thread(target=self._loop, daemon=True).start()
+
+    def stop(self):
+        self._running = False
+
+    def stats(self):
+        return {
+            'tick_rate': self.tick_rate,
+            'rooms': len(self.rooms),
+            'ticks': self.ticks,
+            'overruns': self.overruns,
+            'batched': {game_type: len(batch) for game_type, batch in self.batches.items()},
+            'tick': self.histogram.to_dict(),
+            'room_step': {game_type: h.to_dict() for game_type, h in self.room_histograms.items()},
+        }
@@ -0,0 +1,437 @@
+"""向量化物理：同一游戏类型的所有房间共用一组 NumPy 数组，每个 tick 一次推进全部房间
+
+数组第一维是房间行号（row），房间结束后行号回收复用，容量不足时按两倍扩容。
+第二维是玩家槽位（按加入顺序），子弹按所属玩家分配固定槽位，不需要动态列表。
+逐对象实现（simulations.py）仍是规则的参考版本，常量和输入清洗都取自它。
+"""
+import math
+
+import numpy as np
+
+from simulations import ARENA_HEIGHT, ARENA_WIDTH, AsteroidsSimulation, TankSimulation
+
+TAU = 2 * math.pi
+
+
+class BatchedRoom:
+    """批量模拟中单个房间的视图，对外接口与 Simulation 相同；推进由 RoomBatch.step 统一完成"""
+
+    __slots__ = ('batch', 'room_id', 'row', 'slot_ids', 'player_ids', 'slots', 'final')
+
+    def __init__(self, batch, room_id, row, player_ids):
+        self.batch = batch
+        self.room_id = room_id
+        self.row = row
+        self.slot_ids = list(player_ids)  # 槽位下标 -> user_id，玩家离开后保留，用于解析事件和胜者
+        self.player_ids = list(player_ids)
+        self.slots = {user_id: index for index, user_id in enumerate(self.slot_ids)}
+        self.final = None  # 移出批量后保留的 (tick, finished, winner)，行号可能已被新房间复用
+
+    @property
+    def game_type(self):
+        return self.batch.game_type
+
+    @property
+    def tick(self):
+        if self.final is not None:
+            return self.final[0]
+        return int(self.batch.tick[self.row])
+
+    @property
+    def finished(self):
+        if self.final is not None:
+            return self.final[1]
+        return bool(self.batch.finished[self.row])
+
+    @property
+    def winner(self):
+        if self.final is not None:
+            return self.final[2]
+        index = int(self.batch.winner[self.row])
+        return self.slot_ids[index] if index >= 0 else None
+
+    @property
+    def events(self):
+        return self.batch.events.get(self.row, [])
+
+    def sanitize_input(self, data):
+        return self.batch.simulation_class.sanitize_input(data)
+
+    def set_input(self, user_id, command):
+        index = self.slots.get(user_id)
+        if self.final is None and index is not None and user_id in self.player_ids:
+            self.batch.set_input(self.row, index, command)
+
+    def remove_player(self, user_id):
+        if user_id in self.player_ids:
+            self.player_ids.remove(user_id)
+            if self.final is None:
+                self.batch.remove_player(self.row, self.slots[user_id])
+
+    def step(self, inputs, dt):
+        """由 RoomBatch.step 统一推进，这里什么都不做"""
+
+    def snapshot(self):
+        return self.batch.snapshot(self)
+
+
+class RoomBatch:
+    """一种游戏类型的批量模拟基类。子类声明数组（_array_specs）、初始化房间（_init_row）并实现 step"""
+
+    game_type = None
+    simulation_class = None
+    INPUTS = ()  # 输入字段，对应数组 in_<字段>
+
+    def __init__(self, max_players=4, capacity=64, seed=None):
+        self.max_players = max_players
+        self.rng = np.random.default_rng(seed)
+        self.capacity = 0
+        self.rows = {}  # room_id -> row
+        self.views = {}  # row -> BatchedRoom
+        self.events = {}  # row -> 本 tick 的事件列表
+        self._free = []
+        self._specs = dict(self._array_specs(), active=((), bool, False), finished=((), bool, False),
+                           tick=((), np.int64, 0), winner=((), np.int8, -1),
+                           present=((max_players,), bool, False))
+        self._grow(capacity)
+
+    def _array_specs(self):
+        """{数组名: (除行号外的形状, dtype, 初始值)}"""
+        return {}
+
+    def _init_row(self, row, player_count):
+        pass
+
+    def __len__(self):
+        return len(self.rows)
+
+    def _grow(self, capacity):
+        old = self.capacity
+        for name, (shape, dtype, fill) in self._specs.items():
+            array = np.full((capacity,) + shape, fill, dtype=dtype)
+            if old:
+                array[:old] = getattr(self, name)
+            setattr(self, name, array)
+        self._free.extend(range(capacity - 1, old - 1, -1))
+        self.capacity = capacity
+
+    def add_room(self, room_id, player_ids):
+        if len(player_ids) > self.max_players:
+            raise ValueError(f'{self.game_type} batch supports at most {self.max_players} players')
+        if not self._free:
+            self._grow(self.capacity * 2)
+        row = self._free.pop()
+        for name, (_, _, fill) in self._specs.items():
+            getattr(self, name)[row] = fill
+        self.active[row] = True
+        self.present[row, :len(player_ids)] = True
+        self._init_row(row, len(player_ids))
+        view = BatchedRoom(self, room_id, row, player_ids)
+        self.rows[room_id] = row
+        self.views[row] = view
+        return view
+
+    def remove_room(self, room_id):
+        row = self.rows.pop(room_id, None)
+        if row is None:
+            return None
+        view = self.views.pop(row)
+        view.final = (view.tick, view.finished, view.winner)
+        self.active[row] = False
+        self.events.pop(row, None)
+        self._free.append(row)
+        return view
+
+    def set_input(self, row, index, command):
+        for key in self.INPUTS:
+            getattr(self, 'in_' + key)[row, index] = command.get(key, 0)
+
+    def remove_player(self, row, index):
+        self.present[row, index] = False
+        for key in self.INPUTS:
+            getattr(self, 'in_' + key)[row, index] = 0
+
+    def _add_event(self, row, event):
+        self.events.setdefault(row, []).append(event)
+
+    def _begin_step(self):
+        """开始一个 tick：清空事件，返回本 tick 需要推进的房间掩码"""
+        self.events = {}
+        live = self.active & ~self.finished
+        self.tick[live] += 1
+        return live
+
+    def _base_snapshot(self, view):
+        return {'tick': view.tick, 'finished': view.finished, 'winner': view.winner, 'events': view.events}
+
+    def step(self, dt):
+        raise NotImplementedError
+
+    def snapshot(self, view):
+        raise NotImplementedError
+
+
+def _bullet_slots(simulation_class):
+    """每个玩家同时在飞的子弹数上限：存活时间 / 冷却时间，再留一个余量给浮点误差"""
+    return int(math.ceil(simulation_class.BULLET_LIFETIME / simulation_class.FIRE_COOLDOWN)) + 1
+
+
+def _spawn_bullets(batch, fire, cos_a, sin_a, muzzle, speed, lifetime):
+    """为 fire 掩码中的玩家在各自第一个空闲槽位生成子弹，返回 (rows, players)"""
+    free = ~batch.b_active
+    fire = fire & free.any(axis=2)
+    rows, players = np.nonzero(fire)
+    if rows.size:
+        slots = free[rows, players].argmax(axis=1)
+        ca, sa = cos_a[rows, players], sin_a[rows, players]
+        batch.bx[rows, players, slots] = batch.x[rows, players] + ca * muzzle
+        batch.by[rows, players, slots] = batch.y[rows, players] + sa * muzzle
+        batch.bvx[rows, players, slots] = ca * speed
+        batch.bvy[rows, players, slots] = sa * speed
+        batch.bttl[rows, players, slots] = lifetime
+        batch.b_active[rows, players, slots] = True
+    return rows, players
+
+
+def _bullet_specs(players, slots):
+    specs = {name: ((players, slots), np.float64, 0.0) for name in ('bx', 'by', 'bvx', 'bvy', 'bttl')}
+    specs['b_active'] = ((players, slots), bool, False)
+    return specs
+
+
+def _bullet_list(batch, row):
+    active = batch.b_active[row]
+    return [[round(x, 1), round(y, 1)] for x, y in zip(batch.bx[row][active].tolist(), batch.by[row][active].tolist())]
+
+
+class TankBatch(RoomBatch):
+    """坦克对战的批量版本，规则同 TankSimulation。
+
+    与逐对象版本的差别：同一 tick 内多颗子弹命中同一辆坦克时全部生效（生命值不低于 0），
+    逐对象版本里坦克被前一颗子弹击毁后，后面的子弹会穿过去。
+    """
+
+    game_type = 'tank'
+    simulation_class = TankSimulation
+    INPUTS = ('move', 'turn', 'fire')
+
+    def _array_specs(self):
+        players, slots = self.max_players, _bullet_slots(TankSimulation)
+        specs = {name: ((players,), np.float64, 0.0) for name in ('x', 'y', 'angle', 'cooldown')}
+        specs.update(_bullet_specs(players, slots),
+                     hp=((players,), np.int16, 0),
+                     in_move=((players,), np.int8, 0), in_turn=((players,), np.int8, 0),
+                     in_fire=((players,), bool, False),
+                     started_with=((), np.int8, 0))
+        # 子弹 (玩家, 槽位) 对坦克的掩码：不能打中自己
+        self._not_self = ~np.eye(players, dtype=bool)[None, :, None, :]
+        return specs
+
+    def _init_row(self, row, player_count):
+        count = max(player_count, 1)
+        angle = TAU * np.arange(player_count) / count
+        self.x[row, :player_count] = ARENA_WIDTH / 2 - np.cos(angle) * (ARENA_WIDTH / 2 - 60)
+        self.y[row, :player_count] = ARENA_HEIGHT / 2 - np.sin(angle) * (ARENA_HEIGHT / 2 - 60)
+        self.angle[row, :player_count] = angle
+        self.hp[row, :player_count] = TankSimulation.MAX_HP
+        self.started_with[row] = player_count
+
+    def step(self, dt):
+        sim = TankSimulation
+        live = self._begin_step()
+        r = sim.TANK_RADIUS
+        alive = self.present & (self.hp > 0) & live[:, None]
+
+        self.angle = np.where(alive, (self.angle + self.in_turn * (sim.TURN_SPEED * dt)) % TAU, self.angle)
+        cos_a, sin_a = np.cos(self.angle), np.sin(self.angle)
+        distance = self.in_move * (sim.TANK_SPEED * dt)
+        self.x = np.where(alive, np.clip(self.x + cos_a * distance, r, ARENA_WIDTH - r), self.x)
+        self.y = np.where(alive, np.clip(self.y + sin_a * distance, r, ARENA_HEIGHT - r), self.y)
+        self.cooldown = np.where(alive, np.maximum(self.cooldown - dt, 0.0), self.cooldown)
+        rows, players = _spawn_bullets(self, alive & self.in_fire & (self.cooldown == 0.0),
+                                       cos_a, sin_a, r + 4, sim.BULLET_SPEED, sim.BULLET_LIFETIME)
+        self.cooldown[rows, players] = sim.FIRE_COOLDOWN
+
+        moving = self.b_active & live[:, None, None]
+        self.bx += self.bvx * dt * moving
+        self.by += self.bvy * dt * moving
+        self.bttl -= dt * moving
+        expired = (self.bttl <= 0) | (self.bx < 0) | (self.bx > ARENA_WIDTH) | (self.by < 0) | (self.by > ARENA_HEIGHT)
+        self.b_active &= ~(moving & expired)
+
+        # 子弹 (房间, 玩家, 槽位) 对同房间每辆坦克的距离
+        flying = self.b_active & live[:, None, None]
+        targets = self.present & (self.hp > 0)
+        dx = self.x[:, None, None, :] - self.bx[..., None]
+        dy = self.y[:, None, None, :] - self.by[..., None]
+        hit = (dx * dx + dy * dy <= (r + sim.BULLET_RADIUS) ** 2) & flying[..., None] \
+            & targets[:, None, None, :] & self._not_self
+        rows, owners, slots = np.nonzero(hit.any(axis=3))
+        if rows.size:
+            victims = hit[rows, owners, slots].argmax(axis=1)
+            np.subtract.at(self.hp, (rows, victims), 1)
+            np.maximum(self.hp, 0, out=self.hp)
+            self.b_active[rows, owners, slots] = False
+            for row, owner, victim in zip(rows.tolist(), owners.tolist(), victims.tolist()):
+                slot_ids = self.views[row].slot_ids
+                self._add_event(row, {'type': 'hit', 'target': slot_ids[victim], 'by': slot_ids[owner]})
+
+        alive = self.present & (self.hp > 0)
+        count = alive.sum(axis=1)
+        done = live & ((count == 0) | ((count == 1) & (self.started_with > 1)))
+        if done.any():
+            self.finished |= done
+            self.winner[done] = np.where(count[done] == 1, alive[done].argmax(axis=1), -1)
+
+    def snapshot(self, view):
+        row = view.row
+        state = self._base_snapshot(view)
+        xs, ys, angles, hps = self.x[row].tolist(), self.y[row].tolist(), self.angle[row].tolist(), self.hp[row].tolist()
+        present = self.present[row].tolist()
+        state.update({
+            'tanks': {uid: {'x': round(xs[i], 1), 'y': round(ys[i], 1), 'angle': round(angles[i], 3), 'hp': hps[i]}
+                      for i, uid in enumerate(view.slot_ids) if present[i]},
+            'bullets': _bullet_list(self, row),
+        })
+        return state
+
+
+def _claim(hit):
+    """hit[row, i, a]：第 i 个对象（子弹或飞船）与第 a 颗小行星相撞。
+
+    逐对象版本按顺序处理，小行星被撞后立即重生，所以每个对象只算它碰到的第一颗，
+    每颗小行星只算第一个碰到它的对象。返回 (rows, objects, asteroids)。
+    """
+    first = hit.argmax(axis=2)
+    claims = hit.any(axis=2)[..., None] & (first[..., None] == np.arange(hit.shape[2]))
+    rows, asteroids = np.nonzero(claims.any(axis=1))
+    objects = claims[rows, :, asteroids].argmax(axis=1)
+    return rows, objects, asteroids
+
+
+class AsteroidsBatch(RoomBatch):
+    """小行星的批量版本，规则同 AsteroidsSimulation（随机数来自 NumPy，序列与逐对象版本不同）"""
+
+    game_type = 'asteroids'
+    simulation_class = AsteroidsSimulation
+    INPUTS = ('thrust', 'turn', 'fire')
+
+    def _array_specs(self):
+        sim = AsteroidsSimulation
+        players, slots, count = self.max_players, _bullet_slots(sim), sim.ASTEROID_COUNT
+        self.bullet_slots = slots
+        specs = {name: ((players,), np.float64, 0.0) for name in ('x', 'y', 'vx', 'vy', 'angle', 'cooldown')}
+        specs.update({name: ((count,), np.float64, 0.0) for name in ('ax', 'ay', 'avx', 'avy')})
+        specs.update(_bullet_specs(players, slots),
+                     ar=((count,), np.int16, 0),
+                     hp=((players,), np.int16, 0), score=((players,), np.int32, 0),
+                     in_thrust=((players,), bool, False), in_turn=((players,), np.int8, 0),
+                     in_fire=((players,), bool, False))
+        return specs
+
+    def _init_row(self, row, player_count):
+        count = max(player_count, 1)
+        angle = TAU * np.arange(player_count) / count
+        self.x[row, :player_count] = ARENA_WIDTH / 2 + np.cos(angle) * 100
+        self.y[row, :player_count] = ARENA_HEIGHT / 2 + np.sin(angle) * 100
+        self.angle[row, :player_count] = angle
+        self.hp[row, :player_count] = AsteroidsSimulation.MAX_HP
+        indices = np.arange(AsteroidsSimulation.ASTEROID_COUNT)
+        self._spawn_asteroids(np.full(indices.size, row), indices)
+
+    def _spawn_asteroids(self, rows, indices):
+        """在场地边缘重新生成指定的小行星"""
+        sim, rng, n = AsteroidsSimulation, self.rng, len(rows)
+        vertical_edge = rng.random(n) < 0.5
+        self.ax[rows, indices] = np.where(vertical_edge, rng.choice([0.0, ARENA_WIDTH], n), rng.uniform(0, ARENA_WIDTH, n))
+        self.ay[rows, indices] = np.where(vertical_edge, rng.uniform(0, ARENA_HEIGHT, n), rng.choice([0.0, ARENA_HEIGHT], n))
+        angle = rng.uniform(0, TAU, n)
+        speed = rng.uniform(*sim.ASTEROID_SPEED, n)
+        self.avx[rows, indices] = np.cos(angle) * speed
+        self.avy[rows, indices] = np.sin(angle) * speed
+        self.ar[rows, indices] = rng.choice(sim.ASTEROID_RADII, n)
+
+    def step(self, dt):
+        sim = AsteroidsSimulation
+        live = self._begin_step()
+        alive = self.present & (self.hp > 0) & live[:, None]
+
+        self.angle = np.where(alive, (self.angle + self.in_turn * (sim.TURN_SPEED * dt)) % TAU, self.angle)
+        cos_a, sin_a = np.cos(self.angle), np.sin(self.angle)
+        thrust = alive & self.in_thrust
+        damping = np.where(alive, max(0.0, 1 - sim.DRAG * dt), 1.0)
+        self.vx = (self.vx + np.where(thrust, cos_a * (sim.THRUST * dt), 0.0)) * damping
+        self.vy = (self.vy + np.where(thrust, sin_a * (sim.THRUST * dt), 0.0)) * damping
+        self.x = np.where(alive, (self.x + self.vx * dt) % ARENA_WIDTH, self.x)
+        self.y = np.where(alive, (self.y + self.vy * dt) % ARENA_HEIGHT, self.y)
+        self.cooldown = np.where(alive, np.maximum(self.cooldown - dt, 0.0), self.cooldown)
+        rows, players = _spawn_bullets(self, alive & self.in_fire & (self.cooldown == 0.0),
+                                       cos_a, sin_a, 0.0, sim.BULLET_SPEED, sim.BULLET_LIFETIME)
+        self.cooldown[rows, players] = sim.FIRE_COOLDOWN
+
+        rolling = live[:, None]
+        self.ax = np.where(rolling, (self.ax + self.avx * dt) % ARENA_WIDTH, self.ax)
+        self.ay = np.where(rolling, (self.ay + self.avy * dt) % ARENA_HEIGHT, self.ay)
+
+        moving = self.b_active & live[:, None, None]
+        self.bx = np.where(moving, (self.bx + self.bvx * dt) % ARENA_WIDTH, self.bx)
+        self.by = np.where(moving, (self.by + self.bvy * dt) % ARENA_HEIGHT, self.by)
+        self.bttl -= dt * moving
+        self.b_active &= ~(moving & (self.bttl <= 0))
+
+        # 子弹 (房间, 玩家*槽位) 对同房间每颗小行星
+        capacity = self.capacity
+        flying = (self.b_active & live[:, None, None]).reshape(capacity, -1)
+        dx = self.ax[:, None, :] - self.bx.reshape(capacity, -1)[:, :, None]
+        dy = self.ay[:, None, :] - self.by.reshape(capacity, -1)[:, :, None]
+        reach = ((self.ar + sim.BULLET_RADIUS) ** 2)[:, None, :]
+        rows, bullets, asteroids = _claim((dx * dx + dy * dy <= reach) & flying[..., None])
+        if rows.size:
+            owners, slots = np.divmod(bullets, self.bullet_slots)
+            self.b_active[rows, owners, slots] = False
+            np.add.at(self.score, (rows, owners), 1)
+            self._spawn_asteroids(rows, asteroids)
+            for row, owner in zip(rows.tolist(), owners.tolist()):
+                self._add_event(row, {'type': 'destroy', 'by': self.views[row].slot_ids[owner]})
+
+        # 飞船对小行星（使用子弹命中后重生的位置）
+        ships = self.present & (self.hp > 0) & live[:, None]
+        dx = self.ax[:, None, :] - self.x[:, :, None]
+        dy = self.ay[:, None, :] - self.y[:, :, None]
+        reach = ((self.ar + sim.SHIP_RADIUS) ** 2)[:, None, :]
+        rows, crashed, asteroids = _claim((dx * dx + dy * dy <= reach) & ships[..., None])
+        if rows.size:
+            self.hp[rows, crashed] -= 1
+            self._spawn_asteroids(rows, asteroids)
+            for row, ship in zip(rows.tolist(), crashed.tolist()):
+                self._add_event(row, {'type': 'crash', 'target': self.views[row].slot_ids[ship]})
+
+        scores = np.where(self.present, self.score, -1)
+        alive = self.present & (self.hp > 0)
+        done = live & (~alive.any(axis=1) | (scores.max(axis=1) >= sim.WIN_SCORE))
+        if done.any():
+            self.finished |= done
+            self.winner[done] = np.where(self.present[done].any(axis=1), scores[done].argmax(axis=1), -1)
+
+    def snapshot(self, view):
+        row = view.row
+        state = self._base_snapshot(view)
+        xs, ys, angles = self.x[row].tolist(), self.y[row].tolist(), self.angle[row].tolist()
+        hps, scores, present = self.hp[row].tolist(), self.score[row].tolist(), self.present[row].tolist()
+        state.update({
+            'ships': {uid: {'x': round(xs[i], 1), 'y': round(ys[i], 1), 'angle': round(angles[i], 3),
+                            'hp': hps[i], 'score': scores[i]}
+                      for i, uid in enumerate(view.slot_ids) if present[i]},
+            'asteroids': [[round(x, 1), round(y, 1), r]
+                          for x, y, r in zip(self.ax[row].tolist(), self.ay[row].tolist(), self.ar[row].tolist())],
+            'bullets': _bullet_list(self, row),
+        })
+        return state
+
+
+BATCHES = (TankBatch, AsteroidsBatch)
+
+
+def create_batches(max_players=4):
+    """game_type -> RoomBatch"""
+    return {cls.game_type: cls(max_players=max_players) for cls in BATCHES}